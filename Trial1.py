@@ -1,6 +1,4 @@
 import customtkinter as ctk
-import mysql.connector
-from mysql.connector import Error
 import tkinter as tk
 from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
@@ -10,259 +8,34 @@ from datetime import datetime, timedelta
 import openpyxl
 from tkinter import filedialog
 import os
+from database import DatabaseManager
+from nutrition import NutritionEngine, NUTRIENT_COLUMNS, scale_ingredients, format_ingredient
+from pantry import ShoppingListNetter, parse_stock_line, format_net_item
+from replica import ReplicaDatabaseManager
+from meal_plan_grid import MealPlanGrid, DAYS_ORDER, MEAL_TYPES_ORDER, PLAN_WEEKS, plan_day
+from recipe_index import RecipePrefixIndex
+from photos import PhotoCache, is_photo, MAX_PHOTO_BYTES
+from revisions import recipe_tuple
+from history import trend_window, period_range, build_trend
+from diagnostics import LeakTracker, format_report
 
 # Set appearance mode and theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# Data each page displays; a change marks the hidden pages that show it as stale.
+# Local pantry edits reach the shopping list through apply_stock_change instead.
+PAGE_DATA = {
+    "recipes": {"recipes", "photos"},
+    "meal_planner": {"recipes", "meal_plan", "household"},
+    "shopping_list": {"recipes", "meal_plan", "household", "pantry"},
+    "pantry": {"pantry"},
+    "analytics": {"recipes", "meal_plan", "household", "history"},
+}
 
-class DatabaseManager:
-    def __init__(self):
-        self.connection = None
-        self.connect_database()
-        self.create_tables()
-
-    def connect_database(self):
-        """Connect to MySQL database"""
-        try:
-            self.connection = mysql.connector.connect(
-                host='localhost',
-                database='recipe_planner',
-                user='root',
-                password='root'  # Change this to your MySQL password
-            )
-            print("Successfully connected to MySQL database")
-        except Error as e:
-            print(f"Error connecting to MySQL: {e}")
-            messagebox.showerror("Database Error", "Failed to connect to MySQL database. Please check your connection settings.")
-
-    def create_tables(self):
-        """Create necessary tables if they don't exist"""
-        if not self.connection:
-            return
-
-        cursor = self.connection.cursor()
-
-        # Create Recipes table
-        create_recipes_table = """
-        CREATE TABLE IF NOT EXISTS recipes (
-            recipe_id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            ingredients TEXT NOT NULL,
-            instructions TEXT NOT NULL,
-            category VARCHAR(100) NOT NULL,
-            cuisine VARCHAR(100),
-            cook_time INT,
-            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-
-        # Create MealPlan table
-        create_mealplan_table = """
-        CREATE TABLE IF NOT EXISTS mealplan (
-            plan_id INT AUTO_INCREMENT PRIMARY KEY,
-            day VARCHAR(20) NOT NULL,
-            meal_type VARCHAR(20) NOT NULL,
-            recipe_id INT,
-            FOREIGN KEY (recipe_id) REFERENCES recipes(recipe_id) ON DELETE CASCADE
-        )
-        """
-
-        try:
-            cursor.execute(create_recipes_table)
-            cursor.execute(create_mealplan_table)
-            self.connection.commit()
-            print("Tables created successfully")
-        except Error as e:
-            print(f"Error creating tables: {e}")
-        finally:
-            cursor.close()
-
-    def insert_recipe(self, name, ingredients, instructions, category, cuisine="", cook_time=0):
-        """Insert a new recipe"""
-        if not self.connection:
-            return False
-
-        cursor = self.connection.cursor()
-        query = """INSERT INTO recipes (name, ingredients, instructions, category, cuisine, cook_time)
-                   VALUES (%s, %s, %s, %s, %s, %s)"""
-
-        try:
-            cursor.execute(query, (name, ingredients, instructions, category, cuisine, cook_time))
-            self.connection.commit()
-            return True
-        except Error as e:
-            print(f"Error inserting recipe: {e}")
-            return False
-        finally:
-            cursor.close()
-
-    def get_all_recipes(self):
-        """Get all recipes from database"""
-        if not self.connection:
-            return []
-
-        cursor = self.connection.cursor()
-        query = "SELECT * FROM recipes ORDER BY created_date DESC"
-
-        try:
-            cursor.execute(query)
-            return cursor.fetchall()
-        except Error as e:
-            print(f"Error fetching recipes: {e}")
-            return []
-        finally:
-            cursor.close()
-
-    def search_recipes(self, search_term, search_type="name"):
-        """Search recipes by name, category, or ingredient"""
-        if not self.connection:
-            return []
-
-        cursor = self.connection.cursor()
-
-        if search_type == "name":
-            query = "SELECT * FROM recipes WHERE name LIKE %s"
-        elif search_type == "category":
-            query = "SELECT * FROM recipes WHERE category LIKE %s"
-        elif search_type == "ingredient":
-            query = "SELECT * FROM recipes WHERE ingredients LIKE %s"
-
-        try:
-            cursor.execute(query, (f"%{search_term}%",))
-            return cursor.fetchall()
-        except Error as e:
-            print(f"Error searching recipes: {e}")
-            return []
-        finally:
-            cursor.close()
-
-    def update_recipe(self, recipe_id, name, ingredients, instructions, category, cuisine="", cook_time=0):
-        """Update an existing recipe"""
-        if not self.connection:
-            return False
-
-        cursor = self.connection.cursor()
-        query = """UPDATE recipes SET name=%s, ingredients=%s, instructions=%s, 
-                   category=%s, cuisine=%s, cook_time=%s WHERE recipe_id=%s"""
-
-        try:
-            cursor.execute(query, (name, ingredients, instructions, category, cuisine, cook_time, recipe_id))
-            self.connection.commit()
-            return True
-        except Error as e:
-            print(f"Error updating recipe: {e}")
-            return False
-        finally:
-            cursor.close()
-
-    def delete_recipe(self, recipe_id):
-        """Delete a recipe"""
-        if not self.connection:
-            return False
-
-        cursor = self.connection.cursor()
-        query = "DELETE FROM recipes WHERE recipe_id = %s"
-
-        try:
-            cursor.execute(query, (recipe_id,))
-            self.connection.commit()
-            return True
-        except Error as e:
-            print(f"Error deleting recipe: {e}")
-            return False
-        finally:
-            cursor.close()
-
-    def add_meal_plan(self, day, meal_type, recipe_id):
-        """Add a meal plan entry"""
-        if not self.connection:
-            return False
-
-        # First, remove existing plan for the same day and meal type
-        self.remove_meal_plan(day, meal_type)
-
-        cursor = self.connection.cursor()
-        query = "INSERT INTO mealplan (day, meal_type, recipe_id) VALUES (%s, %s, %s)"
-
-        try:
-            cursor.execute(query, (day, meal_type, recipe_id))
-            self.connection.commit()
-            return True
-        except Error as e:
-            print(f"Error adding meal plan: {e}")
-            return False
-        finally:
-            cursor.close()
-
-    def get_meal_plan(self):
-        """Get complete meal plan"""
-        if not self.connection:
-            return []
-
-        cursor = self.connection.cursor()
-        query = """SELECT mp.day, mp.meal_type, r.name, r.recipe_id
-                   FROM mealplan mp
-                   JOIN recipes r ON mp.recipe_id = r.recipe_id
-                   ORDER BY FIELD(mp.day, 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'), 
-                            FIELD(mp.meal_type, 'Breakfast', 'Lunch', 'Dinner')"""
-
-        try:
-            cursor.execute(query)
-            return cursor.fetchall()
-        except Error as e:
-            print(f"Error fetching meal plan: {e}")
-            return []
-        finally:
-            cursor.close()
-
-    def remove_meal_plan(self, day, meal_type):
-        """Remove meal plan for specific day and meal type"""
-        if not self.connection:
-            return False
-
-        cursor = self.connection.cursor()
-        query = "DELETE FROM mealplan WHERE day = %s AND meal_type = %s"
-
-        try:
-            cursor.execute(query, (day, meal_type))
-            self.connection.commit()
-            return True
-        except Error as e:
-            print(f"Error removing meal plan: {e}")
-            return False
-        finally:
-            cursor.close()
-
-    def get_shopping_list(self):
-        """Generate shopping list based on meal plan"""
-        if not self.connection:
-            return []
-
-        cursor = self.connection.cursor()
-        query = """SELECT DISTINCT r.ingredients
-                   FROM mealplan mp
-                   JOIN recipes r ON mp.recipe_id = r.recipe_id"""
-
-        try:
-            cursor.execute(query)
-            results = cursor.fetchall()
-
-            # Combine all ingredients
-            all_ingredients = []
-            for result in results:
-                ingredients = result[0].split(',')
-                for ingredient in ingredients:
-                    ingredient = ingredient.strip()
-                    if ingredient and ingredient not in all_ingredients:
-                        all_ingredients.append(ingredient)
-
-            return sorted(all_ingredients)
-        except Error as e:
-            print(f"Error generating shopping list: {e}")
-            return []
-        finally:
-            cursor.close()
+# Trend chart period choices, shown on the analytics page
+TREND_PERIODS = {"Daily": "day", "Weekly": "week", "Monthly": "month"}
+TREND_LABEL_FORMATS = {"day": "%m-%d", "week": "%m-%d", "month": "%Y-%m"}
 
 
 class RecipePlannerApp:
@@ -272,12 +45,63 @@ class RecipePlannerApp:
         self.root.geometry("1200x800")
         self.root.minsize(1000, 700)
 
-        # Initialize database
-        self.db = DatabaseManager()
+        # Initialize database: reads come from a local replica that syncs with MySQL in the background
+        self.db = ReplicaDatabaseManager(DatabaseManager())
+        self.sync_generation = self.db.sync_generation
+
+        # Pages are built once and then shown or hidden
+        self.current_page = None
+        self.pages = {}
+        self.stale_pages = set()
 
         # Current recipe for editing
         self.current_recipe = None
 
+        # Nutrition engine and household size used for scaling
+        self.nutrition = NutritionEngine()
+        self.household_size_var = tk.StringVar(value="1")
+        self.household_size_var.trace_add("write", lambda *args: self.mark_data_changed("household"))
+
+        # Netted shopping list, re-netted in place on pantry changes
+        self.shopping_netter = None
+        self.shopping_list_frame = None
+        # Shopping list row widgets by (name, unit), so a stock change redraws only its rows
+        self.shopping_rows = {}
+        self.shopping_rows_frame = None
+        self.shopping_title_label = None
+
+        # Meal plan grid: persistent widgets per day and per (day, meal_type) cell
+        self.meal_plan_grid = MealPlanGrid()
+        self.meal_day_widgets = {}
+        self.meal_cell_widgets = {}
+
+        # Type-ahead recipe picker for the meal planner
+        self.recipe_index = RecipePrefixIndex()
+        self.recipe_matches = []
+        self.selected_recipe_id = None
+
+        # Recipe photos: thumbnails are decoded only for rows scrolled into view
+        self.photo_cache = PhotoCache(self.db)
+        self.photo_hashes = {}
+        self.photo_rows = []
+        self.shown_photo_rows = {}
+        self.photo_placeholder = None
+        self.photo_update_job = None
+
+        # Recipe list rows by recipe_id, so changes from other instances patch single rows
+        self.recipe_rows = {}
+        self.recipe_order = []
+        self.showing_all_recipes = True
+
+        # Meal history trend period on the analytics page
+        self.trend_period_var = tk.StringVar(value="Weekly")
+
+        # Leak diagnostics: checkpoint memory, widgets and figures on every page switch
+        self.diagnostics = None
+        if os.environ.get("RECIPE_PLANNER_DIAGNOSTICS"):
+            self.diagnostics = LeakTracker(self.root)
+            self.diagnostics.start()
+
         self.setup_ui()
 
     def setup_ui(self):
@@ -328,22 +152,183 @@ class RecipePlannerApp:
         analytics_btn.pack(pady=5, padx=20, fill="x")
         self.nav_buttons.append(analytics_btn)
 
-    def clear_content_frame(self):
-        """Clear the content frame"""
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+        pantry_btn = ctk.CTkButton(self.sidebar, text="🥫 Pantry",
+                                   command=self.show_pantry_page, height=40)
+        pantry_btn.pack(pady=5, padx=20, fill="x")
+        self.nav_buttons.append(pantry_btn)
+
+        # Household (tenant) selection
+        new_tenant_btn = ctk.CTkButton(self.sidebar, text="+ New Household", command=self.create_tenant, height=30)
+        new_tenant_btn.pack(side="bottom", pady=(5, 20), padx=20, fill="x")
+
+        self.tenant_var = tk.StringVar()
+        self.tenant_combo = ctk.CTkComboBox(self.sidebar, variable=self.tenant_var, command=self.switch_tenant)
+        self.tenant_combo.pack(side="bottom", pady=5, padx=20, fill="x")
+
+        ctk.CTkLabel(self.sidebar, text="Household:", font=ctk.CTkFont(weight="bold")).pack(side="bottom", padx=20,
+                                                                                            anchor="w")
+        self.refresh_tenants()
+
+        # Sync status
+        self.sync_status_label = ctk.CTkLabel(self.sidebar, text="", font=ctk.CTkFont(size=12))
+        self.sync_status_label.pack(side="bottom", pady=(0, 10))
+        self.poll_sync_status()
+
+    def poll_sync_status(self):
+        """Show replica sync status and refresh the page when remote changes arrive"""
+        pending = self.db.pending_count()
+        if self.db.is_connected():
+            status = "● Online" + (f" ({pending} syncing)" if pending else "")
+        else:
+            status = f"○ Offline ({pending} pending)" if pending else "○ Offline"
+        self.sync_status_label.configure(text=status)
+
+        if self.db.sync_generation != self.sync_generation:
+            self.sync_generation = self.db.sync_generation
+            if not self.tenant_ids:
+                self.refresh_tenants()
+            self.apply_remote_changes(*self.db.take_changes())
+        for name, recipe_id in self.db.take_duplicates():
+            self.show_duplicate_recipe(name, recipe_id, saved_offline=True)
+
+        self.root.after(2000, self.poll_sync_status)
+
+    def apply_remote_changes(self, kinds, recipe_ids):
+        """Patch the views for changes pulled from other instances instead of reloading them"""
+        if not kinds:
+            return
+        self.mark_data_changed(*kinds)
+
+        # Keep the type-ahead index current without rebuilding it
+        if "meal_planner" in self.pages and "recipes" in kinds:
+            if recipe_ids is None:
+                self.refresh_recipe_picker()
+            else:
+                recipes = {row[0]: row[1] for row in self.db.get_recipes_by_ids(sorted(recipe_ids))}
+                for recipe_id in recipe_ids:
+                    if recipe_id in recipes:
+                        self.recipe_index.add(recipe_id, recipes[recipe_id])
+                    else:
+                        self.recipe_index.remove(recipe_id)
+
+        if not PAGE_DATA.get(self.current_page, set()) & kinds:
+            return
+        if self.current_page == "recipes":
+            if "photos" in kinds and self.photo_cache.enabled and self.db.is_connected():
+                self.photo_hashes = self.db.get_photo_hashes()
+            if recipe_ids is None:
+                self.search_recipes()
+            else:
+                self.patch_recipe_rows(recipe_ids)
+        elif self.current_page == "meal_planner":
+            # The grid redraws only the cells that changed
+            self.refresh_meal_plan()
+        else:
+            self.refresh_current_page()
+
+    def refresh_current_page(self):
+        """Reload the data shown on the current page"""
+        if self.current_page == "recipes":
+            self.refresh_recipes()
+        elif self.current_page == "meal_planner":
+            self.refresh_recipe_picker()
+            self.refresh_meal_plan()
+        elif self.current_page == "shopping_list":
+            self.refresh_shopping_list()
+        elif self.current_page == "pantry":
+            self.refresh_pantry()
+        elif self.current_page == "analytics":
+            self.refresh_analytics()
+
+    def refresh_tenants(self):
+        """Refresh the household dropdown"""
+        tenants = self.db.get_tenants()
+        self.tenant_ids = {name: tenant_id for tenant_id, name in tenants}
+        self.tenant_combo.configure(values=list(self.tenant_ids))
+        for tenant_id, name in tenants:
+            if tenant_id == self.db.tenant_id:
+                self.tenant_var.set(name)
+
+    def switch_tenant(self, name):
+        """Scope the app to another household"""
+        tenant_id = self.tenant_ids.get(name)
+        if tenant_id is None or tenant_id == self.db.tenant_id:
+            return
+
+        self.db = self.db.for_tenant(tenant_id)
+        self.sync_generation = self.db.sync_generation
+        self.photo_cache.db = self.db
+        self.photo_hashes = {}
+        self.shopping_netter = None
+        self.clear_recipe_form()
+        self.mark_all_pages_stale()
+        self.refresh_current_page()
+
+    def create_tenant(self):
+        """Create a new household and switch to it"""
+        dialog = ctk.CTkInputDialog(text="Household name:", title="New Household")
+        name = (dialog.get_input() or "").strip()
+        if not name:
+            return
+
+        if self.db.create_tenant(name) is None:
+            messagebox.showerror("Error", "Failed to create household!")
+            return
+
+        self.refresh_tenants()
+        self.tenant_var.set(name)
+        self.switch_tenant(name)
+
+    def open_page(self, name):
+        """Show a cached page, refreshing it first if its data changed
+
+        Returns a new empty frame when the page has not been built yet,
+        otherwise None.
+        """
+        if self.current_page in self.pages:
+            self.pages[self.current_page].pack_forget()
+        self.current_page = name
+        if self.diagnostics is not None:
+            # Measure once the caller has finished building or refreshing the page
+            self.root.after_idle(self.diagnostics.checkpoint, name)
+
+        page = self.pages.get(name)
+        if page is not None:
+            if name in self.stale_pages:
+                self.stale_pages.discard(name)
+                self.refresh_current_page()
+            page.pack(fill="both", expand=True)
+            return None
+
+        page = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        page.pack(fill="both", expand=True)
+        self.pages[name] = page
+        return page
+
+    def mark_data_changed(self, *kinds):
+        """Flag hidden pages that show the changed data so they refresh when next opened"""
+        for name, data in PAGE_DATA.items():
+            if name != self.current_page and name in self.pages and data & set(kinds):
+                self.stale_pages.add(name)
+
+    def mark_all_pages_stale(self):
+        """Flag every hidden page, e.g. after a sync or a household switch"""
+        self.stale_pages.update(name for name in self.pages if name != self.current_page)
 
     def show_recipes_page(self):
         """Show recipes management page"""
-        self.clear_content_frame()
+        page = self.open_page("recipes")
+        if page is None:
+            self.schedule_photo_update()
+            return
 
         # Title
-        title = ctk.CTkLabel(self.content_frame, text="Recipe Manager",
+        title = ctk.CTkLabel(page, text="Recipe Manager",
                              font=ctk.CTkFont(size=24, weight="bold"))
         title.pack(pady=20)
 
         # Create notebook for tabs
-        notebook = ctk.CTkTabview(self.content_frame)
+        notebook = ctk.CTkTabview(page)
         notebook.pack(fill="both", expand=True, padx=20, pady=10)
 
         # Add Recipe Tab
@@ -370,6 +355,7 @@ class RecipePlannerApp:
         self.recipe_category_var = tk.StringVar(value="Breakfast")
         self.recipe_cuisine_var = tk.StringVar()
         self.recipe_cook_time_var = tk.StringVar()
+        self.recipe_servings_var = tk.StringVar(value="1")
 
         # Name
         ctk.CTkLabel(scroll_frame, text="Recipe Name:", font=ctk.CTkFont(weight="bold")).pack(anchor="w", pady=(0, 5))
@@ -411,7 +397,13 @@ class RecipePlannerApp:
                                                                                                        padx=10,
                                                                                                        pady=(0, 5))
         cook_time_entry = ctk.CTkEntry(details_frame, textvariable=self.recipe_cook_time_var)
-        cook_time_entry.pack(fill="x", padx=10, pady=(0, 15))
+        cook_time_entry.pack(fill="x", padx=10, pady=(0, 10))
+
+        # Servings
+        ctk.CTkLabel(details_frame, text="Servings:", font=ctk.CTkFont(weight="bold")).pack(anchor="w", padx=10,
+                                                                                            pady=(0, 5))
+        servings_entry = ctk.CTkEntry(details_frame, textvariable=self.recipe_servings_var)
+        servings_entry.pack(fill="x", padx=10, pady=(0, 15))
 
         # Buttons
         button_frame = ctk.CTkFrame(scroll_frame)
@@ -436,7 +428,7 @@ class RecipePlannerApp:
         search_entry = ctk.CTkEntry(search_frame, textvariable=self.search_var, width=200)
         search_entry.pack(side="left", padx=5)
 
-        search_type_combo = ctk.CTkComboBox(search_frame, values=["name", "category", "ingredient"],
+        search_type_combo = ctk.CTkComboBox(search_frame, values=["name", "category", "ingredient", "fuzzy"],
                                             variable=self.search_type_var, width=100)
         search_type_combo.pack(side="left", padx=5)
 
@@ -446,9 +438,17 @@ class RecipePlannerApp:
         refresh_btn = ctk.CTkButton(search_frame, text="Refresh", command=self.refresh_recipes)
         refresh_btn.pack(side="left", padx=5)
 
+        deleted_btn = ctk.CTkButton(search_frame, text="Deleted...", command=self.show_deleted_recipes)
+        deleted_btn.pack(side="right", padx=5)
+
         # Recipes list frame
         self.recipes_list_frame = ctk.CTkScrollableFrame(parent)
         self.recipes_list_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+        # The canvas reports every scroll, resize and change of its rows here, so visible
+        # photos are re-checked only when something moved
+        scrollbar = self.recipes_list_frame._scrollbar
+        self.recipes_list_frame._parent_canvas.configure(
+            yscrollcommand=lambda first, last: (scrollbar.set(first, last), self.schedule_photo_update()))
 
         self.refresh_recipes()
 
@@ -465,6 +465,8 @@ class RecipePlannerApp:
         except ValueError:
             cook_time = 0
 
+        servings = self.parse_positive_int(self.recipe_servings_var.get())
+
         if not all([name, ingredients, instructions]):
             messagebox.showerror("Error", "Please fill in all required fields!")
             return
@@ -472,24 +474,40 @@ class RecipePlannerApp:
         if self.current_recipe:
             # Update existing recipe
             success = self.db.update_recipe(self.current_recipe[0], name, ingredients, instructions, category, cuisine,
-                                            cook_time)
+                                            cook_time, servings)
             if success:
                 messagebox.showinfo("Success", "Recipe updated successfully!")
                 self.current_recipe = None
                 self.clear_recipe_form()
                 self.refresh_recipes()
+                self.mark_data_changed("recipes")
             else:
                 messagebox.showerror("Error", "Failed to update recipe!")
         else:
-            # Add new recipe
-            success = self.db.insert_recipe(name, ingredients, instructions, category, cuisine, cook_time)
+            # Add new recipe, unless there already is one with this name and these ingredients
+            duplicate_id = self.db.find_duplicate_recipe(name, ingredients)
+            if duplicate_id is not None:
+                self.show_duplicate_recipe(name, duplicate_id)
+                return
+            success = self.db.insert_recipe(name, ingredients, instructions, category, cuisine, cook_time, servings)
             if success:
                 messagebox.showinfo("Success", "Recipe saved successfully!")
                 self.clear_recipe_form()
                 self.refresh_recipes()
+                self.mark_data_changed("recipes")
             else:
                 messagebox.showerror("Error", "Failed to save recipe!")
 
+    def show_duplicate_recipe(self, name, recipe_id, saved_offline=False):
+        """Tell the user a recipe they saved is already in the collection, and as which recipe"""
+        existing = self.db.get_recipes_by_ids([recipe_id])
+        existing_name = existing[0][1] if existing else name
+        if saved_offline:
+            text = f"'{name}', saved while offline, is the same recipe as '{existing_name}' and was merged into it."
+        else:
+            text = f"'{name}' with these ingredients is already saved as '{existing_name}'."
+        messagebox.showinfo("Duplicate Recipe", text)
+
     def clear_recipe_form(self):
         """Clear the recipe form"""
         self.recipe_name_var.set("")
@@ -498,8 +516,17 @@ class RecipePlannerApp:
         self.recipe_category_var.set("Breakfast")
         self.recipe_cuisine_var.set("")
         self.recipe_cook_time_var.set("")
+        self.recipe_servings_var.set("1")
         self.current_recipe = None
 
+    def parse_positive_int(self, value, default=1):
+        """Parse a positive integer entry, falling back to default"""
+        try:
+            number = int(value)
+        except ValueError:
+            return default
+        return number if number > 0 else default
+
     def search_recipes(self):
         """Search recipes based on criteria"""
         search_term = self.search_var.get().strip()
@@ -510,11 +537,13 @@ class RecipePlannerApp:
         else:
             recipes = self.db.get_all_recipes()
 
+        self.showing_all_recipes = not search_term
         self.display_recipes(recipes)
 
     def refresh_recipes(self):
         """Refresh the recipes list"""
         recipes = self.db.get_all_recipes()
+        self.showing_all_recipes = True
         self.display_recipes(recipes)
 
     def display_recipes(self, recipes):
@@ -522,54 +551,210 @@ class RecipePlannerApp:
         # Clear existing widgets
         for widget in self.recipes_list_frame.winfo_children():
             widget.destroy()
+        self.recipe_rows = {}
+        self.recipe_order = []
+        if self.photo_cache.enabled and self.db.is_connected():
+            self.photo_hashes = self.db.get_photo_hashes()
 
         if not recipes:
             no_recipes_label = ctk.CTkLabel(self.recipes_list_frame, text="No recipes found!",
                                             font=ctk.CTkFont(size=16))
             no_recipes_label.pack(pady=50)
+            self.index_photo_rows()
             return
 
         for recipe in recipes:
-            recipe_frame = ctk.CTkFrame(self.recipes_list_frame)
+            self.build_recipe_row(recipe)
+            self.recipe_order.append(recipe[0])
+        self.index_photo_rows()
+
+    def build_recipe_row(self, recipe, before=None):
+        """Create the list row for one recipe"""
+        recipe_frame = ctk.CTkFrame(self.recipes_list_frame)
+        if before is not None:
+            recipe_frame.pack(fill="x", pady=10, padx=10, before=before)
+        else:
             recipe_frame.pack(fill="x", pady=10, padx=10)
 
-            # Recipe info frame
-            info_frame = ctk.CTkFrame(recipe_frame)
-            info_frame.pack(fill="x", padx=10, pady=10)
+        # Recipe info frame
+        info_frame = ctk.CTkFrame(recipe_frame)
+        info_frame.pack(fill="x", padx=10, pady=10)
 
-            # Title
-            title_label = ctk.CTkLabel(info_frame, text=recipe[1], font=ctk.CTkFont(size=18, weight="bold"))
-            title_label.pack(anchor="w", padx=10, pady=(10, 5))
+        # Photo thumbnail, filled in by update_visible_photos once the row is on screen
+        digest = self.photo_hashes.get(recipe[0])
+        photo_label = None
+        if digest:
+            photo_label = ctk.CTkLabel(info_frame, text="", image=self.get_photo_placeholder())
+            photo_label.pack(side="left", padx=10, pady=10)
+        self.recipe_rows[recipe[0]] = (recipe_frame, photo_label, digest)
 
-            # Details
-            details_text = f"Category: {recipe[4]} | Cuisine: {recipe[5] or 'Not specified'} | Cook Time: {recipe[6] or 'Not specified'} min"
-            details_label = ctk.CTkLabel(info_frame, text=details_text, font=ctk.CTkFont(size=12))
-            details_label.pack(anchor="w", padx=10, pady=(0, 5))
+        # Title
+        title_label = ctk.CTkLabel(info_frame, text=recipe[1], font=ctk.CTkFont(size=18, weight="bold"))
+        title_label.pack(anchor="w", padx=10, pady=(10, 5))
+
+        # Details
+        details_text = f"Category: {recipe[4]} | Cuisine: {recipe[5] or 'Not specified'} | Cook Time: {recipe[6] or 'Not specified'} min"
+        details_label = ctk.CTkLabel(info_frame, text=details_text, font=ctk.CTkFont(size=12))
+        details_label.pack(anchor="w", padx=10, pady=(0, 5))
 
-            # Ingredients preview
-            ingredients_preview = recipe[2][:100] + "..." if len(recipe[2]) > 100 else recipe[2]
-            ingredients_label = ctk.CTkLabel(info_frame, text=f"Ingredients: {ingredients_preview}",
-                                             font=ctk.CTkFont(size=12), wraplength=600)
-            ingredients_label.pack(anchor="w", padx=10, pady=(0, 10))
+        # Ingredients preview
+        ingredients_preview = recipe[2][:100] + "..." if len(recipe[2]) > 100 else recipe[2]
+        ingredients_label = ctk.CTkLabel(info_frame, text=f"Ingredients: {ingredients_preview}",
+                                         font=ctk.CTkFont(size=12), wraplength=600)
+        ingredients_label.pack(anchor="w", padx=10, pady=(0, 10))
 
-            # Buttons
-            button_frame = ctk.CTkFrame(recipe_frame)
-            button_frame.pack(fill="x", padx=10, pady=(0, 10))
+        # Buttons
+        button_frame = ctk.CTkFrame(recipe_frame)
+        button_frame.pack(fill="x", padx=10, pady=(0, 10))
 
-            view_btn = ctk.CTkButton(button_frame, text="View", command=lambda r=recipe: self.view_recipe(r))
-            view_btn.pack(side="left", padx=5)
+        view_btn = ctk.CTkButton(button_frame, text="View", command=lambda r=recipe: self.view_recipe(r))
+        view_btn.pack(side="left", padx=5)
 
-            edit_btn = ctk.CTkButton(button_frame, text="Edit", command=lambda r=recipe: self.edit_recipe(r))
-            edit_btn.pack(side="left", padx=5)
+        edit_btn = ctk.CTkButton(button_frame, text="Edit", command=lambda r=recipe: self.edit_recipe(r))
+        edit_btn.pack(side="left", padx=5)
 
-            delete_btn = ctk.CTkButton(button_frame, text="Delete", fg_color="red", hover_color="darkred",
-                                       command=lambda r=recipe: self.delete_recipe(r))
-            delete_btn.pack(side="right", padx=5)
+        delete_btn = ctk.CTkButton(button_frame, text="Delete", fg_color="red", hover_color="darkred",
+                                   command=lambda r=recipe: self.delete_recipe(r))
+        delete_btn.pack(side="right", padx=5)
+        return recipe_frame
+
+    def patch_recipe_rows(self, recipe_ids):
+        """Rebuild, remove or add only the rows of recipes that changed elsewhere"""
+        if not self.recipe_order:
+            self.search_recipes()
+            return
+
+        recipes = {row[0]: row[:9] for row in self.db.get_recipes_by_ids(sorted(recipe_ids))}
+        for recipe_id in recipe_ids:
+            recipe = recipes.get(recipe_id)
+            row = self.recipe_rows.get(recipe_id)
+            if row is not None:
+                if recipe is not None:
+                    self.build_recipe_row(recipe, before=row[0])
+                else:
+                    del self.recipe_rows[recipe_id]
+                    self.recipe_order.remove(recipe_id)
+                row[0].destroy()
+            elif recipe is not None and self.showing_all_recipes:
+                # New recipes go first, matching get_all_recipes' newest-first order
+                self.build_recipe_row(recipe, before=self.recipe_rows[self.recipe_order[0]][0])
+                self.recipe_order.insert(0, recipe_id)
+
+        if not self.recipe_order:
+            self.display_recipes([])
+        else:
+            self.index_photo_rows()
+
+    def index_photo_rows(self):
+        """List the rows with a photo in display order for the visibility search"""
+        self.photo_rows = [(self.recipe_rows[recipe_id][0], self.recipe_rows[recipe_id][1],
+                            self.recipe_rows[recipe_id][2])
+                           for recipe_id in self.recipe_order if self.recipe_rows[recipe_id][1] is not None]
+        labels = {row[1] for row in self.photo_rows}
+        self.shown_photo_rows = {label: photo for label, photo in self.shown_photo_rows.items() if label in labels}
+
+    def get_photo_placeholder(self):
+        """Blank thumbnail-sized image so rows keep their height before the photo loads"""
+        if self.photo_placeholder is None:
+            image = self.photo_cache.placeholder()
+            self.photo_placeholder = ctk.CTkImage(light_image=image, size=image.size)
+        return self.photo_placeholder
+
+    def visible_photo_range(self):
+        """Indexes [first, last) of the photo rows inside the scrolled viewport"""
+        canvas = self.recipes_list_frame._parent_canvas
+        top = canvas.canvasy(0)
+        bottom = canvas.canvasy(canvas.winfo_height())
+
+        # Rows are packed top to bottom, so binary search on their y positions
+        low, high = 0, len(self.photo_rows)
+        while low < high:
+            middle = (low + high) // 2
+            frame = self.photo_rows[middle][0]
+            if frame.winfo_y() + frame.winfo_height() < top:
+                low = middle + 1
+            else:
+                high = middle
+        first = last = low
+        while last < len(self.photo_rows) and self.photo_rows[last][0].winfo_y() <= bottom:
+            last += 1
+        return first, last
+
+    def schedule_photo_update(self, delay=50):
+        """Run update_visible_photos once after delay ms, coalescing bursts of scroll events"""
+        if self.photo_update_job is None:
+            self.photo_update_job = self.root.after(delay, self.update_visible_photos)
+
+    def update_visible_photos(self):
+        """Show thumbnails for rows on screen and release them for rows scrolled away"""
+        self.photo_update_job = None
+        self.photo_cache.poll()
+
+        if self.current_page == "recipes" and self.photo_rows:
+            first, last = self.visible_photo_range()
+            # Keep a screen's worth of rows either side ready for scrolling
+            margin = max(last - first, 1)
+            first, last = max(first - margin, 0), min(last + margin, len(self.photo_rows))
+
+            nearby = {row[1] for row in self.photo_rows[first:last]}
+            for photo_label in list(self.shown_photo_rows):
+                if photo_label not in nearby:
+                    photo_label.configure(image=self.get_photo_placeholder())
+                    del self.shown_photo_rows[photo_label]
+
+            for _, photo_label, digest in self.photo_rows[first:last]:
+                if photo_label in self.shown_photo_rows:
+                    continue
+                image = self.photo_cache.thumbnail(digest)
+                if image is None:
+                    self.photo_cache.request(digest)
+                    continue
+                photo = ctk.CTkImage(light_image=image, size=image.size)
+                photo_label.configure(image=photo)
+                self.shown_photo_rows[photo_label] = photo
+
+        # Keep polling only while thumbnails are still being built
+        if self.photo_cache.pending:
+            self.schedule_photo_update(100)
+
+    def set_recipe_photo(self, recipe, recipe_window):
+        """Attach a photo file to a recipe"""
+        path = filedialog.askopenfilename(parent=recipe_window, title="Choose a photo",
+                                          filetypes=[("Images", "*.png *.jpg *.jpeg *.gif *.webp *.bmp"),
+                                                     ("All files", "*.*")])
+        if not path:
+            return
 
-    def view_recipe(self, recipe):
-        """View full recipe details"""
+        with open(path, "rb") as f:
+            data = f.read(MAX_PHOTO_BYTES + 1)
+        if len(data) > MAX_PHOTO_BYTES:
+            messagebox.showerror("Error", "Photos must be smaller than 16 MB!")
+            return
+        if not is_photo(data):
+            messagebox.showerror("Error", "That file is not an image!")
+            return
+
+        if self.db.set_recipe_photo(recipe[0], data):
+            self.photo_cache.store_blob(data)
+            recipe_window.destroy()
+            self.view_recipe(recipe)
+            self.refresh_recipes()
+        else:
+            messagebox.showerror("Error", "Failed to save photo! Recipes added offline can get one after syncing.")
+
+    def remove_recipe_photo(self, recipe, recipe_window):
+        """Detach a recipe's photo"""
+        if self.db.remove_recipe_photo(recipe[0]):
+            recipe_window.destroy()
+            self.view_recipe(recipe)
+            self.refresh_recipes()
+        else:
+            messagebox.showerror("Error", "Failed to remove photo!")
+
+    def view_recipe(self, recipe, revision=None):
+        """View full recipe details, or those of an older revision"""
         recipe_window = ctk.CTkToplevel(self.root)
-        recipe_window.title(f"Recipe: {recipe[1]}")
+        recipe_window.title(f"Recipe: {recipe[1]}" + (f" (revision {revision})" if revision else ""))
         recipe_window.geometry("600x700")
 
         # Scrollable frame
@@ -580,6 +765,30 @@ class RecipePlannerApp:
         title_label = ctk.CTkLabel(scroll_frame, text=recipe[1], font=ctk.CTkFont(size=24, weight="bold"))
         title_label.pack(pady=(0, 20))
 
+        # History
+        if revision is None:
+            history_btn = ctk.CTkButton(scroll_frame, text="History...",
+                                        command=lambda: self.show_recipe_history(recipe))
+            history_btn.pack(anchor="w", pady=(0, 10))
+
+        # Photo
+        if self.photo_cache.enabled and revision is None:
+            digest = self.photo_hashes.get(recipe[0])
+            image = self.photo_cache.load_photo(digest, (520, 360)) if digest else None
+            if image is not None:
+                photo = ctk.CTkImage(light_image=image, size=image.size)
+                ctk.CTkLabel(scroll_frame, text="", image=photo).pack(pady=(0, 10))
+
+            photo_buttons = ctk.CTkFrame(scroll_frame)
+            photo_buttons.pack(fill="x", pady=(0, 20))
+            ctk.CTkButton(photo_buttons, text="Set Photo...",
+                          command=lambda: self.set_recipe_photo(recipe, recipe_window)).pack(side="left", padx=5,
+                                                                                            pady=5)
+            if digest:
+                ctk.CTkButton(photo_buttons, text="Remove Photo", fg_color="red", hover_color="darkred",
+                              command=lambda: self.remove_recipe_photo(recipe, recipe_window)).pack(side="left",
+                                                                                                   padx=5, pady=5)
+
         # Details
         details_frame = ctk.CTkFrame(scroll_frame)
         details_frame.pack(fill="x", pady=(0, 20))
@@ -590,13 +799,27 @@ class RecipePlannerApp:
             anchor="w", padx=10, pady=5)
         ctk.CTkLabel(details_frame, text=f"Cook Time: {recipe[6] or 'Not specified'} minutes",
                      font=ctk.CTkFont(size=14)).pack(anchor="w", padx=10, pady=5)
+        ctk.CTkLabel(details_frame, text=f"Servings: {recipe[8]}", font=ctk.CTkFont(size=14)).pack(anchor="w",
+                                                                                                  padx=10, pady=5)
 
-        # Ingredients
-        ctk.CTkLabel(scroll_frame, text="Ingredients:", font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w",
-                                                                                                       pady=(0, 5))
+        # Nutrition per serving
+        nutrition = self.nutrition.recipe_totals(recipe[2], recipe[8], target_servings=1)
+        nutrition_text = " | ".join(f"{column.title()}: {nutrition[column]:.0f}" for column in NUTRIENT_COLUMNS)
+        ctk.CTkLabel(details_frame, text=f"Per serving - {nutrition_text}",
+                     font=ctk.CTkFont(size=14)).pack(anchor="w", padx=10, pady=5)
+
+        # Ingredients, scaled to the household size
+        household_size = self.parse_positive_int(self.household_size_var.get())
+        ingredients_text = recipe[2]
+        if household_size != recipe[8]:
+            scaled = scale_ingredients(recipe[2], recipe[8], household_size)
+            ingredients_text = ", ".join(format_ingredient(ingredient) for ingredient in scaled)
+
+        ctk.CTkLabel(scroll_frame, text=f"Ingredients (for {household_size}):",
+                     font=ctk.CTkFont(size=16, weight="bold")).pack(anchor="w", pady=(0, 5))
         ingredients_textbox = ctk.CTkTextbox(scroll_frame, height=150)
         ingredients_textbox.pack(fill="x", pady=(0, 20))
-        ingredients_textbox.insert("1.0", recipe[2])
+        ingredients_textbox.insert("1.0", ingredients_text)
         ingredients_textbox.configure(state="disabled")
 
         # Instructions
@@ -607,6 +830,87 @@ class RecipePlannerApp:
         instructions_textbox.insert("1.0", recipe[3])
         instructions_textbox.configure(state="disabled")
 
+    def show_recipe_history(self, recipe):
+        """List a recipe's revisions with options to view or restore each"""
+        revisions = self.db.get_recipe_revisions(recipe[0])
+        if not revisions:
+            messagebox.showinfo("History", "No history available! History needs a database connection.")
+            return
+
+        history_window = ctk.CTkToplevel(self.root)
+        history_window.title(f"History: {recipe[1]}")
+        history_window.geometry("560x500")
+
+        scroll_frame = ctk.CTkScrollableFrame(history_window)
+        scroll_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        for index, (revision, kind, created_date, size) in enumerate(revisions):
+            action = {"delete": "deleted", "merge": "merged into a duplicate"}.get(
+                kind, "created" if revision == 1 else "edited")
+            row = ctk.CTkFrame(scroll_frame)
+            row.pack(fill="x", pady=2)
+            ctk.CTkLabel(row, text=f"#{revision}  {created_date:%Y-%m-%d %H:%M}  {action}  ({size} bytes stored)",
+                         anchor="w").pack(side="left", padx=10, pady=5)
+
+            if kind in ("delete", "merge"):
+                continue
+            # The newest revision is the current recipe; older ones can be brought back
+            if index > 0:
+                ctk.CTkButton(row, text="Restore", width=70,
+                              command=lambda r=revision: self.restore_recipe(recipe[0], r, history_window)).pack(
+                    side="right", padx=5)
+            ctk.CTkButton(row, text="View", width=60,
+                          command=lambda r=revision: self.view_recipe_revision(recipe[0], r)).pack(side="right",
+                                                                                                  padx=5)
+
+    def view_recipe_revision(self, recipe_id, revision):
+        """Open an older revision of a recipe read-only"""
+        state = self.db.get_recipe_revision(recipe_id, revision)
+        if state is None:
+            messagebox.showerror("Error", "Failed to load that revision!")
+            return
+        revision, _, created_date, fields = state
+        self.view_recipe(recipe_tuple(recipe_id, fields, created_date), revision=revision)
+
+    def show_deleted_recipes(self):
+        """List deleted recipes that can be restored"""
+        deleted = self.db.get_deleted_recipes()
+        if not deleted:
+            messagebox.showinfo("Deleted Recipes", "There are no deleted recipes to restore.")
+            return
+
+        deleted_window = ctk.CTkToplevel(self.root)
+        deleted_window.title("Deleted Recipes")
+        deleted_window.geometry("560x500")
+
+        scroll_frame = ctk.CTkScrollableFrame(deleted_window)
+        scroll_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        for recipe_id, name, deleted_date in deleted:
+            row = ctk.CTkFrame(scroll_frame)
+            row.pack(fill="x", pady=2)
+            ctk.CTkLabel(row, text=f"{name}  (deleted {deleted_date:%Y-%m-%d %H:%M})", anchor="w").pack(
+                side="left", padx=10, pady=5)
+            ctk.CTkButton(row, text="Restore", width=70,
+                          command=lambda r=recipe_id: self.restore_recipe(r, None, deleted_window)).pack(
+                side="right", padx=5)
+            ctk.CTkButton(row, text="History", width=70,
+                          command=lambda r=recipe_id, n=name: self.show_recipe_history((r, n))).pack(side="right",
+                                                                                                   padx=5)
+
+    def restore_recipe(self, recipe_id, revision, window):
+        """Restore a deleted recipe, or an older revision of one"""
+        target = f"revision {revision}" if revision else "the last saved version"
+        if not messagebox.askyesno("Confirm Restore", f"Restore {target} of this recipe?"):
+            return
+
+        if self.db.restore_recipe(recipe_id, revision):
+            messagebox.showinfo("Success", "Recipe restored! It appears once the replica has synced.")
+            window.destroy()
+            self.db.sync_now()
+        else:
+            messagebox.showerror("Error", "Failed to restore recipe!")
+
     def edit_recipe(self, recipe):
         """Edit recipe - populate form with existing data"""
         self.current_recipe = recipe
@@ -620,6 +924,7 @@ class RecipePlannerApp:
         self.recipe_category_var.set(recipe[4])
         self.recipe_cuisine_var.set(recipe[5] or "")
         self.recipe_cook_time_var.set(str(recipe[6]) if recipe[6] else "")
+        self.recipe_servings_var.set(str(recipe[8]))
 
         # Switch to add recipe tab
         messagebox.showinfo("Edit Mode", f"Editing recipe: {recipe[1]}\nGo to 'Add Recipe' tab to make changes.")
@@ -633,20 +938,23 @@ class RecipePlannerApp:
             if success:
                 messagebox.showinfo("Success", "Recipe deleted successfully!")
                 self.refresh_recipes()
+                self.mark_data_changed("recipes", "meal_plan")
             else:
                 messagebox.showerror("Error", "Failed to delete recipe!")
 
     def show_meal_planner_page(self):
         """Show meal planner page"""
-        self.clear_content_frame()
+        page = self.open_page("meal_planner")
+        if page is None:
+            return
 
         # Title
-        title = ctk.CTkLabel(self.content_frame, text="Meal Planner",
+        title = ctk.CTkLabel(page, text="Meal Planner",
                              font=ctk.CTkFont(size=24, weight="bold"))
         title.pack(pady=20)
 
         # Planning form
-        form_frame = ctk.CTkFrame(self.content_frame)
+        form_frame = ctk.CTkFrame(page)
         form_frame.pack(fill="x", padx=20, pady=10)
 
         # Form elements
@@ -657,150 +965,259 @@ class RecipePlannerApp:
         ctk.CTkLabel(form_inner, text="Day:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=10, pady=10,
                                                                                     sticky="w")
         self.day_var = tk.StringVar(value="Monday")
-        day_combo = ctk.CTkComboBox(form_inner,
-                                    values=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday",
-                                            "Sunday"],
-                                    variable=self.day_var, width=150)
+        day_combo = ctk.CTkComboBox(form_inner, values=DAYS_ORDER, variable=self.day_var, width=150)
         day_combo.grid(row=0, column=1, padx=10, pady=10)
 
         # Meal type
         ctk.CTkLabel(form_inner, text="Meal Type:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=2, padx=10,
                                                                                           pady=10, sticky="w")
         self.meal_type_var = tk.StringVar(value="Breakfast")
-        meal_combo = ctk.CTkComboBox(form_inner, values=["Breakfast", "Lunch", "Dinner"],
-                                     variable=self.meal_type_var, width=150)
+        meal_combo = ctk.CTkComboBox(form_inner, values=MEAL_TYPES_ORDER, variable=self.meal_type_var, width=150)
         meal_combo.grid(row=0, column=3, padx=10, pady=10)
 
         # Recipe selection
         ctk.CTkLabel(form_inner, text="Recipe:", font=ctk.CTkFont(weight="bold")).grid(row=1, column=0, padx=10,
                                                                                        pady=10, sticky="w")
         self.recipe_var = tk.StringVar()
-        self.recipe_combo = ctk.CTkComboBox(form_inner, variable=self.recipe_var, width=300)
-        self.recipe_combo.grid(row=1, column=1, columnspan=2, padx=10, pady=10)
+        self.recipe_entry = ctk.CTkEntry(form_inner, textvariable=self.recipe_var, width=300,
+                                         placeholder_text="Type to search recipes")
+        self.recipe_entry.grid(row=1, column=1, columnspan=2, padx=10, pady=10)
+        self.recipe_entry.bind("<KeyRelease>", self.on_recipe_key)
+        self.recipe_entry.bind("<Return>", lambda event: self.pick_recipe(0))
+        self.recipe_entry.bind("<Down>", lambda event: self.focus_recipe_matches())
+        self.recipe_entry.bind("<Escape>", lambda event: self.hide_recipe_matches())
 
         # Add to plan button
         add_meal_btn = ctk.CTkButton(form_inner, text="Add to Plan", command=self.add_to_meal_plan, height=40)
         add_meal_btn.grid(row=1, column=3, padx=10, pady=10)
 
         # Refresh button
-        refresh_combo_btn = ctk.CTkButton(form_inner, text="Refresh Recipes", command=self.refresh_recipe_combo,
-                                          height=40)
-        refresh_combo_btn.grid(row=2, column=1, padx=10, pady=10)
+        refresh_recipes_btn = ctk.CTkButton(form_inner, text="Refresh Recipes", command=self.refresh_recipe_picker,
+                                            height=40)
+        refresh_recipes_btn.grid(row=2, column=1, padx=10, pady=10)
+
+        # Week of a multi-week plan
+        self.week_var = tk.StringVar(value="Week 1")
+        week_combo = ctk.CTkComboBox(form_inner, values=[f"Week {week}" for week in range(1, PLAN_WEEKS + 1)],
+                                     variable=self.week_var, width=150)
+        week_combo.grid(row=2, column=0, padx=10, pady=10)
+
+        # Household size
+        ctk.CTkLabel(form_inner, text="Household:", font=ctk.CTkFont(weight="bold")).grid(row=2, column=2, padx=10,
+                                                                                          pady=10, sticky="w")
+        household_entry = ctk.CTkEntry(form_inner, textvariable=self.household_size_var, width=150)
+        household_entry.grid(row=2, column=3, padx=10, pady=10)
+        household_entry.bind("<Return>", lambda event: self.refresh_meal_plan())
+
+        # Match list shown under the recipe entry while typing
+        self.recipe_match_list = tk.Listbox(form_inner, height=8, activestyle="none", borderwidth=0,
+                                            highlightthickness=0, bg="#2b2b2b", fg="white",
+                                            selectbackground="#1f6aa5", font=("Arial", 12))
+        self.recipe_match_list.bind("<ButtonRelease-1>", lambda event: self.pick_recipe(self.selected_match_index()))
+        self.recipe_match_list.bind("<Return>", lambda event: self.pick_recipe(self.selected_match_index()))
+        self.recipe_match_list.bind("<Escape>", lambda event: self.hide_recipe_matches())
 
         # Weekly plan display
-        plan_frame = ctk.CTkFrame(self.content_frame)
+        plan_frame = ctk.CTkFrame(page)
         plan_frame.pack(fill="both", expand=True, padx=20, pady=10)
 
-        plan_title = ctk.CTkLabel(plan_frame, text="Weekly Meal Plan", font=ctk.CTkFont(size=18, weight="bold"))
+        plan_title = ctk.CTkLabel(plan_frame, text="Meal Plan", font=ctk.CTkFont(size=18, weight="bold"))
         plan_title.pack(pady=10)
 
         # Scrollable frame for meal plan
         self.meal_plan_frame = ctk.CTkScrollableFrame(plan_frame)
         self.meal_plan_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
 
+        self.no_plan_label = ctk.CTkLabel(self.meal_plan_frame, text="No meal plan found! Start planning your meals.",
+                                          font=ctk.CTkFont(size=16))
+
+        # The page was rebuilt, so every cell has to be drawn again
+        self.meal_plan_grid.clear()
+        self.meal_day_widgets = {}
+        self.meal_cell_widgets = {}
+
         # Initialize and load data
-        self.refresh_recipe_combo()
+        self.refresh_recipe_picker()
         self.refresh_meal_plan()
 
-    def refresh_recipe_combo(self):
-        """Refresh recipe dropdown"""
-        recipes = self.db.get_all_recipes()
-        recipe_names = [f"{recipe[1]} (ID: {recipe[0]})" for recipe in recipes]
+    def refresh_recipe_picker(self):
+        """Rebuild the recipe prefix index used by the type-ahead picker"""
+        self.recipe_index.build((recipe[0], recipe[1]) for recipe in self.db.get_all_recipes())
+        if self.selected_recipe_id not in self.recipe_index:
+            self.selected_recipe_id = None
+        self.hide_recipe_matches()
 
-        if recipe_names:
-            self.recipe_combo.configure(values=recipe_names)
-            if not self.recipe_var.get() or self.recipe_var.get() not in recipe_names:
-                self.recipe_var.set(recipe_names[0])
+    def on_recipe_key(self, event):
+        """Show the top matches for the text typed so far"""
+        if event.keysym in ("Return", "Down", "Up", "Escape", "Tab"):
+            return
+
+        text = self.recipe_var.get()
+        if self.recipe_index.name(self.selected_recipe_id) != text:
+            self.selected_recipe_id = None
+        if not text.strip():
+            self.hide_recipe_matches()
+            return
+
+        self.recipe_matches = self.recipe_index.search(text, limit=8)
+        self.recipe_match_list.delete(0, "end")
+        for _, name in self.recipe_matches:
+            self.recipe_match_list.insert("end", name)
+
+        if self.recipe_matches:
+            self.recipe_match_list.configure(height=len(self.recipe_matches))
+            self.recipe_match_list.place(in_=self.recipe_entry, relx=0, rely=1, relwidth=1)
+            self.recipe_match_list.lift()
         else:
-            self.recipe_combo.configure(values=["No recipes available"])
-            self.recipe_var.set("No recipes available")
+            self.hide_recipe_matches()
+
+    def focus_recipe_matches(self):
+        """Move keyboard focus into the match list"""
+        if self.recipe_matches:
+            self.recipe_match_list.focus_set()
+            self.recipe_match_list.selection_clear(0, "end")
+            self.recipe_match_list.selection_set(0)
+            self.recipe_match_list.activate(0)
+
+    def selected_match_index(self):
+        """Index of the highlighted match"""
+        selection = self.recipe_match_list.curselection()
+        return selection[0] if selection else 0
+
+    def pick_recipe(self, index):
+        """Select a match; the recipe_id comes straight from the index"""
+        if index >= len(self.recipe_matches):
+            return
+        recipe_id, name = self.recipe_matches[index]
+        self.selected_recipe_id = recipe_id
+        self.recipe_var.set(name)
+        self.hide_recipe_matches()
+        self.recipe_entry.focus_set()
+
+    def hide_recipe_matches(self):
+        """Hide the match list"""
+        self.recipe_matches = []
+        self.recipe_match_list.place_forget()
 
     def add_to_meal_plan(self):
         """Add recipe to meal plan"""
-        day = self.day_var.get()
+        day = plan_day(self.parse_positive_int(self.week_var.get().replace("Week", "")), self.day_var.get())
         meal_type = self.meal_type_var.get()
-        recipe_selection = self.recipe_var.get()
 
-        if "No recipes available" in recipe_selection:
+        if not self.recipe_index:
             messagebox.showerror("Error", "Please add some recipes first!")
             return
 
-        # Extract recipe ID from selection
-        try:
-            recipe_id = int(recipe_selection.split("ID: ")[1].split(")")[0])
-        except (IndexError, ValueError):
-            messagebox.showerror("Error", "Invalid recipe selection!")
-            return
+        # Fall back to the best match when nothing was picked from the list
+        recipe_id = self.selected_recipe_id
+        if recipe_id is None:
+            matches = self.recipe_index.search(self.recipe_var.get(), limit=1)
+            if not matches or not self.recipe_var.get().strip():
+                messagebox.showerror("Error", "Please pick a recipe!")
+                return
+            recipe_id = matches[0][0]
 
         success = self.db.add_meal_plan(day, meal_type, recipe_id)
         if success:
             messagebox.showinfo("Success", f"Added to {day} {meal_type}!")
             self.refresh_meal_plan()
+            self.mark_data_changed("meal_plan")
         else:
             messagebox.showerror("Error", "Failed to add to meal plan!")
 
     def refresh_meal_plan(self):
-        """Refresh meal plan display"""
-        # Clear existing widgets
-        for widget in self.meal_plan_frame.winfo_children():
-            widget.destroy()
-
+        """Refresh meal plan display, redrawing only the cells that changed"""
         meal_plan = self.db.get_meal_plan()
+        changed = self.meal_plan_grid.update(meal_plan)
+        planned_days = self.meal_plan_grid.planned_days()
 
-        if not meal_plan:
-            no_plan_label = ctk.CTkLabel(self.meal_plan_frame, text="No meal plan found! Start planning your meals.",
-                                         font=ctk.CTkFont(size=16))
-            no_plan_label.pack(pady=50)
-            return
-
-        # Group by day
-        days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        meals_by_day = {}
-
-        for meal in meal_plan:
-            day = meal[0]
-            if day not in meals_by_day:
-                meals_by_day[day] = {}
-            meals_by_day[day][meal[1]] = {"name": meal[2], "id": meal[3]}
-
-        # Display meal plan
-        for day in days_order:
-            if day in meals_by_day:
-                day_frame = ctk.CTkFrame(self.meal_plan_frame)
-                day_frame.pack(fill="x", pady=10, padx=10)
-
-                # Day header
-                day_header = ctk.CTkLabel(day_frame, text=day, font=ctk.CTkFont(size=18, weight="bold"))
-                day_header.pack(pady=10)
-
-                # Meals for the day
-                meals_frame = ctk.CTkFrame(day_frame)
-                meals_frame.pack(fill="x", padx=10, pady=(0, 10))
-
-                meal_types = ['Breakfast', 'Lunch', 'Dinner']
-                for i, meal_type in enumerate(meal_types):
-                    meal_frame = ctk.CTkFrame(meals_frame)
-                    meal_frame.pack(side="left", fill="both", expand=True, padx=5, pady=10)
-
-                    # Meal type header
-                    meal_header = ctk.CTkLabel(meal_frame, text=meal_type, font=ctk.CTkFont(size=14, weight="bold"))
-                    meal_header.pack(pady=(10, 5))
-
-                    if meal_type in meals_by_day[day]:
-                        # Recipe name
-                        recipe_name = meals_by_day[day][meal_type]["name"]
-                        recipe_label = ctk.CTkLabel(meal_frame, text=recipe_name, wraplength=150)
-                        recipe_label.pack(pady=5)
-
-                        # Remove button
-                        remove_btn = ctk.CTkButton(meal_frame, text="Remove",
-                                                   command=lambda d=day, m=meal_type: self.remove_from_meal_plan(d, m),
-                                                   height=25, width=80, fg_color="red", hover_color="darkred")
-                        remove_btn.pack(pady=(5, 10))
-                    else:
-                        # Empty slot
-                        empty_label = ctk.CTkLabel(meal_frame, text="No meal planned", text_color="gray")
-                        empty_label.pack(pady=20)
+        if not planned_days:
+            self.no_plan_label.pack(pady=50)
+        else:
+            self.no_plan_label.pack_forget()
+
+        # Remove days that no longer have meals
+        for day in list(self.meal_day_widgets):
+            if day not in planned_days:
+                self.meal_day_widgets.pop(day)["frame"].destroy()
+                for meal_type in self.meal_plan_grid.meal_types:
+                    self.meal_cell_widgets.pop((day, meal_type), None)
+                self.meal_plan_grid.forget_day(day)
+
+        # Add rows for newly planned days, keeping display order
+        for i, day in enumerate(planned_days):
+            if day not in self.meal_day_widgets:
+                following = next((self.meal_day_widgets[d]["frame"] for d in planned_days[i + 1:]
+                                  if d in self.meal_day_widgets), None)
+                self.build_day_row(day, before=following)
+                changed.update((day, meal_type) for meal_type in self.meal_plan_grid.meal_types)
+
+        for day, meal_type in changed:
+            if (day, meal_type) in self.meal_cell_widgets:
+                self.update_meal_cell(day, meal_type)
+
+        # Daily nutrition totals (cached by the engine for an unchanged plan)
+        household_size = self.parse_positive_int(self.household_size_var.get())
+        daily_totals = self.nutrition.daily_totals([(meal[0], meal[4], meal[5]) for meal in meal_plan],
+                                                   household_size)
+        for day in planned_days:
+            totals = daily_totals[day]
+            totals_text = (f"{totals['calories']:.0f} kcal | Protein {totals['protein']:.0f} g | "
+                           f"Carbs {totals['carbs']:.0f} g | Fat {totals['fat']:.0f} g (household of {household_size})")
+            if self.meal_plan_grid.set_day_text(day, totals_text):
+                self.meal_day_widgets[day]["totals"].configure(text=totals_text)
+
+    def build_day_row(self, day, before=None):
+        """Create the frame, header and empty meal cells for one day"""
+        day_frame = ctk.CTkFrame(self.meal_plan_frame)
+        if before is not None:
+            day_frame.pack(fill="x", pady=10, padx=10, before=before)
+        else:
+            day_frame.pack(fill="x", pady=10, padx=10)
+
+        # Day header
+        day_header = ctk.CTkLabel(day_frame, text=day, font=ctk.CTkFont(size=18, weight="bold"))
+        day_header.pack(pady=(10, 0))
+
+        totals_label = ctk.CTkLabel(day_frame, text="", font=ctk.CTkFont(size=12))
+        totals_label.pack(pady=(0, 10))
+        self.meal_day_widgets[day] = {"frame": day_frame, "totals": totals_label}
+
+        # Meals for the day
+        meals_frame = ctk.CTkFrame(day_frame)
+        meals_frame.pack(fill="x", padx=10, pady=(0, 10))
+
+        for meal_type in self.meal_plan_grid.meal_types:
+            meal_frame = ctk.CTkFrame(meals_frame)
+            meal_frame.pack(side="left", fill="both", expand=True, padx=5, pady=10)
+
+            # Meal type header
+            meal_header = ctk.CTkLabel(meal_frame, text=meal_type, font=ctk.CTkFont(size=14, weight="bold"))
+            meal_header.pack(pady=(10, 5))
+
+            # Recipe name and Remove button are shown only when the slot is filled
+            recipe_label = ctk.CTkLabel(meal_frame, text="", wraplength=150)
+            remove_btn = ctk.CTkButton(meal_frame, text="Remove",
+                                       command=lambda d=day, m=meal_type: self.remove_from_meal_plan(d, m),
+                                       height=25, width=80, fg_color="red", hover_color="darkred")
+            empty_label = ctk.CTkLabel(meal_frame, text="No meal planned", text_color="gray")
+            self.meal_cell_widgets[(day, meal_type)] = {"recipe": recipe_label, "remove": remove_btn,
+                                                        "empty": empty_label}
+
+    def update_meal_cell(self, day, meal_type):
+        """Redraw one (day, meal_type) cell from the grid model"""
+        widgets = self.meal_cell_widgets[(day, meal_type)]
+        cell = self.meal_plan_grid.cell(day, meal_type)
+
+        if cell:
+            widgets["empty"].pack_forget()
+            widgets["recipe"].configure(text=cell[1])
+            widgets["recipe"].pack(pady=5)
+            widgets["remove"].pack(pady=(5, 10))
+        else:
+            widgets["recipe"].pack_forget()
+            widgets["remove"].pack_forget()
+            widgets["empty"].pack(pady=20)
 
     def remove_from_meal_plan(self, day, meal_type):
         """Remove meal from plan"""
@@ -811,67 +1228,124 @@ class RecipePlannerApp:
             if success:
                 messagebox.showinfo("Success", "Meal removed from plan!")
                 self.refresh_meal_plan()
+                self.mark_data_changed("meal_plan")
             else:
                 messagebox.showerror("Error", "Failed to remove meal!")
 
     def show_shopping_list_page(self):
         """Show shopping list page"""
-        self.clear_content_frame()
+        page = self.open_page("shopping_list")
+        if page is None:
+            return
 
         # Title
-        title = ctk.CTkLabel(self.content_frame, text="Shopping List",
+        title = ctk.CTkLabel(page, text="Shopping List",
                              font=ctk.CTkFont(size=24, weight="bold"))
         title.pack(pady=20)
 
         # Buttons frame
-        buttons_frame = ctk.CTkFrame(self.content_frame)
+        buttons_frame = ctk.CTkFrame(page)
         buttons_frame.pack(fill="x", padx=20, pady=10)
 
         refresh_btn = ctk.CTkButton(buttons_frame, text="Refresh List", command=self.refresh_shopping_list)
         refresh_btn.pack(side="left", padx=10, pady=10)
 
+        ctk.CTkLabel(buttons_frame, text="Household:", font=ctk.CTkFont(weight="bold")).pack(side="left", padx=(20, 5))
+        household_entry = ctk.CTkEntry(buttons_frame, textvariable=self.household_size_var, width=60)
+        household_entry.pack(side="left", padx=5)
+        household_entry.bind("<Return>", lambda event: self.refresh_shopping_list())
+
         export_btn = ctk.CTkButton(buttons_frame, text="Export to Excel", command=self.export_shopping_list)
         export_btn.pack(side="right", padx=10, pady=10)
 
         # Shopping list display
-        self.shopping_list_frame = ctk.CTkScrollableFrame(self.content_frame)
+        self.shopping_list_frame = ctk.CTkScrollableFrame(page)
         self.shopping_list_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
 
         self.refresh_shopping_list()
 
     def refresh_shopping_list(self):
-        """Refresh shopping list display"""
+        """Reload plan requirements and pantry stock, then display the netted list"""
+        household_size = self.parse_positive_int(self.household_size_var.get())
+        requirements = self.db.get_plan_requirements(household_size)
+        stock = [(item[1], item[3], item[2]) for item in self.db.get_pantry_items()]
+        self.shopping_netter = ShoppingListNetter(requirements, stock)
+        self.display_shopping_list()
+
+    def display_shopping_list(self):
+        """Display the netted shopping list"""
         # Clear existing widgets
         for widget in self.shopping_list_frame.winfo_children():
             widget.destroy()
+        self.shopping_rows = {}
+        self.shopping_rows_frame = None
 
-        ingredients = self.db.get_shopping_list()
+        ingredients = self.shopping_netter.items()
 
         if not ingredients:
-            no_list_label = ctk.CTkLabel(self.shopping_list_frame, text="No ingredients found! Plan some meals first.",
+            no_list_label = ctk.CTkLabel(self.shopping_list_frame,
+                                         text="Nothing to buy! Plan some meals or check your pantry.",
                                          font=ctk.CTkFont(size=16))
             no_list_label.pack(pady=50)
             return
 
         # Display ingredients
-        list_frame = ctk.CTkFrame(self.shopping_list_frame)
-        list_frame.pack(fill="x", padx=20, pady=20)
-
-        title_label = ctk.CTkLabel(list_frame, text=f"Shopping List ({len(ingredients)} items)",
-                                   font=ctk.CTkFont(size=18, weight="bold"))
-        title_label.pack(pady=15)
-
-        for i, ingredient in enumerate(ingredients, 1):
-            ingredient_frame = ctk.CTkFrame(list_frame)
+        self.shopping_rows_frame = ctk.CTkFrame(self.shopping_list_frame)
+        self.shopping_rows_frame.pack(fill="x", padx=20, pady=20)
+
+        self.shopping_title_label = ctk.CTkLabel(self.shopping_rows_frame, text="",
+                                                 font=ctk.CTkFont(size=18, weight="bold"))
+        self.shopping_title_label.pack(pady=15)
+
+        for name, unit, _ in ingredients:
+            self.build_shopping_row((name, unit))
+        self.number_shopping_rows()
+
+    def build_shopping_row(self, key, before=None):
+        """Create the row widgets for one shopping list item"""
+        ingredient_frame = ctk.CTkFrame(self.shopping_rows_frame)
+        if before is not None:
+            ingredient_frame.pack(fill="x", padx=10, pady=2, before=before)
+        else:
             ingredient_frame.pack(fill="x", padx=10, pady=2)
 
-            ingredient_label = ctk.CTkLabel(ingredient_frame, text=f"{i}. {ingredient}",
-                                            font=ctk.CTkFont(size=14))
-            ingredient_label.pack(side="left", padx=15, pady=8)
+        ingredient_label = ctk.CTkLabel(ingredient_frame, text="", font=ctk.CTkFont(size=14))
+        ingredient_label.pack(side="left", padx=15, pady=8)
+        self.shopping_rows[key] = {"frame": ingredient_frame, "label": ingredient_label}
+
+    def number_shopping_rows(self):
+        """Set the title and each row's numbered text from the netter"""
+        household_size = self.parse_positive_int(self.household_size_var.get())
+        self.shopping_title_label.configure(
+            text=f"Shopping List ({len(self.shopping_rows)} items, household of {household_size})")
+        for i, key in enumerate(sorted(self.shopping_rows), 1):
+            text = f"{i}. {format_net_item(*key, self.shopping_netter.net[key])}"
+            if self.shopping_rows[key]["label"].cget("text") != text:
+                self.shopping_rows[key]["label"].configure(text=text)
+
+    def update_shopping_rows(self, keys):
+        """Add, remove or relabel the rows of the given items only"""
+        if self.shopping_rows_frame is None or not self.shopping_netter.net:
+            # The list switches between empty and non-empty: rebuild it
+            self.display_shopping_list()
+            return
+
+        for key in sorted(keys):
+            if key not in self.shopping_netter.net:
+                if key in self.shopping_rows:
+                    self.shopping_rows.pop(key)["frame"].destroy()
+            elif key not in self.shopping_rows:
+                following = next((self.shopping_rows[other]["frame"] for other in sorted(self.shopping_rows)
+                                  if other > key), None)
+                self.build_shopping_row(key, before=following)
+        self.number_shopping_rows()
 
     def export_shopping_list(self):
         """Export shopping list to Excel"""
-        ingredients = self.db.get_shopping_list()
+        if self.shopping_netter:
+            ingredients = self.shopping_netter.formatted()
+        else:
+            ingredients = self.db.get_shopping_list(self.parse_positive_int(self.household_size_var.get()))
 
         if not ingredients:
             messagebox.showerror("Error", "No ingredients to export!")
@@ -897,30 +1371,189 @@ class RecipePlannerApp:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export: {str(e)}")
 
+    def apply_stock_change(self, name, unit, quantity):
+        """Re-net only the changed item and redraw its shopping list rows if they are shown"""
+        if not self.shopping_netter:
+            return
+        changed = self.shopping_netter.set_stock(name, unit, quantity)
+        if changed and self.shopping_list_frame and self.shopping_list_frame.winfo_exists():
+            self.update_shopping_rows(changed)
+
+    def show_pantry_page(self):
+        """Show pantry inventory page"""
+        page = self.open_page("pantry")
+        if page is None:
+            return
+
+        # Title
+        title = ctk.CTkLabel(page, text="Pantry",
+                             font=ctk.CTkFont(size=24, weight="bold"))
+        title.pack(pady=20)
+
+        # Add item form
+        form_frame = ctk.CTkFrame(page)
+        form_frame.pack(fill="x", padx=20, pady=10)
+
+        self.pantry_item_var = tk.StringVar()
+        ctk.CTkLabel(form_frame, text="Add stock:", font=ctk.CTkFont(weight="bold")).pack(side="left", padx=10)
+        item_entry = ctk.CTkEntry(form_frame, textvariable=self.pantry_item_var, width=250,
+                                  placeholder_text="e.g. 500 g flour")
+        item_entry.pack(side="left", padx=5, pady=10)
+        item_entry.bind("<Return>", lambda event: self.add_pantry_item())
+
+        add_btn = ctk.CTkButton(form_frame, text="Add", command=self.add_pantry_item)
+        add_btn.pack(side="left", padx=5)
+
+        # Bulk stock update
+        bulk_frame = ctk.CTkFrame(page)
+        bulk_frame.pack(fill="x", padx=20, pady=10)
+
+        ctk.CTkLabel(bulk_frame, text="Bulk stock take (one item per line, sets the quantity):",
+                     font=ctk.CTkFont(weight="bold")).pack(anchor="w", padx=10, pady=(10, 5))
+        self.bulk_stock_textbox = ctk.CTkTextbox(bulk_frame, height=80)
+        self.bulk_stock_textbox.pack(fill="x", padx=10, pady=(0, 5))
+
+        bulk_btn = ctk.CTkButton(bulk_frame, text="Set Stock", command=self.bulk_update_stock)
+        bulk_btn.pack(anchor="e", padx=10, pady=(0, 10))
+
+        # Pantry list
+        self.pantry_list_frame = ctk.CTkScrollableFrame(page)
+        self.pantry_list_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
+
+        self.refresh_pantry()
+
+    def refresh_pantry(self):
+        """Refresh pantry list display"""
+        for widget in self.pantry_list_frame.winfo_children():
+            widget.destroy()
+
+        items = self.db.get_pantry_items()
+
+        if not items:
+            no_items_label = ctk.CTkLabel(self.pantry_list_frame, text="Your pantry is empty!",
+                                          font=ctk.CTkFont(size=16))
+            no_items_label.pack(pady=50)
+            return
+
+        for item in items:
+            item_frame = ctk.CTkFrame(self.pantry_list_frame)
+            item_frame.pack(fill="x", padx=10, pady=2)
+
+            ctk.CTkLabel(item_frame, text=item[1], font=ctk.CTkFont(size=14), width=250,
+                         anchor="w").pack(side="left", padx=15, pady=8)
+
+            quantity_var = tk.StringVar(value=f"{item[2]:g}")
+            ctk.CTkEntry(item_frame, textvariable=quantity_var, width=80).pack(side="left", padx=5)
+            ctk.CTkLabel(item_frame, text=item[3]).pack(side="left", padx=5)
+
+            delete_btn = ctk.CTkButton(item_frame, text="Delete", width=80, fg_color="red", hover_color="darkred",
+                                       command=lambda i=item: self.delete_pantry_item(i))
+            delete_btn.pack(side="right", padx=5)
+
+            update_btn = ctk.CTkButton(item_frame, text="Update", width=80,
+                                       command=lambda i=item, v=quantity_var: self.update_pantry_item(i, v))
+            update_btn.pack(side="right", padx=5)
+
+    def add_pantry_item(self):
+        """Add stock from the pantry form"""
+        entry = parse_stock_line(self.pantry_item_var.get())
+        if not entry:
+            messagebox.showerror("Error", "Enter a quantity and item, e.g. '500 g flour'!")
+            return
+
+        name, quantity, unit = entry
+        if self.db.add_pantry_item(name, quantity, unit):
+            self.pantry_item_var.set("")
+            if self.shopping_netter:
+                self.apply_stock_change(name, unit, self.shopping_netter.stock.get((name, unit), 0) + quantity)
+            self.refresh_pantry()
+        else:
+            messagebox.showerror("Error", "Failed to add pantry item!")
+
+    def update_pantry_item(self, item, quantity_var):
+        """Save an edited pantry quantity"""
+        try:
+            quantity = float(quantity_var.get())
+        except ValueError:
+            messagebox.showerror("Error", "Quantity must be a number!")
+            return
+
+        if self.db.update_pantry_item(item[0], quantity):
+            self.apply_stock_change(item[1], item[3], quantity)
+        else:
+            messagebox.showerror("Error", "Failed to update pantry item!")
+
+    def delete_pantry_item(self, item):
+        """Delete a pantry item"""
+        if self.db.delete_pantry_item(item[0]):
+            self.apply_stock_change(item[1], item[3], None)
+            self.refresh_pantry()
+        else:
+            messagebox.showerror("Error", "Failed to delete pantry item!")
+
+    def bulk_update_stock(self):
+        """Set stock for every line in the bulk textbox"""
+        lines = self.bulk_stock_textbox.get("1.0", "end-1c").splitlines()
+        entries = [entry for entry in (parse_stock_line(line) for line in lines if line.strip()) if entry]
+
+        if not entries:
+            messagebox.showerror("Error", "No valid items found!")
+            return
+
+        if self.db.bulk_update_stock(entries):
+            for name, quantity, unit in entries:
+                self.apply_stock_change(name, unit, quantity)
+            self.bulk_stock_textbox.delete("1.0", "end")
+            self.refresh_pantry()
+            messagebox.showinfo("Success", f"Updated {len(entries)} pantry items!")
+        else:
+            messagebox.showerror("Error", "Failed to update stock!")
+
     def show_analytics_page(self):
         """Show analytics page"""
-        self.clear_content_frame()
+        page = self.open_page("analytics")
+        if page is None:
+            return
 
         # Title
-        title = ctk.CTkLabel(self.content_frame, text="Recipe Analytics",
+        title = ctk.CTkLabel(page, text="Recipe Analytics",
                              font=ctk.CTkFont(size=24, weight="bold"))
         title.pack(pady=20)
 
         # Create notebook for different charts
-        notebook = ctk.CTkTabview(self.content_frame)
-        notebook.pack(fill="both", expand=True, padx=20, pady=10)
+        self.analytics_notebook = ctk.CTkTabview(page)
+        self.analytics_notebook.pack(fill="both", expand=True, padx=20, pady=10)
+        self.analytics_notebook.add("Recipe Categories")
+        self.analytics_notebook.add("Meal Distribution")
+        self.analytics_notebook.add("Cuisine Types")
+        self.analytics_notebook.add("Trends")
+
+        self.refresh_analytics()
+
+    def refresh_analytics(self):
+        """Redraw the analytics charts"""
+        for tab in ("Recipe Categories", "Meal Distribution", "Cuisine Types", "Trends"):
+            for widget in self.analytics_notebook.tab(tab).winfo_children():
+                widget.destroy()
 
         # Recipe Categories Chart
-        notebook.add("Recipe Categories")
-        self.create_recipe_categories_chart(notebook.tab("Recipe Categories"))
+        self.create_recipe_categories_chart(self.analytics_notebook.tab("Recipe Categories"))
 
         # Meal Plan Distribution
-        notebook.add("Meal Distribution")
-        self.create_meal_distribution_chart(notebook.tab("Meal Distribution"))
+        self.create_meal_distribution_chart(self.analytics_notebook.tab("Meal Distribution"))
 
         # Cuisine Distribution
-        notebook.add("Cuisine Types")
-        self.create_cuisine_chart(notebook.tab("Cuisine Types"))
+        self.create_cuisine_chart(self.analytics_notebook.tab("Cuisine Types"))
+
+        # Meal history trends
+        self.create_trend_chart(self.analytics_notebook.tab("Trends"))
+
+    def refresh_trend_chart(self):
+        """Redraw only the trend tab, e.g. after choosing another period"""
+        parent = self.analytics_notebook.tab("Trends")
+        for widget in parent.winfo_children():
+            widget.destroy()
+        self.create_trend_chart(parent)
 
     def create_recipe_categories_chart(self, parent):
         """Create pie chart for recipe categories"""
@@ -945,6 +1578,8 @@ class RecipePlannerApp:
         # Embed chart in tkinter
         canvas = FigureCanvasTkAgg(fig, parent)
         canvas.draw()
+        # The canvas keeps the figure; unregister it from pyplot so it is freed with the widget
+        plt.close(fig)
         canvas.get_tk_widget().pack(fill="both", expand=True, padx=20, pady=20)
 
     def create_meal_distribution_chart(self, parent):
@@ -978,6 +1613,7 @@ class RecipePlannerApp:
         # Embed chart in tkinter
         canvas = FigureCanvasTkAgg(fig, parent)
         canvas.draw()
+        plt.close(fig)
         canvas.get_tk_widget().pack(fill="both", expand=True, padx=20, pady=20)
 
     def create_cuisine_chart(self, parent):
@@ -1005,11 +1641,76 @@ class RecipePlannerApp:
         # Embed chart in tkinter
         canvas = FigureCanvasTkAgg(fig, parent)
         canvas.draw()
+        plt.close(fig)
         canvas.get_tk_widget().pack(fill="both", expand=True, padx=20, pady=20)
 
+    def create_trend_chart(self, parent):
+        """Create cuisine mix and average cook time charts from the meal history rollups"""
+        selector = ctk.CTkSegmentedButton(parent, values=list(TREND_PERIODS), variable=self.trend_period_var,
+                                          command=lambda value: self.refresh_trend_chart())
+        selector.pack(pady=(10, 0))
+
+        period = TREND_PERIODS[self.trend_period_var.get()]
+        today = datetime.now().date()
+        since = trend_window(today, period)
+        rows = self.db.get_meal_trend(period, since)
+
+        if not rows:
+            no_data_label = ctk.CTkLabel(parent, text="No meal history yet!\nPlanned meals are recorded day by day.",
+                                         font=ctk.CTkFont(size=16))
+            no_data_label.pack(pady=50)
+            return
+
+        starts = period_range(since, today, period)
+        series, average_cook_time = build_trend(rows, starts)
+        positions = range(len(starts))
+
+        # Cuisine mix as stacked bars, average cook time underneath
+        fig, (mix_ax, cook_ax) = plt.subplots(2, 1, figsize=(8, 6), sharex=True,
+                                              gridspec_kw={"height_ratios": [3, 1]})
+        bottom = [0] * len(starts)
+        colors = plt.cm.Set3(range(len(series)))
+        for color, (cuisine, meals) in zip(colors, series.items()):
+            mix_ax.bar(positions, meals, bottom=bottom, label=cuisine, color=color)
+            bottom = [total + count for total, count in zip(bottom, meals)]
+        mix_ax.set_title('Planned Meals by Cuisine', fontsize=16, fontweight='bold')
+        mix_ax.set_ylabel('Number of Meals')
+        mix_ax.legend(fontsize=8, loc='upper left')
+
+        cook_ax.plot(positions, [float('nan') if value is None else value for value in average_cook_time],
+                     marker='o', markersize=3)
+        cook_ax.set_ylabel('Avg cook time (min)')
+        step = max(1, len(starts) // 12)
+        cook_ax.set_xticks(list(positions)[::step])
+        cook_ax.set_xticklabels([start.strftime(TREND_LABEL_FORMATS[period]) for start in starts[::step]],
+                                rotation=45, ha='right')
+        fig.tight_layout()
+
+        # Embed chart in tkinter
+        canvas = FigureCanvasTkAgg(fig, parent)
+        canvas.draw()
+        plt.close(fig)
+        canvas.get_tk_widget().pack(fill="both", expand=True, padx=20, pady=(10, 0))
+
+        # Most planned recipes and ingredient demand over the same window
+        household_size = self.parse_positive_int(self.household_size_var.get())
+        top_recipes = self.db.get_top_planned_recipes(period, since, limit=5)
+        demand = self.db.get_ingredient_demand(period, since, limit=8)
+        summary = "Most planned: " + ", ".join(f"{name} ({meals})" for _, name, meals in top_recipes)
+        if demand:
+            summary += (f"\nIngredient demand for {household_size} "
+                        f"{'person' if household_size == 1 else 'people'}: "
+                        + ", ".join(format_net_item(name, unit, quantity * household_size)
+                                    for name, unit, quantity, _ in demand))
+        summary_label = ctk.CTkLabel(parent, text=summary, wraplength=800, justify="left")
+        summary_label.pack(pady=10, padx=20, anchor="w")
+
     def run(self):
         """Run the application"""
         self.root.mainloop()
+        self.photo_cache.shutdown()
+        if self.diagnostics is not None:
+            print(format_report(self.diagnostics.report()))
 
 
 # Database setup instructions
@@ -1033,8 +1734,9 @@ def show_setup_instructions():
        - Execute: CREATE DATABASE recipe_planner;
 
     3. Update the database connection settings in the code:
-       - Open the DatabaseManager class
-       - Update host, user, and password in connect_database() method
+       - Open database.py
+       - Update host, user, and password in DB_CONFIG (or set the
+         RECIPE_PLANNER_DB_HOST/_NAME/_USER/_PASSWORD environment variables)
        - Default settings:
          * Host: localhost
          * Database: recipe_planner
@@ -1047,11 +1749,14 @@ def show_setup_instructions():
        - pip install matplotlib
        - pip install pandas
        - pip install openpyxl
+       - pip install numpy
+       - pip install pillow  (optional, for recipe photos)
 
     5. Run the application:
        - python recipe_planner.py
 
-    The application will automatically create the required tables on first run.
+    The application will automatically create the required tables on first run
+    and apply any pending schema migrations on later runs.
 
     🚀 FEATURES INCLUDED:
     ✅ Add, edit, delete, and search recipes
@@ -1065,6 +1770,19 @@ def show_setup_instructions():
     📊 BONUS FEATURES:
     ✅ Recipe categorization and cuisine types
     ✅ Cook time tracking
+    ✅ Recipe scaling and nutrition totals
+    ✅ Pantry inventory netted from the shopping list
+    ✅ Separate recipes and plans per household
+    ✅ Works offline from a local replica, syncing when MySQL is reachable
+    ✅ Several app instances on one database pick up each other's edits within seconds
+    ✅ Headless CLI (planner_cli.py) for scripted exports and nightly batch runs
+    ✅ Local HTTP/JSON API (api_server.py) for POS and kiosk screens
+    ✅ Recipe photos with cached thumbnails
+    ✅ Recipe edit history with restore of older versions and deleted recipes
+    ✅ Streaming backup and restore (planner_cli.py backup / restore)
+    ✅ Meal history with daily, weekly and monthly trend charts
+    ✅ Leak diagnostics (RECIPE_PLANNER_DIAGNOSTICS=1, python diagnostics.py)
+    ✅ Duplicate recipe detection and merging (planner_cli.py dedupe)
     ✅ Advanced search functionality
     ✅ Weekly meal plan overview
     ✅ Data visualization with matplotlib
@@ -0,0 +1,371 @@
+"""Local HTTP/JSON API over DatabaseManager for POS and kiosk screens
+
+    python api_server.py --port 8080 --pool-size 8
+
+Endpoints (GET only):
+
+    /health
+    /api/tenants
+    /api/tenants/<id>/recipes?q=pasta&by=name     streamed in chunks (by=fuzzy is ranked)
+    /api/tenants/<id>/meal-plan
+    /api/tenants/<id>/shopping-list?household=4
+
+Every response carries an ETag derived from the tenant's data version, so
+clients sending If-None-Match get a 304 without the data being re-read.
+Small responses are also kept in an in-memory cache keyed by that ETag.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from database import DatabaseManager, RECIPE_COLUMNS
+
+RECIPE_FIELDS = [column.strip() for column in RECIPE_COLUMNS.split(",")]
+MEAL_PLAN_FIELDS = ["day", "meal_type", "recipe_name", "recipe_id", "ingredients", "servings"]
+
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+# How long a tenant's data version, and the list of tenants, is trusted before it is re-read
+VERSION_TTL = 1.0
+RESPONSE_CACHE_SIZE = 256
+STREAM_BATCH_SIZE = 500
+
+
+class HTTPError(Exception):
+    """Error that is returned to the client as a JSON error response"""
+
+    def __init__(self, status, message=""):
+        super().__init__(message)
+        self.status = status
+        self.message = message or STATUS_TEXT.get(status, "")
+
+
+class ConnectionPool:
+    """Fixed set of DatabaseManager connections used from a thread pool"""
+
+    def __init__(self, size):
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="db")
+        self.idle = asyncio.Queue()
+
+    async def open(self):
+        """Open the connections; only the first one applies migrations
+
+        The API only reads, so connections autocommit and every query sees
+        the latest committed data.
+        """
+        loop = asyncio.get_running_loop()
+        for i in range(self.size):
+            db = await loop.run_in_executor(self.executor, lambda migrate=(i == 0): DatabaseManager(
+                migrate=migrate, autocommit=True))
+            self.idle.put_nowait(db)
+
+    async def acquire(self):
+        """Take a connection, reconnecting it if the server dropped it"""
+        db = await self.idle.get()
+        if not db.is_connected():
+            await asyncio.get_running_loop().run_in_executor(self.executor, db.connect_database)
+        if not db.is_connected():
+            self.idle.put_nowait(db)
+            raise HTTPError(503, "database unavailable")
+        return db
+
+    def release(self, db):
+        """Return a connection to the pool"""
+        self.idle.put_nowait(db)
+
+    async def run(self, tenant_id, func, *args):
+        """Run func(tenant manager, *args) on a pooled connection"""
+        db = await self.acquire()
+        try:
+            manager = db.for_tenant(tenant_id) if tenant_id is not None else db
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, manager, *args)
+        finally:
+            self.release(db)
+
+    async def close(self):
+        """Close every idle connection and stop the worker threads"""
+        while not self.idle.empty():
+            db = self.idle.get_nowait()
+            if db.connection:
+                db.connection.close()
+        self.executor.shutdown(wait=False)
+
+
+class PlannerAPI:
+    """Routes requests to the pool and handles caching"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        # Only known tenants get a version entry, so this stays as small as the tenant list
+        self.versions = {}
+        self.tenants = None
+        self.responses = OrderedDict()
+
+    async def tenant_ids(self):
+        """Ids of the existing tenants, re-read at most once per VERSION_TTL"""
+        now = time.monotonic()
+        if self.tenants is None or now - self.tenants[1] >= VERSION_TTL:
+            tenants = await self.pool.run(None, lambda db: db.get_tenants())
+            if not tenants:
+                # There is always a default tenant, so an empty list means the query failed
+                raise HTTPError(503, "database unavailable")
+            ids = {tenant_id for tenant_id, _ in tenants}
+            self.tenants = (ids, now)
+            for tenant_id in set(self.versions) - ids:
+                del self.versions[tenant_id]
+        return self.tenants[0]
+
+    async def data_version(self, tenant_id):
+        """Tenant data version, re-read at most once per VERSION_TTL"""
+        cached = self.versions.get(tenant_id)
+        now = time.monotonic()
+        if cached and now - cached[1] < VERSION_TTL:
+            return cached[0]
+        version = await self.pool.run(tenant_id, lambda db: db.get_data_version())
+        self.versions[tenant_id] = (version, now)
+        return version
+
+    @staticmethod
+    def make_etag(*parts):
+        """Strong ETag from the version token and request parameters"""
+        return '"' + hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:20] + '"'
+
+    def cache_get(self, etag):
+        """Cached body for an ETag, refreshing its LRU position"""
+        body = self.responses.get(etag)
+        if body is not None:
+            self.responses.move_to_end(etag)
+        return body
+
+    def cache_put(self, etag, body):
+        """Cache a body, evicting the least recently used entry when full"""
+        self.responses[etag] = body
+        if len(self.responses) > RESPONSE_CACHE_SIZE:
+            self.responses.popitem(last=False)
+
+    async def handle(self, method, target, headers, writer):
+        """Dispatch one request and write the response"""
+        if method != "GET":
+            raise HTTPError(405)
+
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if parts == ["health"]:
+            return await send_json(writer, 200, {"status": "ok"})
+        if parts == ["api", "tenants"]:
+            tenants = await self.pool.run(None, lambda db: db.get_tenants())
+            return await send_json(writer, 200, [{"tenant_id": t, "name": n} for t, n in tenants])
+        if len(parts) != 4 or parts[:2] != ["api", "tenants"] or not parts[2].isdigit():
+            raise HTTPError(404)
+
+        tenant_id = int(parts[2])
+        resource = parts[3]
+        if resource not in ("recipes", "meal-plan", "shopping-list"):
+            raise HTTPError(404)
+        if tenant_id not in await self.tenant_ids():
+            raise HTTPError(404, "unknown tenant")
+
+        version = await self.data_version(tenant_id)
+        if version is None:
+            raise HTTPError(503, "database unavailable")
+        etag = self.make_etag(tenant_id, version, url.path, sorted(query.items()))
+        if headers.get("if-none-match") == etag:
+            return await send_response(writer, 304, b"", etag=etag)
+
+        if resource == "recipes":
+            return await self.stream_recipes(writer, tenant_id, query, etag)
+
+        body = self.cache_get(etag)
+        if body is None:
+            if resource == "meal-plan":
+                rows = await self.pool.run(tenant_id, lambda db: db.get_meal_plan())
+                data = [dict(zip(MEAL_PLAN_FIELDS, row)) for row in rows]
+            else:
+                household = parse_household(query)
+                rows = await self.pool.run(tenant_id, lambda db: db.get_net_shopping_list(household))
+                data = [{"name": name, "unit": unit, "quantity": round(float(quantity), 2)}
+                        for name, unit, quantity in rows]
+            body = json.dumps(data, default=str).encode()
+            self.cache_put(etag, body)
+        await send_response(writer, 200, body, etag=etag)
+
+    async def stream_recipes(self, writer, tenant_id, query, etag):
+        """Stream a recipe listing as a chunked JSON array, one batch per chunk"""
+        search_type = query.get("by", "name")
+        if search_type == "fuzzy":
+            # Ranked results are capped, so they are sent whole
+            rows = await self.pool.run(tenant_id, lambda db: db.fuzzy_search_recipes(query.get("q", "")))
+            body = json.dumps([dict(zip(RECIPE_FIELDS, row)) for row in rows], default=str).encode()
+            return await send_response(writer, 200, body, etag=etag)
+        if search_type not in ("name", "category", "ingredient"):
+            raise HTTPError(400, "by must be name, category, ingredient or fuzzy")
+
+        loop = asyncio.get_running_loop()
+        db = await self.pool.acquire()
+        batches = db.for_tenant(tenant_id).iter_recipes(query.get("q"), search_type, STREAM_BATCH_SIZE)
+        try:
+            # Read the first batch before answering, so a query that fails outright gets an error response
+            rows = await loop.run_in_executor(self.pool.executor, next, batches, None)
+            writer.write(response_head(200, etag=etag, chunked=True))
+            separator = b"["
+            try:
+                while rows is not None:
+                    chunk = b",".join(json.dumps(dict(zip(RECIPE_FIELDS, row)), default=str).encode()
+                                      for row in rows)
+                    writer.write(encode_chunk(separator + chunk))
+                    separator = b","
+                    await writer.drain()
+                    rows = await loop.run_in_executor(self.pool.executor, next, batches, None)
+            except Exception as e:
+                # Part of the listing is out: drop the connection without the terminating chunk,
+                # so the client sees a broken transfer rather than a complete, cacheable list
+                print(f"Error streaming recipes: {e!r}")
+                writer.transport.abort()
+                raise ConnectionAbortedError("recipe stream failed") from e
+            writer.write(encode_chunk(b"[]" if separator == b"[" else b"]"))
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            # A stream abandoned early shuts its connection down; acquire() reconnects it
+            await loop.run_in_executor(self.pool.executor, batches.close)
+            self.pool.release(db)
+
+
+def parse_household(query):
+    """Validate the household query parameter"""
+    try:
+        household = int(query.get("household", 1))
+    except ValueError:
+        raise HTTPError(400, "household must be an integer")
+    if household < 1:
+        raise HTTPError(400, "household must be positive")
+    return household
+
+
+def response_head(status, content_length=None, etag=None, chunked=False):
+    """Status line and headers for a JSON response"""
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+             "Content-Type: application/json",
+             "Cache-Control: no-cache"]
+    if etag:
+        lines.append(f"ETag: {etag}")
+    if chunked:
+        lines.append("Transfer-Encoding: chunked")
+    else:
+        lines.append(f"Content-Length: {content_length or 0}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+def encode_chunk(data):
+    """Frame data as one chunk of a chunked transfer"""
+    return f"{len(data):X}\r\n".encode() + data + b"\r\n"
+
+
+async def send_response(writer, status, body, etag=None):
+    """Write a complete response with a Content-Length"""
+    writer.write(response_head(status, len(body), etag) + body)
+    await writer.drain()
+
+
+async def send_json(writer, status, data):
+    """Write data as an uncached JSON response"""
+    await send_response(writer, status, json.dumps(data, default=str).encode())
+
+
+async def read_request(reader):
+    """Read a request line and headers; returns None when the client closed the connection"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    # Discard any request body
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length")
+    if length < 0:
+        raise HTTPError(400, "invalid Content-Length")
+    if length:
+        await reader.readexactly(length)
+    return method, target, headers
+
+
+async def handle_client(api, reader, writer):
+    """Serve requests on one keep-alive connection"""
+    try:
+        while True:
+            request = None
+            try:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers = request
+                await api.handle(method, target, headers, writer)
+            except HTTPError as e:
+                await send_json(writer, e.status, {"error": e.message})
+                if request is None:
+                    # The request could not be framed, so the rest of the stream cannot be trusted
+                    break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                raise
+            except Exception as e:
+                print(f"Error handling {request[1] if request else 'request'}: {e!r}")
+                await send_json(writer, 500, {"error": STATUS_TEXT[500]})
+                break
+            if request and request[2].get("connection", "").lower() == "close":
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port, pool_size):
+    """Open the pool and serve until interrupted"""
+    pool = ConnectionPool(pool_size)
+    await pool.open()
+    api = PlannerAPI(pool)
+    server = await asyncio.start_server(lambda r, w: handle_client(api, r, w), host, port, backlog=1024)
+    print(f"Recipe planner API listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recipe planner HTTP/JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=8, help="pooled MySQL connections")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.pool_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Streaming backup and restore of the planner database
+
+A backup is an uncompressed tar stream of gzip-compressed JSON-lines
+chunks, read from one consistent InnoDB snapshot:
+
+    header.json                   format, schema version, columns per table
+    data/<table>/000001.jsonl.gz  up to CHUNK_ROWS rows / CHUNK_BYTES each,
+                                  with a sha256 of the chunk in its pax header
+    manifest.json                 row and chunk counts per table, written last
+
+Rows are streamed from an unbuffered cursor and written chunk by chunk,
+so memory stays constant however large the catalog is. Restore verifies
+every chunk, bulk loads it with multi-row inserts while foreign key and
+unique checks are off and secondary indexes are dropped, and rebuilds the
+indexes once at the end. The load is a single transaction, so a restore
+that fails part way leaves the database as it was.
+"""
+import base64
+import gzip
+import hashlib
+import io
+import json
+import tarfile
+import time
+from datetime import datetime, timezone
+
+from mysql.connector import Error
+
+FORMAT_VERSION = 1
+CHUNK_ROWS = 5000
+CHUNK_BYTES = 4 * 1024 * 1024
+# Not backed up: the migration ledger belongs to the target schema and the
+# change feed is per database (restore starts a fresh one)
+EXCLUDED_TABLES = {"schema_migrations", "change_log"}
+
+
+class BackupError(Exception):
+    """The archive is damaged, incomplete or does not fit the target database"""
+
+
+def encode_value(value):
+    """JSON form of column values json cannot encode itself"""
+    if isinstance(value, (bytes, bytearray)):
+        return {"$b": base64.b64encode(value).decode("ascii")}
+    return str(value)
+
+
+def decode_object(obj):
+    """Undo encode_value for BLOB values"""
+    if len(obj) == 1 and "$b" in obj:
+        return base64.b64decode(obj["$b"])
+    return obj
+
+
+def backup_tables(cursor):
+    """Base tables of the current database that are backed up"""
+    cursor.execute("""SELECT TABLE_NAME FROM information_schema.TABLES
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' ORDER BY TABLE_NAME""")
+    return [row[0] for row in cursor.fetchall() if row[0] not in EXCLUDED_TABLES]
+
+
+def table_columns(cursor, table):
+    cursor.execute(f"SELECT * FROM `{table}` LIMIT 0")
+    cursor.fetchall()
+    return list(cursor.column_names)
+
+
+def schema_version(cursor):
+    cursor.execute("SELECT MAX(version) FROM schema_migrations")
+    return cursor.fetchone()[0]
+
+
+def add_member(tar, name, data, pax_headers=None):
+    """Append one in-memory member to a tar stream"""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    info.pax_headers = pax_headers or {}
+    tar.addfile(info, io.BytesIO(data))
+
+
+def backup_database(connection, fileobj, progress=print):
+    """Stream a consistent snapshot of every table to fileobj; returns the manifest"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SET SESSION time_zone = '+00:00'")
+        # End any implicit transaction so the snapshot is taken now
+        connection.commit()
+        connection.start_transaction(consistent_snapshot=True, isolation_level="REPEATABLE READ", readonly=True)
+        tables = backup_tables(cursor)
+        columns = {}
+        for table in tables:
+            columns[table] = table_columns(cursor, table)
+        cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM change_log")
+        change_id = cursor.fetchone()[0]
+
+        header = {"format": FORMAT_VERSION, "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                  "schema_version": schema_version(cursor), "change_id": change_id, "columns": columns}
+        manifest = {"tables": {}}
+        with tarfile.open(fileobj=fileobj, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+            add_member(tar, "header.json", json.dumps(header, indent=2).encode("utf-8"))
+            for table in tables:
+                rows, chunks = 0, 0
+                cursor.execute(f"SELECT {', '.join(f'`{column}`' for column in columns[table])} FROM `{table}`")
+                lines, size = [], 0
+                while True:
+                    batch = cursor.fetchmany(1000)
+                    for row in batch:
+                        line = json.dumps(row, default=encode_value, ensure_ascii=False).encode("utf-8")
+                        lines.append(line)
+                        size += len(line) + 1
+                        if len(lines) >= CHUNK_ROWS or size >= CHUNK_BYTES:
+                            chunks += 1
+                            write_chunk(tar, table, chunks, lines)
+                            rows += len(lines)
+                            lines, size = [], 0
+                    if not batch:
+                        break
+                if lines:
+                    chunks += 1
+                    write_chunk(tar, table, chunks, lines)
+                    rows += len(lines)
+                manifest["tables"][table] = {"rows": rows, "chunks": chunks}
+                progress(f"{table}: {rows} rows in {chunks} chunks")
+            add_member(tar, "manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
+        connection.commit()
+        return manifest
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def write_chunk(tar, table, number, lines):
+    """Compress and append one chunk with its checksum"""
+    data = gzip.compress(b"\n".join(lines) + b"\n", compresslevel=6)
+    add_member(tar, f"data/{table}/{number:06d}.jsonl.gz", data,
+               {"sha256": hashlib.sha256(data).hexdigest(), "rows": str(len(lines))})
+
+
+def read_member(tar, member):
+    data = tar.extractfile(member).read()
+    if len(data) != member.size:
+        raise BackupError(f"{member.name} is truncated")
+    return data
+
+
+def secondary_indexes(cursor, table):
+    """{index: 'INDEX (cols)' / 'UNIQUE (cols)'} for indexes that can be dropped during a bulk load
+
+    Indexes backing a foreign key cannot be dropped and are kept.
+    """
+    cursor.execute("""SELECT INDEX_NAME, NON_UNIQUE, COLUMN_NAME, SUB_PART FROM information_schema.STATISTICS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY'
+                      ORDER BY INDEX_NAME, SEQ_IN_INDEX""", (table,))
+    indexes = {}
+    for index, non_unique, column, sub_part in cursor.fetchall():
+        kind, columns = indexes.setdefault(index, ("INDEX" if non_unique else "UNIQUE", []))
+        columns.append(f"`{column}`" + (f"({sub_part})" if sub_part else ""))
+
+    cursor.execute("""SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND REFERENCED_TABLE_NAME IS NOT NULL""",
+                   (table,))
+    foreign_key_columns = {f"`{row[0]}`" for row in cursor.fetchall()}
+    return {index: f"{kind} ({', '.join(columns)})" for index, (kind, columns) in indexes.items()
+            if columns[0] not in foreign_key_columns}
+
+
+def add_indexes(cursor, table, indexes):
+    cursor.execute(f"ALTER TABLE `{table}` "
+                   + ", ".join(f"ADD {definition.split(' ', 1)[0]} `{index}` {definition.split(' ', 1)[1]}"
+                               for index, definition in indexes.items()))
+
+
+def restore_database(connection, fileobj, replace=False, progress=print):
+    """Load a backup archive into this database's (migrated, empty) tables; returns rows per table
+
+    With replace, existing rows in the backed-up tables are deleted first.
+    The delete and all chunk loads run in one transaction, so a bad chunk
+    leaves the database as it was and its error is raised. Instances
+    following the change feed are told to reload everything.
+    """
+    cursor = connection.cursor()
+    deferred = {}
+    loaded = {}
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|") as tar:
+            members = iter(tar)
+            member = next(members, None)
+            if member is None or member.name != "header.json":
+                raise BackupError("Not a recipe planner backup: header.json must come first")
+            header = json.loads(read_member(tar, member))
+            if header.get("format") != FORMAT_VERSION:
+                raise BackupError(f"Unsupported backup format {header.get('format')}")
+            if header["schema_version"] != schema_version(cursor):
+                raise BackupError(f"Backup is of schema version {header['schema_version']}, the database is at "
+                                  f"{schema_version(cursor)}; migrate both to the same version first")
+
+            # Table and column names end up in SQL, so only names this database has are accepted
+            tables = set(backup_tables(cursor))
+            if not set(header["columns"]) <= tables:
+                unknown = set(header["columns"]) - tables
+                raise BackupError(f"Tables missing from the database: {', '.join(sorted(unknown))}")
+            for table, columns in header["columns"].items():
+                unknown = set(columns) - set(table_columns(cursor, table))
+                if unknown:
+                    raise BackupError(f"Columns missing from {table}: {', '.join(sorted(unknown))}")
+
+            cursor.execute("SET SESSION time_zone = '+00:00'")
+            for table in header["columns"]:
+                cursor.execute(f"SELECT 1 FROM `{table}` LIMIT 1")
+                if cursor.fetchall() and not replace:
+                    raise BackupError(f"Table {table} is not empty; restore into an empty database or use replace")
+
+            # Build secondary indexes once from the loaded data instead of row by row.
+            # ALTER TABLE commits implicitly, so it runs before the load transaction starts
+            for table in header["columns"]:
+                indexes = secondary_indexes(cursor, table)
+                if indexes:
+                    cursor.execute(f"ALTER TABLE `{table}` "
+                                   + ", ".join(f"DROP INDEX `{index}`" for index in indexes))
+                    deferred[table] = indexes
+
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+            cursor.execute("SET SESSION unique_checks = 0")
+            connection.commit()
+            connection.start_transaction()
+            if replace:
+                for table in header["columns"]:
+                    cursor.execute(f"DELETE FROM `{table}`")
+
+            manifest = None
+            for member in members:
+                if member.name == "manifest.json":
+                    manifest = json.loads(read_member(tar, member))
+                    break
+                _, table, _ = member.name.split("/")
+                if table not in header["columns"]:
+                    raise BackupError(f"{member.name} belongs to no table in the header")
+                data = read_member(tar, member)
+                if hashlib.sha256(data).hexdigest() != member.pax_headers.get("sha256"):
+                    raise BackupError(f"Checksum mismatch in {member.name}")
+
+                rows = [json.loads(line, object_hook=decode_object) for line in gzip.decompress(data).splitlines()]
+                columns = header["columns"][table]
+                cursor.executemany(f"INSERT INTO `{table}` ({', '.join(f'`{column}`' for column in columns)}) "
+                                   f"VALUES ({', '.join(['%s'] * len(columns))})", rows)
+                loaded[table] = loaded.get(table, 0) + len(rows)
+
+            if manifest is None:
+                raise BackupError("Archive is truncated: manifest.json not found")
+            for table, counts in manifest["tables"].items():
+                if loaded.get(table, 0) != counts["rows"]:
+                    raise BackupError(f"{table}: loaded {loaded.get(table, 0)} rows, the backup has {counts['rows']}")
+            connection.commit()
+
+        for table in list(deferred):
+            progress(f"{table}: rebuilding {len(deferred[table])} indexes")
+            add_indexes(cursor, table, deferred[table])
+            del deferred[table]
+    except Exception:
+        connection.rollback()
+        # The rolled back tables hold their old rows again; put their indexes back
+        # without letting a failure to do so hide why the restore failed
+        for table, indexes in deferred.items():
+            try:
+                add_indexes(cursor, table, indexes)
+            except Error as e:
+                progress(f"{table}: could not rebuild indexes {', '.join(indexes)}: {e}")
+        raise
+    finally:
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.execute("SET SESSION unique_checks = 1")
+        cursor.close()
+
+    announce_restore(connection, header["change_id"])
+    for table, rows in loaded.items():
+        progress(f"{table}: {rows} rows restored")
+    return loaded
+
+
+def announce_restore(connection, change_id):
+    """Tell every tenant's change feed readers to reload after a restore"""
+    cursor = connection.cursor()
+    try:
+        # Keep new change ids above any mark a reader may still hold from before the restore
+        cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM change_log")
+        next_id = max(change_id, cursor.fetchone()[0]) + 1
+        cursor.execute(f"ALTER TABLE change_log AUTO_INCREMENT = {int(next_id)}")
+        cursor.execute("""INSERT INTO change_log (tenant_id, entity, entity_key, op)
+                          SELECT tenant_id, 'reset', '', 'reset' FROM tenants""")
+        connection.commit()
+    finally:
+        cursor.close()
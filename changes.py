@@ -0,0 +1,77 @@
+import time
+from collections import deque
+
+CHANGE_ENTITIES = ("recipe", "plan", "pantry", "photo")
+# Rows of change_log read per poll; a longer backlog is read over several polls
+CHANGE_BATCH_SIZE = 1000
+# Auto-increment ids are assigned at insert but become visible at commit, so a
+# later id can be read before an earlier one. Writes here commit well within
+# this many seconds of their insert, so readers look back that far in time.
+CHANGE_LOOKBACK_SECONDS = 30
+CHANGE_RETENTION_DAYS = 14
+
+
+def plan_key(day, meal_type):
+    """change_log key of a meal plan slot"""
+    return f"{day}|{meal_type}"
+
+
+def stock_key(name, unit):
+    """change_log key of a pantry item"""
+    return f"{name}|{unit}"
+
+
+def split_key(key):
+    """Split a plan or pantry key back into its two parts"""
+    first, _, second = key.rpartition("|")
+    return first, second
+
+
+class ChangeFeed:
+    """High-water mark over the change_log, tolerant of out-of-order commits
+
+    A change id below the mark can still commit later, but only if it was
+    assigned less than `lookback` seconds before that. So each poll reads
+    after the mark as it stood `lookback` seconds before the previous poll,
+    whatever the number of ids (of any tenant) in between. unseen() drops
+    the changes already applied and advance() moves the mark. Applying a
+    change means re-reading the row it names, so applying one twice (e.g.
+    after a restart) is harmless.
+    """
+
+    def __init__(self, hwm=0, since=None, lookback=CHANGE_LOOKBACK_SECONDS, clock=time.monotonic):
+        self.hwm = hwm
+        self.lookback = lookback
+        self.clock = clock
+        self.seen = set()
+        # (poll time, mark after it), oldest first; the first entry is where reads start
+        self.marks = deque([(float("-inf"), hwm if since is None else since)])
+
+    def since(self):
+        """Change id to read after"""
+        return self.marks[0][1]
+
+    def unseen(self, changes):
+        """The (change_id, entity, entity_key, op) rows not applied before"""
+        return [change for change in changes if change[0] not in self.seen]
+
+    def advance(self, changes, polled_at=None):
+        """Mark changes as applied and move the mark past them
+
+        polled_at is the clock() reading taken before the changes were read.
+        """
+        polled_at = self.clock() if polled_at is None else polled_at
+        self.seen.update(change[0] for change in changes)
+        if changes:
+            self.hwm = max(self.hwm, changes[-1][0])
+        self.marks.append((polled_at, self.hwm))
+        # Everything at or below a mark taken `lookback` before this poll had committed by now
+        while len(self.marks) > 1 and self.marks[1][0] <= polled_at - self.lookback:
+            self.marks.popleft()
+        self.seen = {change_id for change_id in self.seen if change_id > self.since()}
+
+    def reset(self, hwm):
+        """Start over from hwm, e.g. after a full reload"""
+        self.hwm = hwm
+        self.seen.clear()
+        self.marks = deque([(float("-inf"), hwm)])
@@ -0,0 +1,1411 @@
+import os
+
+import mysql.connector
+from mysql.connector import Error
+
+from nutrition import recipe_ingredient_rows
+from fuzzy import trigrams, recipe_terms, rank_recipes, probe_trigrams, CANDIDATE_LIMIT
+from pantry import normalize_stock, format_net_item
+from photos import photo_hash
+from revisions import REVISION_FIELDS, serialize_recipe, deserialize_recipe, encode_revision, reconstruct
+from changes import plan_key, stock_key, split_key, CHANGE_BATCH_SIZE, CHANGE_RETENTION_DAYS
+from history import ROLLUP_PERIODS, period_start
+from meal_plan_grid import day_sort_key, plan_day_for_date
+from dedupe import recipe_content_hash
+from migrations import apply_migrations, ensure_required_indexes
+
+# Connection settings; override with environment variables on servers and batch hosts
+DB_CONFIG = {
+    'host': os.environ.get('RECIPE_PLANNER_DB_HOST', 'localhost'),
+    'database': os.environ.get('RECIPE_PLANNER_DB_NAME', 'recipe_planner'),
+    'user': os.environ.get('RECIPE_PLANNER_DB_USER', 'root'),
+    'password': os.environ.get('RECIPE_PLANNER_DB_PASSWORD', 'root'),  # Change this to your MySQL password
+}
+
+DEFAULT_TENANT_ID = 1
+
+# MySQL error raised when an insert or update hits a unique key
+DUPLICATE_KEY_ERROR = 1062
+
+# Explicit column list so tuple positions don't depend on how the table was created
+RECIPE_COLUMNS = "recipe_id, name, ingredients, instructions, category, cuisine, cook_time, created_date, servings"
+
+
+class DatabaseManager:
+    def __init__(self, tenant_id=DEFAULT_TENANT_ID, connection=None, migrate=True, autocommit=False,
+                 raise_errors=False):
+        self.tenant_id = tenant_id
+        self.connection = connection
+        # Read-only users (the API) autocommit so each query sees fresh data rather
+        # than the REPEATABLE READ snapshot of a transaction that is never ended
+        self.autocommit = autocommit
+        # Writers that retry (the replica's outbox) get connector errors from the recipe, plan and
+        # stock writes raised after the rollback, so a failed write is not mistaken for a refused one
+        self.raise_errors = raise_errors
+        if connection is None:
+            self.connect_database()
+            if migrate:
+                self.create_tables()
+
+    def for_tenant(self, tenant_id):
+        """Return a manager scoped to another tenant, sharing this connection"""
+        return DatabaseManager(tenant_id, connection=self.connection, autocommit=self.autocommit,
+                               raise_errors=self.raise_errors)
+
+    def is_connected(self):
+        """Check whether the MySQL connection is usable"""
+        try:
+            return bool(self.connection) and self.connection.is_connected()
+        except Error:
+            return False
+
+    def connect_database(self):
+        """Connect to MySQL database"""
+        try:
+            self.connection = mysql.connector.connect(**DB_CONFIG, autocommit=self.autocommit)
+            print("Successfully connected to MySQL database")
+        except Error as e:
+            print(f"Error connecting to MySQL: {e}")
+
+    def create_tables(self):
+        """Apply pending schema migrations and check performance-critical indexes"""
+        if not self.connection:
+            return
+
+        try:
+            applied = apply_migrations(self.connection)
+            if applied:
+                print(f"Applied migrations: {applied}")
+
+            missing = ensure_required_indexes(self.connection)
+            if missing:
+                print(f"Rebuilt missing indexes: {missing}")
+        except (Error, RuntimeError) as e:
+            print(f"Error migrating database schema: {e}")
+
+    def _write_recipe_ingredients(self, cursor, recipe_id, ingredients):
+        """Replace the parsed ingredient rows for a recipe"""
+        cursor.execute("DELETE FROM recipe_ingredients WHERE recipe_id = %s", (recipe_id,))
+
+        rows = [(self.tenant_id, recipe_id, *row) for row in recipe_ingredient_rows(ingredients)]
+        if rows:
+            cursor.executemany("""INSERT INTO recipe_ingredients (tenant_id, recipe_id, name, quantity, unit)
+                                  VALUES (%s, %s, %s, %s, %s)""", rows)
+
+    def _log_changes(self, cursor, entity, keys, op="upsert"):
+        """Record changed rows in the change feed, in the caller's transaction"""
+        cursor.executemany("INSERT INTO change_log (tenant_id, entity, entity_key, op) VALUES (%s, %s, %s, %s)",
+                           [(self.tenant_id, entity, str(key), op) for key in keys])
+
+    def _log_pantry_item_change(self, cursor, item_id, op):
+        """Record a change to a pantry item addressed by id"""
+        cursor.execute("""INSERT INTO change_log (tenant_id, entity, entity_key, op)
+                          SELECT tenant_id, 'pantry', CONCAT(name, '|', unit), %s FROM pantry
+                          WHERE item_id = %s AND tenant_id = %s""", (op, item_id, self.tenant_id))
+
+    def _revision_chain(self, cursor, recipe_id, revision=None):
+        """Rows (revision, kind, data) from the last keyframe up to revision (default: the latest)"""
+        cursor.execute("""SELECT revision, kind, data FROM recipe_revisions
+                          WHERE recipe_id = %s AND tenant_id = %s AND revision <= %s
+                            AND revision >= (SELECT MAX(revision) FROM recipe_revisions
+                                             WHERE recipe_id = %s AND kind = 'key' AND revision <= %s)
+                          ORDER BY revision""",
+                       (recipe_id, self.tenant_id, revision or 2 ** 31 - 1, recipe_id, revision or 2 ** 31 - 1))
+        return cursor.fetchall()
+
+    def _write_recipe_revision(self, cursor, recipe_id, fields=None, marker="delete"):
+        """Append a revision with the recipe's fields, or a marker when fields is None
+
+        The marker is 'delete', or 'merge' for a duplicate folded into another
+        recipe, which is not offered for restore.
+        """
+        chain = self._revision_chain(cursor, recipe_id)
+        revision = chain[-1][0] + 1 if chain else 1
+        if fields is None:
+            kind, data = marker, b""
+        else:
+            old_text = reconstruct([(row[1], row[2]) for row in chain]) if chain else None
+            new_text = serialize_recipe(fields)
+            if new_text == old_text and chain[-1][1] in ("key", "delta"):
+                return
+            deltas = [row for row in chain if row[1] != "key"]
+            kind, data = encode_revision(old_text, new_text, sum(len(row[2]) for row in deltas), len(deltas))
+
+        cursor.execute("""INSERT INTO recipe_revisions (recipe_id, revision, tenant_id, kind, data)
+                          VALUES (%s, %s, %s, %s, %s)""", (recipe_id, revision, self.tenant_id, kind, data))
+
+    def _delete_recipe_trigrams(self, cursor, recipe_id):
+        """Remove a recipe's trigrams from the fuzzy index and its document frequencies"""
+        cursor.execute("""UPDATE trigram_stats s
+                          JOIN recipe_trigrams t ON t.tenant_id = s.tenant_id AND t.trigram = s.trigram
+                          SET s.df = s.df - 1
+                          WHERE t.recipe_id = %s""", (recipe_id,))
+        cursor.execute("DELETE FROM recipe_trigrams WHERE recipe_id = %s", (recipe_id,))
+
+    def _write_recipe_trigrams(self, cursor, recipe_id, name, ingredients):
+        """Replace a recipe's trigrams in the fuzzy index"""
+        self._delete_recipe_trigrams(cursor, recipe_id)
+
+        rows = [(self.tenant_id, gram, recipe_id) for gram in trigrams(recipe_terms(name, ingredients))]
+        if rows:
+            cursor.executemany("INSERT INTO recipe_trigrams (tenant_id, trigram, recipe_id) VALUES (%s, %s, %s)",
+                               rows)
+            cursor.executemany("""INSERT INTO trigram_stats (tenant_id, trigram, df) VALUES (%s, %s, 1)
+                                  ON DUPLICATE KEY UPDATE df = df + 1""", [row[:2] for row in rows])
+
+    def _roll_up_meals(self, cursor, served_date, meal_types):
+        """Add newly recorded meals of one date to the day, week and month rollups"""
+        slots = ", ".join(["%s"] * len(meal_types))
+        for period in ROLLUP_PERIODS:
+            params = (period, period_start(served_date, period), self.tenant_id, served_date, *meal_types)
+            cursor.execute(f"""INSERT INTO meal_rollup_recipes (tenant_id, period, period_start, recipe_id, name, meals)
+                               SELECT tenant_id, %s, %s, recipe_id, MAX(name), COUNT(*) FROM meal_history
+                               WHERE tenant_id = %s AND served_date = %s AND meal_type IN ({slots})
+                               GROUP BY tenant_id, recipe_id
+                               ON DUPLICATE KEY UPDATE meals = meals + VALUES(meals), name = VALUES(name)""",
+                           params)
+            cursor.execute(f"""INSERT INTO meal_rollup_cuisines (tenant_id, period, period_start, cuisine, meals,
+                                                                 cook_time_total, cook_time_meals)
+                               SELECT tenant_id, %s, %s, cuisine, COUNT(*), COALESCE(SUM(cook_time), 0),
+                                      COUNT(cook_time)
+                               FROM meal_history
+                               WHERE tenant_id = %s AND served_date = %s AND meal_type IN ({slots})
+                               GROUP BY tenant_id, cuisine
+                               ON DUPLICATE KEY UPDATE meals = meals + VALUES(meals),
+                                                       cook_time_total = cook_time_total + VALUES(cook_time_total),
+                                                       cook_time_meals = cook_time_meals + VALUES(cook_time_meals)""",
+                           params)
+            # Demand per serving, so it can be scaled to any household size
+            cursor.execute(f"""INSERT INTO meal_rollup_ingredients (tenant_id, period, period_start, name, unit,
+                                                                    quantity, meals)
+                               SELECT h.tenant_id, %s, %s, ri.name, ri.unit,
+                                      COALESCE(SUM(ri.quantity / GREATEST(h.servings, 1)), 0), COUNT(*)
+                               FROM meal_history h
+                               JOIN meal_history_ingredients ri ON ri.tenant_id = h.tenant_id
+                                    AND ri.served_date = h.served_date AND ri.meal_type = h.meal_type
+                               WHERE h.tenant_id = %s AND h.served_date = %s AND h.meal_type IN ({slots})
+                               GROUP BY h.tenant_id, ri.name, ri.unit
+                               ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity),
+                                                       meals = meals + VALUES(meals)""",
+                           params)
+
+    def _find_recipe_by_hash(self, cursor, content_hash):
+        """Id of this tenant's recipe with a content hash, or None; one probe of the unique index"""
+        cursor.execute("SELECT recipe_id FROM recipes WHERE tenant_id = %s AND content_hash = %s",
+                       (self.tenant_id, content_hash))
+        rows = cursor.fetchall()
+        return rows[0][0] if rows else None
+
+    def _unique_content_hash(self, cursor, recipe_id, name, ingredients):
+        """Content hash to store for a recipe, or None when another recipe already has it
+
+        Recipes left without a hash are merged by dedupe_recipes.
+        """
+        content_hash = recipe_content_hash(name, ingredients)
+        duplicate_id = self._find_recipe_by_hash(cursor, content_hash)
+        if duplicate_id is not None and duplicate_id != recipe_id:
+            return None
+        return content_hash
+
+    def _merge_duplicate_recipe(self, cursor, duplicate_id, recipe_id):
+        """Point a duplicate's plan slots (and photo, if the original has none) at recipe_id and delete it"""
+        cursor.execute("SELECT day, meal_type FROM mealplan WHERE recipe_id = %s AND tenant_id = %s",
+                       (duplicate_id, self.tenant_id))
+        slots = cursor.fetchall()
+        cursor.execute("UPDATE mealplan SET recipe_id = %s WHERE recipe_id = %s AND tenant_id = %s",
+                       (recipe_id, duplicate_id, self.tenant_id))
+        cursor.execute("UPDATE IGNORE recipe_photos SET recipe_id = %s WHERE recipe_id = %s AND tenant_id = %s",
+                       (recipe_id, duplicate_id, self.tenant_id))
+        if cursor.rowcount:
+            self._log_changes(cursor, "photo", [recipe_id])
+
+        self._delete_recipe_trigrams(cursor, duplicate_id)
+        cursor.execute("DELETE FROM recipes WHERE recipe_id = %s AND tenant_id = %s", (duplicate_id, self.tenant_id))
+        self._write_recipe_revision(cursor, duplicate_id, marker="merge")
+        self._log_changes(cursor, "plan", [plan_key(day, meal_type) for day, meal_type in slots])
+        self._log_changes(cursor, "recipe", [duplicate_id], "delete")
+
+    def create_tenant(self, name):
+        """Create a tenant (household or kitchen) and return its id"""
+        if not self.connection:
+            return None
+
+        cursor = self.connection.cursor()
+        query = "INSERT INTO tenants (name) VALUES (%s)"
+
+        try:
+            cursor.execute(query, (name,))
+            self.connection.commit()
+            return cursor.lastrowid
+        except Error as e:
+            print(f"Error creating tenant: {e}")
+            self.connection.rollback()
+            return None
+        finally:
+            cursor.close()
+
+    def get_tenants(self):
+        """Get all tenants as (tenant_id, name)"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = "SELECT tenant_id, name FROM tenants ORDER BY name"
+
+        try:
+            cursor.execute(query)
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching tenants: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def insert_recipe(self, name, ingredients, instructions, category, cuisine="", cook_time=0, servings=1):
+        """Insert a new recipe and return its recipe_id
+
+        A recipe with the same name and ingredients as an existing one is not
+        inserted again; the existing recipe's id is returned instead.
+        """
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        content_hash = recipe_content_hash(name, ingredients)
+        query = """INSERT INTO recipes (tenant_id, name, ingredients, instructions, category, cuisine, cook_time, servings,
+                                        content_hash)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+
+        try:
+            existing_id = self._find_recipe_by_hash(cursor, content_hash)
+            if existing_id is not None:
+                self.connection.commit()
+                return existing_id
+
+            cursor.execute(query, (self.tenant_id, name, ingredients, instructions, category, cuisine, cook_time,
+                                   servings, content_hash))
+            recipe_id = cursor.lastrowid
+            self._write_recipe_ingredients(cursor, recipe_id, ingredients)
+            self._write_recipe_trigrams(cursor, recipe_id, name, ingredients)
+            self._write_recipe_revision(cursor, recipe_id, dict(zip(REVISION_FIELDS, (
+                name, ingredients, instructions, category, cuisine, cook_time, servings))))
+            self._log_changes(cursor, "recipe", [recipe_id])
+            self.connection.commit()
+            return recipe_id
+        except Error as e:
+            self.connection.rollback()
+            if e.errno == DUPLICATE_KEY_ERROR:
+                # A concurrent save of the same recipe got in between the probe and the insert
+                existing_id = self.find_duplicate_recipe(name, ingredients)
+                if existing_id is not None:
+                    return existing_id
+            print(f"Error inserting recipe: {e}")
+            if self.raise_errors:
+                raise
+            return False
+        finally:
+            cursor.close()
+
+    def get_all_recipes(self):
+        """Get all recipes from database"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = f"SELECT {RECIPE_COLUMNS} FROM recipes WHERE tenant_id = %s ORDER BY created_date DESC"
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching recipes: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def search_recipes(self, search_term, search_type="name"):
+        """Search recipes by name, category, or ingredient, or fuzzily by name and ingredients"""
+        if not self.connection:
+            return []
+
+        if search_type == "fuzzy":
+            return self.fuzzy_search_recipes(search_term)
+
+        cursor = self.connection.cursor()
+        query, params = self._recipe_query(search_term, search_type)
+
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error searching recipes: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def fuzzy_search_recipes(self, search_term, limit=50):
+        """Typo-tolerant search ranked by trigram similarity
+
+        Candidates come from the query's rarest trigrams in the persistent
+        index, so common trigrams never have to be scanned.
+        """
+        if not self.connection:
+            return []
+
+        query_grams = trigrams(search_term)
+        if not query_grams:
+            return []
+
+        cursor = self.connection.cursor()
+        placeholders = ", ".join(["%s"] * len(query_grams))
+
+        try:
+            cursor.execute(f"SELECT trigram, df FROM trigram_stats WHERE tenant_id = %s AND trigram IN ({placeholders})",
+                           (self.tenant_id, *query_grams))
+            # Trigrams are stored as VARBINARY so trailing spaces survive; they come back as bytes
+            document_frequency = {bytes(gram).decode("utf-8"): df for gram, df in cursor.fetchall()}
+            probe, min_shared = probe_trigrams(query_grams, document_frequency)
+            if not probe:
+                return []
+
+            cursor.execute(f"""SELECT recipe_id FROM recipe_trigrams
+                               WHERE tenant_id = %s AND trigram IN ({", ".join(["%s"] * len(probe))})
+                               GROUP BY recipe_id HAVING COUNT(*) >= %s
+                               ORDER BY COUNT(*) DESC LIMIT %s""",
+                           (self.tenant_id, *probe, min_shared, CANDIDATE_LIMIT))
+            candidate_ids = [row[0] for row in cursor.fetchall()]
+            if not candidate_ids:
+                return []
+
+            cursor.execute(f"""SELECT {RECIPE_COLUMNS} FROM recipes
+                               WHERE tenant_id = %s AND recipe_id IN ({", ".join(["%s"] * len(candidate_ids))})""",
+                           (self.tenant_id, *candidate_ids))
+            return rank_recipes(search_term, cursor.fetchall(), limit)
+        except Error as e:
+            print(f"Error fuzzy searching recipes: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def _recipe_query(self, search_term=None, search_type="name"):
+        """Build the recipe listing query, optionally filtered by name, category, or ingredient"""
+        query = f"SELECT {RECIPE_COLUMNS} FROM recipes WHERE tenant_id = %s"
+        if search_term is None:
+            return query + " ORDER BY created_date DESC", (self.tenant_id,)
+
+        if search_type == "name":
+            query += " AND name LIKE %s"
+        elif search_type == "category":
+            query += " AND category LIKE %s"
+        elif search_type == "ingredient":
+            query += " AND ingredients LIKE %s"
+        return query, (self.tenant_id, f"%{search_term}%")
+
+    def iter_recipes(self, search_term=None, search_type="name", batch_size=500):
+        """Yield recipes in batches of rows without loading the whole result set
+
+        The connection stays busy until the generator is exhausted or closed.
+        Closing it early shuts the connection down rather than reading the
+        rest of the result; call connect_database() before reusing it. Query
+        errors are raised, so a listing cut short is not taken for a complete one.
+        """
+        if not self.connection:
+            return
+
+        cursor = self.connection.cursor()
+        query, params = self._recipe_query(search_term, search_type)
+
+        exhausted = False
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+            exhausted = True
+        finally:
+            if exhausted:
+                cursor.close()
+            else:
+                # Abandoned mid-stream (e.g. the client went away): dropping the socket is
+                # cheaper than reading the rest of a large result set to free the connection
+                self.connection.shutdown()
+
+    def update_recipe(self, recipe_id, name, ingredients, instructions, category, cuisine="", cook_time=0, servings=1,
+                      if_unmodified_since=None):
+        """Update an existing recipe
+
+        With if_unmodified_since (a UTC epoch), the update is skipped and False
+        returned when the server copy was modified after that time.
+        """
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        query = """UPDATE recipes SET name=%s, ingredients=%s, instructions=%s, 
+                   category=%s, cuisine=%s, cook_time=%s, servings=%s, content_hash=%s
+                   WHERE recipe_id=%s AND tenant_id=%s"""
+
+        try:
+            # Make sure the recipe belongs to this tenant (and is not newer) before touching it;
+            # the row lock keeps concurrent edits from taking the same revision number
+            cursor.execute("""SELECT UNIX_TIMESTAMP(updated_date) FROM recipes
+                              WHERE recipe_id = %s AND tenant_id = %s FOR UPDATE""", (recipe_id, self.tenant_id))
+            rows = cursor.fetchall()
+            if not rows or (if_unmodified_since is not None and rows[0][0] > if_unmodified_since):
+                # Release the row lock taken above
+                self.connection.rollback()
+                return False
+
+            content_hash = self._unique_content_hash(cursor, recipe_id, name, ingredients)
+            cursor.execute(query, (name, ingredients, instructions, category, cuisine, cook_time, servings,
+                                   content_hash, recipe_id, self.tenant_id))
+            self._write_recipe_ingredients(cursor, recipe_id, ingredients)
+            self._write_recipe_trigrams(cursor, recipe_id, name, ingredients)
+            self._write_recipe_revision(cursor, recipe_id, dict(zip(REVISION_FIELDS, (
+                name, ingredients, instructions, category, cuisine, cook_time, servings))))
+            self._log_changes(cursor, "recipe", [recipe_id])
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error updating recipe: {e}")
+            self.connection.rollback()
+            if self.raise_errors:
+                raise
+            return False
+        finally:
+            cursor.close()
+
+    def delete_recipe(self, recipe_id, if_unmodified_since=None):
+        """Delete a recipe"""
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        query = "DELETE FROM recipes WHERE recipe_id = %s AND tenant_id = %s"
+        params = (recipe_id, self.tenant_id)
+        if if_unmodified_since is not None:
+            query += " AND UNIX_TIMESTAMP(updated_date) <= %s"
+            params += (if_unmodified_since,)
+
+        try:
+            self._delete_recipe_trigrams(cursor, recipe_id)
+            # The delete cascades to the plan slots using the recipe
+            cursor.execute("""INSERT INTO change_log (tenant_id, entity, entity_key, op)
+                              SELECT tenant_id, 'plan', CONCAT(day, '|', meal_type), 'delete' FROM mealplan
+                              WHERE recipe_id = %s AND tenant_id = %s""", (recipe_id, self.tenant_id))
+            cursor.execute(query, params)
+            if cursor.rowcount == 0:
+                # Not ours, or modified since: keep its trigrams and change records too
+                self.connection.rollback()
+                return False
+            self._write_recipe_revision(cursor, recipe_id)
+            self._log_changes(cursor, "recipe", [recipe_id], "delete")
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error deleting recipe: {e}")
+            self.connection.rollback()
+            if self.raise_errors:
+                raise
+            return False
+        finally:
+            cursor.close()
+
+    def add_meal_plan(self, day, meal_type, recipe_id, if_unmodified_since=None):
+        """Add a meal plan entry, replacing any meal already in that slot
+
+        With if_unmodified_since (a UTC epoch), a slot changed on the server
+        after that time is left alone.
+        """
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        # Only plan recipes owned by this tenant; the unique slot key replaces the old entry
+        query = """INSERT INTO mealplan (tenant_id, day, meal_type, recipe_id)
+                   SELECT tenant_id, %s, %s, recipe_id FROM recipes WHERE recipe_id = %s AND tenant_id = %s
+                   ON DUPLICATE KEY UPDATE recipe_id = IF(%s IS NULL OR UNIX_TIMESTAMP(updated_date) <= %s,
+                                                          VALUES(recipe_id), recipe_id)"""
+
+        try:
+            cursor.execute(query, (day, meal_type, recipe_id, self.tenant_id, if_unmodified_since,
+                                   if_unmodified_since))
+            if cursor.rowcount > 0:
+                self._log_changes(cursor, "plan", [plan_key(day, meal_type)])
+                planned = True
+            else:
+                # Nothing changed: either the slot already holds this recipe, or the
+                # recipe is not the tenant's, or the if_unmodified_since guard kept a newer plan
+                cursor.execute("SELECT recipe_id FROM mealplan WHERE tenant_id = %s AND day = %s AND meal_type = %s",
+                               (self.tenant_id, day, meal_type))
+                row = cursor.fetchone()
+                planned = row is not None and row[0] == recipe_id
+            self.connection.commit()
+            return planned
+        except Error as e:
+            print(f"Error adding meal plan: {e}")
+            self.connection.rollback()
+            if self.raise_errors:
+                raise
+            return False
+        finally:
+            cursor.close()
+
+    def get_meal_plan(self):
+        """Get complete meal plan"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT mp.day, mp.meal_type, r.name, r.recipe_id, r.ingredients, r.servings
+                   FROM mealplan mp
+                   JOIN recipes r ON mp.recipe_id = r.recipe_id
+                   WHERE mp.tenant_id = %s
+                   ORDER BY LEFT(mp.day, LENGTH(mp.day) - LENGTH(SUBSTRING_INDEX(mp.day, ' ', -1))),
+                            FIELD(SUBSTRING_INDEX(mp.day, ' ', -1), 'Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                                  'Friday', 'Saturday', 'Sunday'),
+                            FIELD(mp.meal_type, 'Breakfast', 'Lunch', 'Dinner')"""
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching meal plan: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_recipes_changed_since(self, since=0):
+        """Get recipes modified at or after a UTC epoch, with their modification time appended"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = f"""SELECT {RECIPE_COLUMNS}, UNIX_TIMESTAMP(updated_date) FROM recipes
+                    WHERE tenant_id = %s AND updated_date >= FROM_UNIXTIME(%s)
+                    ORDER BY updated_date"""
+
+        try:
+            cursor.execute(query, (self.tenant_id, since))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching changed recipes: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_recipe_ids(self):
+        """Get the ids of all recipes"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = "SELECT recipe_id FROM recipes WHERE tenant_id = %s"
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            return [row[0] for row in cursor.fetchall()]
+        except Error as e:
+            print(f"Error fetching recipe ids: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_data_version(self):
+        """Get a cheap token that changes whenever recipes, the meal plan, or the pantry change
+
+        Every write logs to the change feed in its own transaction, so the
+        tenant's newest change id and number of changes move on each commit,
+        however close together, and a transaction committing after one with a
+        higher id still changes the count. Both come from the
+        (tenant_id, change_id) index without reading any row data.
+        """
+        if not self.connection:
+            return None
+
+        cursor = self.connection.cursor()
+        query = "SELECT CONCAT(COALESCE(MAX(change_id), 0), '.', COUNT(*)) FROM change_log WHERE tenant_id = %s"
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            return cursor.fetchone()[0]
+        except Error as e:
+            print(f"Error fetching data version: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def remove_meal_plan(self, day, meal_type, if_unmodified_since=None):
+        """Remove meal plan for specific day and meal type"""
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        query = "DELETE FROM mealplan WHERE tenant_id = %s AND day = %s AND meal_type = %s"
+        params = (self.tenant_id, day, meal_type)
+        if if_unmodified_since is not None:
+            query += " AND UNIX_TIMESTAMP(updated_date) <= %s"
+            params += (if_unmodified_since,)
+
+        try:
+            cursor.execute(query, params)
+            if cursor.rowcount:
+                self._log_changes(cursor, "plan", [plan_key(day, meal_type)], "delete")
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error removing meal plan: {e}")
+            self.connection.rollback()
+            if self.raise_errors:
+                raise
+            return False
+        finally:
+            cursor.close()
+
+    def get_plan_requirements(self, household_size=1):
+        """Get (name, unit, quantity) needed by the meal plan, scaled to the household size"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT ri.name, ri.unit, SUM(ri.quantity * %s / GREATEST(r.servings, 1))
+                   FROM mealplan mp
+                   JOIN recipes r ON mp.recipe_id = r.recipe_id
+                   JOIN recipe_ingredients ri ON ri.recipe_id = mp.recipe_id
+                   WHERE mp.tenant_id = %s
+                   GROUP BY ri.name, ri.unit"""
+
+        try:
+            cursor.execute(query, (household_size, self.tenant_id))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching plan requirements: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_net_shopping_list(self, household_size=1):
+        """Get (name, unit, quantity) still to buy after subtracting pantry stock"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT need.name, need.unit, need.quantity - COALESCE(p.quantity, 0)
+                   FROM (SELECT ri.name, ri.unit, SUM(ri.quantity * %s / GREATEST(r.servings, 1)) AS quantity
+                         FROM mealplan mp
+                         JOIN recipes r ON mp.recipe_id = r.recipe_id
+                         JOIN recipe_ingredients ri ON ri.recipe_id = mp.recipe_id
+                         WHERE mp.tenant_id = %s
+                         GROUP BY ri.name, ri.unit) need
+                   LEFT JOIN pantry p ON p.tenant_id = %s AND p.name = need.name AND p.unit = need.unit
+                   WHERE (need.unit <> '' AND need.quantity > COALESCE(p.quantity, 0))
+                      OR (need.unit = '' AND NOT EXISTS (SELECT 1 FROM pantry p2
+                                                         WHERE p2.tenant_id = %s AND p2.name = need.name
+                                                           AND p2.quantity > 0))
+                   ORDER BY need.name"""
+
+        try:
+            cursor.execute(query, (household_size, self.tenant_id, self.tenant_id, self.tenant_id))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error netting shopping list: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_shopping_list(self, household_size=None):
+        """Generate shopping list based on meal plan
+
+        With a household_size, quantities are scaled from each recipe's
+        serving size and netted against pantry stock.
+        """
+        if not self.connection:
+            return []
+
+        if household_size:
+            return [format_net_item(*row) for row in self.get_net_shopping_list(household_size)]
+
+        cursor = self.connection.cursor()
+        query = """SELECT DISTINCT r.ingredients
+                   FROM mealplan mp
+                   JOIN recipes r ON mp.recipe_id = r.recipe_id
+                   WHERE mp.tenant_id = %s"""
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            results = cursor.fetchall()
+
+            # Combine all ingredients
+            all_ingredients = []
+            for result in results:
+                ingredients = result[0].split(',')
+                for ingredient in ingredients:
+                    ingredient = ingredient.strip()
+                    if ingredient and ingredient not in all_ingredients:
+                        all_ingredients.append(ingredient)
+
+            return sorted(all_ingredients)
+        except Error as e:
+            print(f"Error generating shopping list: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def add_pantry_item(self, name, quantity, unit="pc"):
+        """Add stock to the pantry, merging with an existing item"""
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        query = """INSERT INTO pantry (tenant_id, name, quantity, unit) VALUES (%s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)"""
+
+        try:
+            name, quantity, unit = normalize_stock(name, quantity, unit)
+            cursor.execute(query, (self.tenant_id, name, quantity, unit))
+            self._log_changes(cursor, "pantry", [stock_key(name, unit)])
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error adding pantry item: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    def get_pantry_items(self):
+        """Get all pantry items as (item_id, name, quantity, unit)"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = "SELECT item_id, name, quantity, unit FROM pantry WHERE tenant_id = %s ORDER BY name"
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching pantry: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def update_pantry_item(self, item_id, quantity):
+        """Set the on-hand quantity of a pantry item"""
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        query = "UPDATE pantry SET quantity = %s WHERE item_id = %s AND tenant_id = %s"
+
+        try:
+            cursor.execute(query, (quantity, item_id, self.tenant_id))
+            self._log_pantry_item_change(cursor, item_id, "upsert")
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error updating pantry item: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    def delete_pantry_item(self, item_id):
+        """Delete a pantry item"""
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        query = "DELETE FROM pantry WHERE item_id = %s AND tenant_id = %s"
+
+        try:
+            self._log_pantry_item_change(cursor, item_id, "delete")
+            cursor.execute(query, (item_id, self.tenant_id))
+            self.connection.commit()
+            return cursor.rowcount > 0
+        except Error as e:
+            print(f"Error deleting pantry item: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    def delete_pantry_stock(self, name, unit):
+        """Delete a pantry item by name and base unit"""
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        query = "DELETE FROM pantry WHERE tenant_id = %s AND name = %s AND unit = %s"
+
+        try:
+            cursor.execute(query, (self.tenant_id, name, unit))
+            if cursor.rowcount:
+                self._log_changes(cursor, "pantry", [stock_key(name, unit)], "delete")
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error deleting pantry item: {e}")
+            self.connection.rollback()
+            if self.raise_errors:
+                raise
+            return False
+        finally:
+            cursor.close()
+
+    def bulk_update_stock(self, items):
+        """Set stock for many (name, quantity, unit) items in one transaction"""
+        if not self.connection:
+            return False
+        if not items:
+            return True
+
+        cursor = self.connection.cursor()
+        query = """INSERT INTO pantry (tenant_id, name, quantity, unit) VALUES (%s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE quantity = VALUES(quantity)"""
+
+        try:
+            rows = [(self.tenant_id, *normalize_stock(*item)) for item in items]
+            cursor.executemany(query, rows)
+            self._log_changes(cursor, "pantry", [stock_key(row[1], row[3]) for row in rows])
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error updating stock: {e}")
+            self.connection.rollback()
+            if self.raise_errors:
+                raise
+            return False
+        finally:
+            cursor.close()
+
+    def set_recipe_photo(self, recipe_id, data):
+        """Attach a photo to a recipe and return its content hash
+
+        The bytes go into the content-addressed blob store, so re-attaching
+        an existing photo only writes the link.
+        """
+        if not self.connection:
+            return None
+
+        digest = photo_hash(data)
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("INSERT IGNORE INTO photo_blobs (photo_hash, size, data) VALUES (%s, %s, %s)",
+                           (digest, len(data), data))
+            # Only link recipes owned by this tenant
+            cursor.execute("""INSERT INTO recipe_photos (recipe_id, tenant_id, photo_hash)
+                              SELECT recipe_id, tenant_id, %s FROM recipes WHERE recipe_id = %s AND tenant_id = %s
+                              ON DUPLICATE KEY UPDATE photo_hash = VALUES(photo_hash)""",
+                           (digest, recipe_id, self.tenant_id))
+            if cursor.rowcount == 0:
+                self.connection.rollback()
+                return None
+            self._log_changes(cursor, "photo", [recipe_id])
+            self.connection.commit()
+            return digest
+        except Error as e:
+            print(f"Error saving recipe photo: {e}")
+            self.connection.rollback()
+            return None
+        finally:
+            cursor.close()
+
+    def remove_recipe_photo(self, recipe_id):
+        """Detach a recipe's photo; the blob stays for other recipes using it"""
+        if not self.connection:
+            return False
+
+        cursor = self.connection.cursor()
+        query = "DELETE FROM recipe_photos WHERE recipe_id = %s AND tenant_id = %s"
+
+        try:
+            cursor.execute(query, (recipe_id, self.tenant_id))
+            if cursor.rowcount:
+                self._log_changes(cursor, "photo", [recipe_id], "delete")
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error removing recipe photo: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    def get_photo_hashes(self):
+        """Get {recipe_id: photo_hash} for recipes that have a photo"""
+        if not self.connection:
+            return {}
+
+        cursor = self.connection.cursor()
+        query = "SELECT recipe_id, photo_hash FROM recipe_photos WHERE tenant_id = %s"
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            return dict(cursor.fetchall())
+        except Error as e:
+            print(f"Error fetching photo hashes: {e}")
+            return {}
+        finally:
+            cursor.close()
+
+    def get_photo_blob(self, digest):
+        """Get the bytes of a photo used by one of this tenant's recipes"""
+        if not self.connection:
+            return None
+
+        cursor = self.connection.cursor()
+        query = """SELECT b.data FROM photo_blobs b
+                   WHERE b.photo_hash = %s
+                     AND EXISTS (SELECT 1 FROM recipe_photos p WHERE p.photo_hash = b.photo_hash AND p.tenant_id = %s)"""
+
+        try:
+            cursor.execute(query, (digest, self.tenant_id))
+            row = cursor.fetchone()
+            return bytes(row[0]) if row else None
+        except Error as e:
+            print(f"Error fetching photo: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def get_changes_since(self, change_id, limit=CHANGE_BATCH_SIZE):
+        """Get (change_id, entity, entity_key, op) change feed rows after change_id, oldest first"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT change_id, entity, entity_key, op FROM change_log
+                   WHERE tenant_id = %s AND change_id > %s
+                   ORDER BY change_id LIMIT %s"""
+
+        try:
+            cursor.execute(query, (self.tenant_id, change_id, limit))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching changes: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def end_read_snapshot(self):
+        """End the current transaction so the next query sees data committed since
+
+        Without autocommit the first query opens a REPEATABLE READ
+        transaction, and pollers would read its snapshot until the next write.
+        """
+        if not self.connection:
+            return
+
+        try:
+            self.connection.rollback()
+        except Error as e:
+            print(f"Error ending read snapshot: {e}")
+
+    def get_change_bounds(self):
+        """Get the (oldest, newest) change ids kept for this tenant, or (None, None)"""
+        if not self.connection:
+            return None, None
+
+        cursor = self.connection.cursor()
+        query = "SELECT MIN(change_id), MAX(change_id) FROM change_log WHERE tenant_id = %s"
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            return cursor.fetchone()
+        except Error as e:
+            print(f"Error fetching change bounds: {e}")
+            return None, None
+        finally:
+            cursor.close()
+
+    def prune_change_log(self, keep_days=CHANGE_RETENTION_DAYS):
+        """Delete change feed rows older than keep_days for all tenants; returns the number deleted
+
+        Instances that were offline for longer fall back to a full reload.
+        Each tenant's newest row is kept, so its data version never goes back
+        to a value it had before.
+        """
+        if not self.connection:
+            return 0
+
+        cursor = self.connection.cursor()
+        query = """DELETE c FROM change_log c
+                   JOIN (SELECT tenant_id, MAX(change_id) AS newest FROM change_log GROUP BY tenant_id) n
+                        ON n.tenant_id = c.tenant_id
+                   WHERE c.changed_date < NOW() - INTERVAL %s DAY AND c.change_id < n.newest"""
+
+        try:
+            cursor.execute(query, (keep_days,))
+            self.connection.commit()
+            return cursor.rowcount
+        except Error as e:
+            print(f"Error pruning change log: {e}")
+            self.connection.rollback()
+            return 0
+        finally:
+            cursor.close()
+
+    def get_recipes_by_ids(self, recipe_ids):
+        """Get recipes by id with their modification time appended; None when the query fails
+
+        Ids that are missing from the result no longer exist.
+        """
+        if not self.connection:
+            return None
+        if not recipe_ids:
+            return []
+
+        cursor = self.connection.cursor()
+        query = f"""SELECT {RECIPE_COLUMNS}, UNIX_TIMESTAMP(updated_date) FROM recipes
+                    WHERE tenant_id = %s AND recipe_id IN ({', '.join(['%s'] * len(recipe_ids))})"""
+
+        try:
+            cursor.execute(query, (self.tenant_id, *recipe_ids))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching recipes: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def get_meal_plan_slots(self, keys):
+        """Get (day, meal_type, recipe_id) for plan slot keys; None when the query fails"""
+        if not self.connection:
+            return None
+        if not keys:
+            return []
+
+        cursor = self.connection.cursor()
+        query = f"""SELECT day, meal_type, recipe_id FROM mealplan
+                    WHERE tenant_id = %s AND (day, meal_type) IN ({', '.join(['(%s, %s)'] * len(keys))})"""
+
+        try:
+            cursor.execute(query, (self.tenant_id, *(part for key in keys for part in split_key(key))))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching meal plan slots: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def get_pantry_stock(self, keys):
+        """Get (item_id, name, quantity, unit) for pantry keys; None when the query fails"""
+        if not self.connection:
+            return None
+        if not keys:
+            return []
+
+        cursor = self.connection.cursor()
+        query = f"""SELECT item_id, name, quantity, unit FROM pantry
+                    WHERE tenant_id = %s AND (name, unit) IN ({', '.join(['(%s, %s)'] * len(keys))})"""
+
+        try:
+            cursor.execute(query, (self.tenant_id, *(part for key in keys for part in split_key(key))))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching pantry stock: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def get_recipe_revisions(self, recipe_id):
+        """Get a recipe's history as (revision, kind, created_date, stored_bytes), newest first"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT revision, kind, created_date, LENGTH(data) FROM recipe_revisions
+                   WHERE recipe_id = %s AND tenant_id = %s ORDER BY revision DESC"""
+
+        try:
+            cursor.execute(query, (recipe_id, self.tenant_id))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching recipe history: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_recipe_revision(self, recipe_id, revision=None, as_of=None):
+        """Rebuild a recipe as of a revision or a point in time (default: the latest)
+
+        Returns (revision, kind, created_date, fields) or None. For a 'delete'
+        or 'merge' revision the fields are the recipe as it was when removed.
+        """
+        if not self.connection:
+            return None
+
+        cursor = self.connection.cursor()
+        try:
+            if as_of is not None:
+                cursor.execute("""SELECT MAX(revision) FROM recipe_revisions
+                                  WHERE recipe_id = %s AND tenant_id = %s AND created_date <= %s""",
+                               (recipe_id, self.tenant_id, as_of))
+                revision = cursor.fetchone()[0]
+                if revision is None:
+                    return None
+
+            chain = self._revision_chain(cursor, recipe_id, revision)
+            if not chain:
+                return None
+            cursor.execute("SELECT created_date FROM recipe_revisions WHERE recipe_id = %s AND revision = %s",
+                           (recipe_id, chain[-1][0]))
+            created_date = cursor.fetchone()[0]
+            fields = deserialize_recipe(reconstruct([(row[1], row[2]) for row in chain]))
+            return chain[-1][0], chain[-1][1], created_date, fields
+        except Error as e:
+            print(f"Error rebuilding recipe revision: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def get_deleted_recipes(self):
+        """Get recipes whose latest revision is a deletion as (recipe_id, name, deleted_date), newest first
+
+        Duplicates merged into another recipe end with a 'merge' revision and are not listed.
+        """
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT v.recipe_id, v.created_date FROM recipe_revisions v
+                   WHERE v.tenant_id = %s AND v.kind = 'delete'
+                     AND v.revision = (SELECT MAX(revision) FROM recipe_revisions WHERE recipe_id = v.recipe_id)
+                   ORDER BY v.created_date DESC"""
+
+        try:
+            cursor.execute(query, (self.tenant_id,))
+            deleted = cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching deleted recipes: {e}")
+            return []
+        finally:
+            cursor.close()
+
+        recipes = []
+        for recipe_id, deleted_date in deleted:
+            state = self.get_recipe_revision(recipe_id)
+            if state is not None:
+                recipes.append((recipe_id, state[3]["name"], deleted_date))
+        return recipes
+
+    def restore_recipe(self, recipe_id, revision=None):
+        """Bring back a recipe as of a revision (default: as it was last saved)
+
+        A deleted recipe is recreated under its old id; its meal plan slots
+        are not restored. An existing recipe is updated to the old version,
+        which becomes a new revision.
+        """
+        state = self.get_recipe_revision(recipe_id, revision)
+        if state is None:
+            return False
+        fields = state[3]
+        values = [fields[field] for field in REVISION_FIELDS]
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT tenant_id FROM recipes WHERE recipe_id = %s", (recipe_id,))
+            exists = cursor.fetchall()
+        except Error as e:
+            print(f"Error restoring recipe: {e}")
+            cursor.close()
+            return False
+        if exists:
+            cursor.close()
+            return exists[0][0] == self.tenant_id and self.update_recipe(recipe_id, *values)
+
+        query = """INSERT INTO recipes (recipe_id, tenant_id, name, ingredients, instructions, category, cuisine,
+                                        cook_time, servings, content_hash)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"""
+
+        try:
+            content_hash = self._unique_content_hash(cursor, recipe_id, fields["name"], fields["ingredients"])
+            cursor.execute(query, (recipe_id, self.tenant_id, *values, content_hash))
+            self._write_recipe_ingredients(cursor, recipe_id, fields["ingredients"])
+            self._write_recipe_trigrams(cursor, recipe_id, fields["name"], fields["ingredients"])
+            self._write_recipe_revision(cursor, recipe_id, fields)
+            self._log_changes(cursor, "recipe", [recipe_id])
+            self.connection.commit()
+            return True
+        except Error as e:
+            print(f"Error restoring recipe: {e}")
+            self.connection.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    def record_meal_history(self, served_date):
+        """Record the meals planned for a calendar date in the history and its rollups
+
+        The plan repeats every week it has days for ('Week 2 Monday'...), which
+        decides the plan day served on served_date. Slots already recorded for
+        that date are kept as they were; returns the number of meals added.
+        """
+        if not self.connection:
+            return 0
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT DISTINCT day FROM mealplan WHERE tenant_id = %s", (self.tenant_id,))
+            days = [row[0] for row in cursor.fetchall()]
+            if not days:
+                return 0
+            day = plan_day_for_date(served_date, max(day_sort_key(planned)[0] for planned in days))
+
+            # Locks the date's history rows (and the gap) so concurrent recorders cannot double count
+            cursor.execute("SELECT meal_type FROM meal_history WHERE tenant_id = %s AND served_date = %s FOR UPDATE",
+                           (self.tenant_id, served_date))
+            recorded = {row[0] for row in cursor.fetchall()}
+            cursor.execute("""SELECT mp.meal_type, r.recipe_id, r.name, COALESCE(r.cuisine, ''), r.cook_time,
+                                     r.servings
+                              FROM mealplan mp
+                              JOIN recipes r ON r.recipe_id = mp.recipe_id
+                              WHERE mp.tenant_id = %s AND mp.day = %s""", (self.tenant_id, day))
+            meals = [row for row in cursor.fetchall() if row[0] not in recorded]
+            if not meals:
+                self.connection.commit()
+                return 0
+
+            cursor.executemany("""INSERT INTO meal_history (tenant_id, served_date, meal_type, recipe_id, name,
+                                                            cuisine, cook_time, servings)
+                                  VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+                               [(self.tenant_id, served_date, *meal) for meal in meals])
+            # Copied like the recipe fields, so later edits leave the ingredient demand of the past alone
+            cursor.execute(f"""INSERT INTO meal_history_ingredients (tenant_id, served_date, meal_type, name,
+                                                                     quantity, unit)
+                               SELECT h.tenant_id, h.served_date, h.meal_type, ri.name, ri.quantity, ri.unit
+                               FROM meal_history h
+                               JOIN recipe_ingredients ri ON ri.recipe_id = h.recipe_id
+                               WHERE h.tenant_id = %s AND h.served_date = %s
+                                 AND h.meal_type IN ({", ".join(["%s"] * len(meals))})""",
+                           (self.tenant_id, served_date, *[meal[0] for meal in meals]))
+            self._roll_up_meals(cursor, served_date, [meal[0] for meal in meals])
+            self.connection.commit()
+            return len(meals)
+        except Error as e:
+            print(f"Error recording meal history: {e}")
+            self.connection.rollback()
+            return 0
+        finally:
+            cursor.close()
+
+    def get_meal_trend(self, period, since):
+        """Get (period_start, cuisine, meals, cook_time_total, cook_time_meals) rollups from since on"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT period_start, cuisine, meals, cook_time_total, cook_time_meals FROM meal_rollup_cuisines
+                   WHERE tenant_id = %s AND period = %s AND period_start >= %s
+                   ORDER BY period_start, cuisine"""
+
+        try:
+            cursor.execute(query, (self.tenant_id, period, since))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching meal trend: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_top_planned_recipes(self, period, since, limit=10):
+        """Get the most often planned recipes from since on as (recipe_id, name, meals)"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT recipe_id, MAX(name), SUM(meals) AS total FROM meal_rollup_recipes
+                   WHERE tenant_id = %s AND period = %s AND period_start >= %s
+                   GROUP BY recipe_id ORDER BY total DESC, MAX(name) LIMIT %s"""
+
+        try:
+            cursor.execute(query, (self.tenant_id, period, since, limit))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching top planned recipes: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def get_ingredient_demand(self, period, since, limit=10):
+        """Get the most used ingredients from since on as (name, unit, quantity_per_serving, meals)"""
+        if not self.connection:
+            return []
+
+        cursor = self.connection.cursor()
+        query = """SELECT name, unit, SUM(quantity), SUM(meals) AS total FROM meal_rollup_ingredients
+                   WHERE tenant_id = %s AND period = %s AND period_start >= %s
+                   GROUP BY name, unit ORDER BY total DESC, name LIMIT %s"""
+
+        try:
+            cursor.execute(query, (self.tenant_id, period, since, limit))
+            return cursor.fetchall()
+        except Error as e:
+            print(f"Error fetching ingredient demand: {e}")
+            return []
+        finally:
+            cursor.close()
+
+    def find_duplicate_recipe(self, name, ingredients):
+        """Id of the recipe with the same name and ingredient set, or None"""
+        if not self.connection:
+            return None
+
+        cursor = self.connection.cursor()
+        try:
+            return self._find_recipe_by_hash(cursor, recipe_content_hash(name, ingredients))
+        except Error as e:
+            print(f"Error checking for duplicate recipe: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def dedupe_recipes(self, batch_size=1000):
+        """Merge duplicate recipes in one pass; returns (recipes hashed, duplicates merged)
+
+        Visits only recipes without a content hash (duplicates left by the
+        migration, or recipes edited into a copy of another). Each gets its
+        hash if no other recipe has it, otherwise its plan slots are moved to
+        that recipe and it is deleted. Batches are committed as they go.
+        """
+        if not self.connection:
+            return 0, 0
+
+        cursor = self.connection.cursor()
+        query = """SELECT recipe_id, name, ingredients FROM recipes
+                   WHERE tenant_id = %s AND content_hash IS NULL AND recipe_id > %s
+                   ORDER BY recipe_id LIMIT %s"""
+
+        hashed = merged = 0
+        last_id = 0
+        try:
+            while True:
+                cursor.execute(query, (self.tenant_id, last_id, batch_size))
+                batch = cursor.fetchall()
+                if not batch:
+                    break
+
+                batch_hashed = batch_merged = 0
+                for recipe_id, name, ingredients in batch:
+                    content_hash = recipe_content_hash(name, ingredients)
+                    original_id = self._find_recipe_by_hash(cursor, content_hash)
+                    if original_id is None:
+                        cursor.execute("""UPDATE recipes SET content_hash = %s, updated_date = updated_date
+                                          WHERE recipe_id = %s""", (content_hash, recipe_id))
+                        batch_hashed += 1
+                    else:
+                        self._merge_duplicate_recipe(cursor, recipe_id, original_id)
+                        batch_merged += 1
+                self.connection.commit()
+                hashed, merged = hashed + batch_hashed, merged + batch_merged
+                last_id = batch[-1][0]
+            return hashed, merged
+        except Error as e:
+            print(f"Error removing duplicate recipes: {e}")
+            self.connection.rollback()
+            return hashed, merged
+        finally:
+            cursor.close()
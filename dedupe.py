@@ -0,0 +1,23 @@
+import hashlib
+import json
+
+from nutrition import recipe_ingredient_rows
+
+
+def normalize_recipe_name(name):
+    """Lowercased name with runs of whitespace collapsed"""
+    return " ".join(name.lower().split())
+
+
+def recipe_content_hash(name, ingredients):
+    """Fingerprint of a recipe's name and ingredient set, used to spot duplicates
+
+    Ingredients are parsed and converted to base units, then sorted and
+    de-duplicated, so reordering them, changing case or spacing, or writing
+    '1 kg' for '1000 g' gives the same hash. Instructions and the other
+    fields are not part of it.
+    """
+    ingredient_set = sorted({(item, "" if quantity is None else f"{quantity:.6g}", unit)
+                             for item, quantity, unit in recipe_ingredient_rows(ingredients)})
+    canonical = json.dumps([normalize_recipe_name(name), ingredient_set], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,203 @@
+"""Memory and widget-leak diagnostics for the desktop app
+
+A LeakTracker takes a tracemalloc snapshot and counts live Tk widgets and
+matplotlib figures every time a page is shown. Each checkpoint is compared
+with the previous visit to the same page: once a page has been visited
+`warmup` times, more widgets or figures than last time are flagged as a
+leak, and the largest allocation deltas show where the memory went.
+
+Run the app with RECIPE_PLANNER_DIAGNOSTICS=1 to print a report on exit,
+or drive page switches in a soak test, e.g.:
+
+    python diagnostics.py --rounds 50 --report soak.json
+
+The soak test exits with status 1 when anything was flagged.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+# Allocation traces from these files are the diagnostics themselves, not the app
+IGNORED_TRACES = (tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+
+def count_widgets(root):
+    """Live widgets under root (including Toplevel windows) by class name"""
+    counts = Counter()
+    stack = [root]
+    while stack:
+        widget = stack.pop()
+        counts[type(widget).__name__] += 1
+        stack.extend(widget.winfo_children())
+    return counts
+
+
+def count_figures():
+    """(figures registered with pyplot, matplotlib figures alive anywhere)"""
+    return len(plt.get_fignums()), sum(isinstance(obj, Figure) for obj in gc.get_objects())
+
+
+class LeakTracker:
+    """tracemalloc snapshots and widget/figure counts per page transition"""
+
+    def __init__(self, root, frames=10, top=10, warmup=1):
+        self.root = root
+        self.frames = frames
+        self.top = top
+        self.warmup = warmup
+        self.visits = Counter()
+        self.last = {}
+        self.checkpoints = []
+
+    def start(self):
+        """Start tracing allocations, unless something else already does"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        tracemalloc.stop()
+
+    def checkpoint(self, label):
+        """Measure after a page was shown and compare with its previous visit; returns the record"""
+        if not tracemalloc.is_tracing():
+            self.start()
+        gc.collect()
+        self.visits[label] += 1
+        widgets = count_widgets(self.root)
+        pyplot_figures, live_figures = count_figures()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in IGNORED_TRACES])
+
+        record = {
+            "label": label,
+            "visit": self.visits[label],
+            "time": round(time.monotonic(), 3),
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "widgets": sum(widgets.values()),
+            "pyplot_figures": pyplot_figures,
+            "live_figures": live_figures,
+            "top_allocations": [],
+            "leaks": [],
+        }
+
+        previous = self.last.get(label)
+        if previous is not None:
+            previous_snapshot, previous_widgets, previous_record = previous
+            for stat in snapshot.compare_to(previous_snapshot, "lineno")[:self.top]:
+                if stat.size_diff > 0:
+                    frame = stat.traceback[0]
+                    record["top_allocations"].append({"where": f"{frame.filename}:{frame.lineno}",
+                                                      "size_diff": stat.size_diff, "count_diff": stat.count_diff})
+            if record["visit"] > self.warmup:
+                for name, count in sorted(widgets.items()):
+                    if count > previous_widgets.get(name, 0):
+                        record["leaks"].append(f"{name} widgets +{count - previous_widgets.get(name, 0)}")
+                for key in ("pyplot_figures", "live_figures"):
+                    if record[key] > previous_record[key]:
+                        record["leaks"].append(f"{key.replace('_', ' ')} +{record[key] - previous_record[key]}")
+
+        # Keep only the latest snapshot per page so tracing stays bounded
+        self.last[label] = (snapshot, widgets, record)
+        self.checkpoints.append(record)
+        return record
+
+    def report(self):
+        """Summary per page plus every flagged checkpoint"""
+        pages = {}
+        for record in self.checkpoints:
+            page = pages.setdefault(record["label"], {"visits": 0, "first": record})
+            page["visits"] += 1
+            page["last"] = record
+        return {
+            "pages": {label: {"visits": page["visits"],
+                              "traced_bytes_growth": page["last"]["traced_bytes"] - page["first"]["traced_bytes"],
+                              "widget_growth": page["last"]["widgets"] - page["first"]["widgets"],
+                              "live_figures": page["last"]["live_figures"]}
+                      for label, page in pages.items()},
+            "leaks": [{"label": record["label"], "visit": record["visit"], "leaks": record["leaks"],
+                       "top_allocations": record["top_allocations"]}
+                      for record in self.checkpoints if record["leaks"]],
+            "checkpoints": self.checkpoints,
+        }
+
+
+def format_report(report):
+    """Human readable lines of a LeakTracker report"""
+    lines = ["page              visits  memory growth  widget growth  live figures"]
+    for label, page in report["pages"].items():
+        lines.append(f"{label:<17} {page['visits']:>6}  {page['traced_bytes_growth'] / 1024:>+10.1f} KiB"
+                     f"  {page['widget_growth']:>+13}  {page['live_figures']:>12}")
+    if not report["leaks"]:
+        lines.append("No leaked widgets or figures")
+    for leak in report["leaks"]:
+        lines.append(f"LEAK {leak['label']} visit {leak['visit']}: {', '.join(leak['leaks'])}")
+        for allocation in leak["top_allocations"][:5]:
+            lines.append(f"    {allocation['where']}  {allocation['size_diff'] / 1024:+.1f} KiB "
+                         f"({allocation['count_diff']:+d} blocks)")
+    return "\n".join(lines)
+
+
+def soak(app, rounds, refresh=True, progress=print):
+    """Show every page of a RecipePlannerApp `rounds` times, checkpointing each transition
+
+    With refresh, every page is also marked stale after each round so it
+    reloads (and redraws its charts) on the next visit, as a sync would.
+    """
+    pages = [getattr(app, f"show_{name}_page") for name in ("recipes", "meal_planner", "shopping_list", "pantry",
+                                                            "analytics")]
+    for round_number in range(1, rounds + 1):
+        for show_page in pages:
+            show_page()
+            # Lets the page draw and runs the checkpoint open_page scheduled
+            app.root.update()
+        if refresh:
+            app.mark_all_pages_stale()
+            app.refresh_current_page()
+            app.root.update()
+        progress(f"round {round_number}/{rounds}: {tracemalloc.get_traced_memory()[0] / 1024:.0f} KiB traced")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test page switching in the desktop app for leaks")
+    parser.add_argument("--rounds", type=int, default=20, help="times every page is shown")
+    parser.add_argument("--warmup", type=int, default=1, help="visits per page before growth counts as a leak")
+    parser.add_argument("--frames", type=int, default=10, help="traceback depth recorded by tracemalloc")
+    parser.add_argument("--top", type=int, default=10, help="allocation deltas kept per checkpoint")
+    parser.add_argument("--no-refresh", dest="refresh", action="store_false",
+                        help="do not reload pages between rounds")
+    parser.add_argument("--report", help="write the full report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    # The app reads this to install a tracker of its own; the soak test installs one explicitly
+    os.environ.pop("RECIPE_PLANNER_DIAGNOSTICS", None)
+    from Trial1 import RecipePlannerApp
+
+    tracker = LeakTracker(None, frames=args.frames, top=args.top, warmup=args.warmup)
+    tracker.start()
+    app = RecipePlannerApp()
+    tracker.root = app.root
+    app.diagnostics = tracker
+    try:
+        soak(app, args.rounds, args.refresh)
+    finally:
+        app.root.destroy()
+        app.photo_cache.shutdown()
+
+    report = tracker.report()
+    print(format_report(report))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["leaks"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import math
+import re
+from collections import defaultdict
+
+from nutrition import recipe_ingredient_rows
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Probe the query's rarest trigrams until this many postings would be read,
+# so common trigrams ('  c', 'chi') never make a query scan the whole index
+MAX_PROBE_POSTINGS = 20000
+# A candidate must share this fraction of the probed trigrams
+MIN_SHARED_FRACTION = 0.3
+CANDIDATE_LIMIT = 200
+MIN_SCORE = 0.45
+
+
+def trigrams(text):
+    """Set of word trigrams, each word padded as '  word ' like pg_trgm"""
+    grams = set()
+    for word in WORD_PATTERN.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def recipe_terms(name, ingredients):
+    """Searchable text of a recipe: its name and parsed ingredient names"""
+    return " ".join([name] + [row[0] for row in recipe_ingredient_rows(ingredients)])
+
+
+def word_similarity(query_grams, text):
+    """Fraction of the query's trigrams found in text"""
+    if not query_grams:
+        return 0.0
+    return len(query_grams & trigrams(text)) / len(query_grams)
+
+
+def similarity(query_grams, text):
+    """Trigram Jaccard similarity between the query and text"""
+    text_grams = trigrams(text)
+    union = len(query_grams | text_grams)
+    return len(query_grams & text_grams) / union if union else 0.0
+
+
+def score_recipe(query_grams, name, ingredients):
+    """Rank a recipe for a fuzzy query; name matches outrank ingredient matches"""
+    name_score = 0.8 * word_similarity(query_grams, name) + 0.2 * similarity(query_grams, name)
+    # Quantities and units in the raw text add trigrams the query never has, so they do not lower the score
+    return max(name_score, 0.9 * word_similarity(query_grams, ingredients))
+
+
+def rank_recipes(search_term, recipes, limit=50):
+    """Sort recipe tuples (name at [1], ingredients at [2]) by fuzzy score"""
+    query_grams = trigrams(search_term)
+    scored = [(score_recipe(query_grams, recipe[1], recipe[2]), recipe) for recipe in recipes]
+    scored = [item for item in scored if item[0] >= MIN_SCORE]
+    scored.sort(key=lambda item: (-item[0], item[1][1]))
+    return [recipe for _, recipe in scored[:limit]]
+
+
+def probe_trigrams(query_grams, document_frequency):
+    """Pick the rarest query trigrams within the postings budget and the minimum overlap"""
+    present = sorted((df, gram) for gram, df in document_frequency.items() if gram in query_grams and df > 0)
+    probe = []
+    postings = 0
+    for df, gram in present:
+        if probe and postings + df > MAX_PROBE_POSTINGS:
+            break
+        probe.append(gram)
+        postings += df
+    return probe, max(1, math.ceil(len(probe) * MIN_SHARED_FRACTION))
+
+
+class TrigramIndex:
+    """In-memory trigram postings, used by the local replica"""
+
+    def __init__(self):
+        self.postings = defaultdict(set)
+        self.grams = {}
+
+    def add(self, recipe_id, name, ingredients):
+        """Index a recipe, replacing its previous terms"""
+        self.remove(recipe_id)
+        grams = trigrams(recipe_terms(name, ingredients))
+        self.grams[recipe_id] = grams
+        for gram in grams:
+            self.postings[gram].add(recipe_id)
+
+    def remove(self, recipe_id):
+        """Drop a recipe from the index"""
+        for gram in self.grams.pop(recipe_id, ()):
+            self.postings[gram].discard(recipe_id)
+
+    def candidates(self, search_term, limit=CANDIDATE_LIMIT):
+        """Recipe ids sharing the most of the query's rarest trigrams"""
+        query_grams = trigrams(search_term)
+        probe, min_shared = probe_trigrams(query_grams, {gram: len(self.postings.get(gram, ()))
+                                                         for gram in query_grams})
+        shared = defaultdict(int)
+        for gram in probe:
+            for recipe_id in self.postings[gram]:
+                shared[recipe_id] += 1
+        ranked = sorted((count, recipe_id) for recipe_id, count in shared.items() if count >= min_shared)
+        return [recipe_id for _, recipe_id in reversed(ranked[-limit:])]
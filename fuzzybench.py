@@ -0,0 +1,119 @@
+"""Latency benchmark for fuzzy recipe search
+
+By default the in-memory TrigramIndex used by the local replica is built
+over synthetic recipes and queried with misspelt recipe names:
+
+    python fuzzybench.py --recipes 500000 --queries 200
+
+With --tenant the same queries (taken from that tenant's recipe names) run
+against MySQL through DatabaseManager.fuzzy_search_recipes instead, which
+measures the persistent trigram index end to end.
+"""
+import argparse
+import random
+import time
+
+from fuzzy import TrigramIndex, rank_recipes
+from loadtest import percentile
+
+ADJECTIVES = ["spicy", "creamy", "smoky", "roasted", "crispy", "tangy", "garlic", "lemon", "herbed", "honey",
+              "sweet", "savory", "grilled", "baked", "braised", "fresh", "rustic", "golden", "zesty", "classic"]
+DISHES = ["chicken", "pasta", "risotto", "curry", "salad", "soup", "stew", "tacos", "noodles", "burger",
+          "lasagna", "omelette", "pancakes", "chili", "paella", "gnocchi", "dumplings", "pilaf", "casserole",
+          "bolognese", "spaghetti", "quiche", "frittata", "ramen", "biryani", "goulash", "tagine", "falafel"]
+INGREDIENTS = ["flour", "eggs", "milk", "butter", "garlic", "onion", "tomato", "rice", "beans", "chicken",
+               "beef", "basil", "parsley", "lemon", "cheese", "cream", "carrot", "potato", "pepper", "spinach",
+               "mushroom", "ginger", "cumin", "paprika", "coconut milk", "chickpeas", "lentils", "honey"]
+
+
+def synthetic_recipes(count, seed=0):
+    """(recipe_id, name, ingredients) rows with a few tens of thousands of distinct names"""
+    rng = random.Random(seed)
+    for recipe_id in range(1, count + 1):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {rng.randrange(100)}"
+        ingredients = ", ".join(f"{rng.randint(1, 500)} g {item}" for item in rng.sample(INGREDIENTS, 6))
+        yield recipe_id, name.title(), ingredients
+
+
+def misspell(text, rng):
+    """Drop, double or swap one letter of each word longer than three letters"""
+    words = []
+    for word in text.lower().split():
+        if len(word) > 3:
+            i = rng.randrange(1, len(word) - 1)
+            word = rng.choice([word[:i] + word[i + 1:], word[:i] + word[i] + word[i:],
+                               word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]])
+        words.append(word)
+    return " ".join(words)
+
+
+def report(label, seconds):
+    seconds = sorted(seconds)
+    print(f"{label:<12} p50 {1000 * percentile(seconds, 0.5):.1f}  p90 {1000 * percentile(seconds, 0.9):.1f}"
+          f"  p99 {1000 * percentile(seconds, 0.99):.1f}  max {1000 * seconds[-1]:.1f} ms")
+
+
+def bench_memory(recipes, queries, seed):
+    """Time candidate lookup and ranking on an in-memory index"""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    index = TrigramIndex()
+    rows = {}
+    for recipe in synthetic_recipes(recipes, seed):
+        index.add(recipe[0], recipe[1], recipe[2])
+        rows[recipe[0]] = recipe
+    print(f"indexed {recipes} recipes in {time.perf_counter() - start:.1f} s")
+
+    lookup, ranking, hits = [], [], 0
+    for _ in range(queries):
+        query = misspell(rows[rng.randint(1, recipes)][1], rng)
+        start = time.perf_counter()
+        candidate_ids = index.candidates(query)
+        middle = time.perf_counter()
+        results = rank_recipes(query, [rows[recipe_id] for recipe_id in candidate_ids])
+        lookup.append(middle - start)
+        ranking.append(time.perf_counter() - middle)
+        hits += bool(results)
+    report("candidates", lookup)
+    report("ranking", ranking)
+    report("total", [a + b for a, b in zip(lookup, ranking)])
+    print(f"queries with results: {hits}/{queries}")
+
+
+def bench_mysql(tenant_id, queries, seed):
+    """Time DatabaseManager.fuzzy_search_recipes on a tenant's own recipe names"""
+    from database import DatabaseManager
+
+    rng = random.Random(seed)
+    db = DatabaseManager(tenant_id, migrate=False)
+    names = [recipe[1] for recipe in db.get_all_recipes()]
+    if not names:
+        print(f"tenant {tenant_id} has no recipes")
+        return
+    print(f"tenant {tenant_id}: sampling queries from {len(names)} recipe names")
+
+    timings, hits = [], 0
+    for _ in range(queries):
+        query = misspell(rng.choice(names), rng)
+        start = time.perf_counter()
+        hits += bool(db.fuzzy_search_recipes(query))
+        timings.append(time.perf_counter() - start)
+    report("search", timings)
+    print(f"queries with results: {hits}/{queries}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzzy recipe search latency benchmark")
+    parser.add_argument("--recipes", type=int, default=100000, help="synthetic recipes in the in-memory index")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tenant", type=int, help="benchmark MySQL search for this tenant instead")
+    args = parser.parse_args(argv)
+    if args.tenant is not None:
+        bench_mysql(args.tenant, args.queries, args.seed)
+    else:
+        bench_memory(args.recipes, args.queries, args.seed)
+
+
+if __name__ == "__main__":
+    main()
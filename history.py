@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+# Rollup granularities kept for meal history; each recorded meal is added to one row of each
+ROLLUP_PERIODS = ("day", "week", "month")
+# Periods shown by the trend chart and reports, ending at the current one
+TREND_WINDOWS = {"day": 60, "week": 52, "month": 36}
+# Cuisines beyond this many per chart are summed as "Other"
+TREND_CUISINES = 6
+
+
+def period_start(day, period):
+    """First date of the day/week/month period containing day; weeks start on Monday"""
+    if period == "day":
+        return day
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown rollup period {period!r}")
+
+
+def next_period(start, period):
+    """Start of the period following the one starting at start"""
+    if period == "day":
+        return start + timedelta(days=1)
+    if period == "week":
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def period_range(first, last, period):
+    """Starts of every period from the one containing first to the one containing last"""
+    start, end = period_start(first, period), period_start(last, period)
+    starts = []
+    while start <= end:
+        starts.append(start)
+        start = next_period(start, period)
+    return starts
+
+
+def trend_window(today, period, count=None):
+    """Start date of the trend window of count periods ending with today's"""
+    count = count or TREND_WINDOWS[period]
+    start = period_start(today, period)
+    if period == "day":
+        return start - timedelta(days=count - 1)
+    if period == "week":
+        return start - timedelta(weeks=count - 1)
+    months = start.year * 12 + start.month - 1 - (count - 1)
+    return start.replace(year=months // 12, month=months % 12 + 1)
+
+
+def build_trend(rows, starts, top=TREND_CUISINES):
+    """Shape cuisine rollup rows into chart series over starts
+
+    rows are (period_start, cuisine, meals, cook_time_total, cook_time_meals).
+    Returns ({cuisine: [meals per period]}, [average cook_time or None per
+    period]); cuisines beyond the top ones by total meals become "Other"
+    (top=None keeps them all).
+    """
+    index = {start: i for i, start in enumerate(starts)}
+    totals = {}
+    for _, cuisine, meals, _, _ in rows:
+        totals[cuisine or "Not Specified"] = totals.get(cuisine or "Not Specified", 0) + meals
+    shown = set(sorted(totals, key=lambda cuisine: (-totals[cuisine], cuisine))[:top])
+
+    series = {}
+    cook_totals, cook_meals = [0] * len(starts), [0] * len(starts)
+    for start, cuisine, meals, cook_time_total, cook_time_meals in rows:
+        if start not in index:
+            continue
+        name = (cuisine or "Not Specified") if (cuisine or "Not Specified") in shown else "Other"
+        series.setdefault(name, [0] * len(starts))[index[start]] += meals
+        cook_totals[index[start]] += cook_time_total
+        cook_meals[index[start]] += cook_time_meals
+    average_cook_time = [total / meals if meals else None for total, meals in zip(cook_totals, cook_meals)]
+    return series, average_cook_time
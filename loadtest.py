@@ -0,0 +1,124 @@
+"""Load test for api_server.py
+
+Opens many keep-alive clients that repeatedly request the API endpoints
+and reports throughput and latency percentiles, e.g.:
+
+    python loadtest.py --clients 200 --duration 20 --tenant 1
+
+With --revalidate (the default) clients send If-None-Match with the last
+ETag they saw, as a kiosk polling for changes would; use --no-revalidate
+to measure full responses only.
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+def endpoints_for(tenant_id, household):
+    """Paths requested in rotation by every client"""
+    base = f"/api/tenants/{tenant_id}"
+    return [f"{base}/meal-plan", f"{base}/shopping-list?household={household}", f"{base}/recipes",
+            f"{base}/recipes?q=a&by=name"]
+
+
+async def read_response(reader):
+    """Read one response; returns (status, headers, body length)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    size = 0
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            chunk_size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(chunk_size + 2)
+            size += chunk_size
+            if chunk_size == 0:
+                break
+    else:
+        size = int(headers.get("content-length", 0))
+        await reader.readexactly(size)
+    return status, headers, size
+
+
+async def client(host, port, paths, deadline, revalidate, stats):
+    """One keep-alive client looping over the endpoints until the deadline"""
+    etags = {}
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if revalidate and path in etags:
+                request += f"If-None-Match: {etags[path]}\r\n"
+            start = time.perf_counter()
+            writer.write((request + "\r\n").encode())
+            status, headers, size = await read_response(reader)
+            stats["latencies"].append(time.perf_counter() - start)
+            stats["status"][status] = stats["status"].get(status, 0) + 1
+            stats["bytes"] += size
+            if "etag" in headers:
+                etags[path] = headers["etag"]
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        stats["errors"] += 1
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run(url, clients, duration, tenant_id, household, revalidate):
+    """Run the clients concurrently and print a summary"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    paths = endpoints_for(tenant_id, household)
+    stats = {"latencies": [], "status": {}, "bytes": 0, "errors": 0}
+
+    start = time.monotonic()
+    deadline = start + duration
+    await asyncio.gather(*(client(host, port, paths, deadline, revalidate, stats) for _ in range(clients)))
+    elapsed = time.monotonic() - start
+
+    latencies = sorted(stats["latencies"])
+    print(f"clients:      {clients}")
+    print(f"duration:     {elapsed:.1f} s")
+    print(f"requests:     {len(latencies)} ({len(latencies) / elapsed:.0f} req/s)")
+    print(f"received:     {stats['bytes'] / 1024 / 1024:.1f} MiB")
+    print(f"status codes: {dict(sorted(stats['status'].items()))}")
+    print(f"errors:       {stats['errors']}")
+    print("latency ms:   p50 {:.1f}  p90 {:.1f}  p99 {:.1f}  max {:.1f}".format(
+        *(1000 * percentile(latencies, p) for p in (0.5, 0.9, 0.99)), 1000 * (latencies[-1] if latencies else 0)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test for the recipe planner API")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--tenant", type=int, default=1)
+    parser.add_argument("--household", type=int, default=2)
+    parser.add_argument("--revalidate", action=argparse.BooleanOptionalAction, default=True,
+                        help="send If-None-Match with the last ETag seen")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.url, args.clients, args.duration, args.tenant, args.household, args.revalidate))
+
+
+if __name__ == "__main__":
+    main()
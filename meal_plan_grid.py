@@ -0,0 +1,69 @@
+DAYS_ORDER = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MEAL_TYPES_ORDER = ["Breakfast", "Lunch", "Dinner"]
+PLAN_WEEKS = 4
+
+
+def plan_day(week, day):
+    """Day key stored in the meal plan; week 1 keeps the plain weekday name"""
+    return day if week <= 1 else f"Week {week} {day}"
+
+
+def day_sort_key(day):
+    """Sort key ordering plan days by week, then weekday"""
+    week, _, name = day.rpartition(" ")
+    index = DAYS_ORDER.index(name) if name in DAYS_ORDER else len(DAYS_ORDER)
+    week_number = int(week.split()[-1]) if week.startswith("Week ") and week.split()[-1].isdigit() else 1
+    return week_number, index, day
+
+
+def plan_day_for_date(served_date, weeks=1):
+    """Day key served on a calendar date when the plan repeats every `weeks` weeks"""
+    # Ordinal 1 (0001-01-01) is a Monday, so whole weeks count from there
+    week = (served_date.toordinal() - 1) // 7 % max(weeks, 1) + 1
+    return plan_day(week, DAYS_ORDER[served_date.weekday()])
+
+
+class MealPlanGrid:
+    """Meal plan cells keyed by (day, meal_type) that report what changed
+
+    The view keeps one widget set per cell and per day; after each reload
+    only the keys returned by update() and the days whose summary text
+    changed need to be redrawn. Days of later weeks ('Week 2 Monday') get
+    their own rows, so a multi-week plan is patched the same way.
+    """
+
+    def __init__(self, meal_types=MEAL_TYPES_ORDER):
+        self.meal_types = list(meal_types)
+        self.cells = {}
+        self.day_texts = {}
+
+    def update(self, meal_plan):
+        """Load (day, meal_type, name, recipe_id, ...) rows and return the changed cell keys"""
+        cells = {(meal[0], meal[1]): (meal[3], meal[2]) for meal in meal_plan}
+        changed = {key for key in cells.keys() | self.cells.keys() if cells.get(key) != self.cells.get(key)}
+        self.cells = cells
+        return changed
+
+    def cell(self, day, meal_type):
+        """Return (recipe_id, name) for a slot, or None when it is empty"""
+        return self.cells.get((day, meal_type))
+
+    def planned_days(self):
+        """Days with at least one meal, in display order"""
+        return sorted({day for day, _ in self.cells}, key=day_sort_key)
+
+    def set_day_text(self, day, text):
+        """Store a day's summary text; returns True when it differs from the last one"""
+        if self.day_texts.get(day) == text:
+            return False
+        self.day_texts[day] = text
+        return True
+
+    def forget_day(self, day):
+        """Drop the remembered summary for a day that is no longer shown"""
+        self.day_texts.pop(day, None)
+
+    def clear(self):
+        """Forget everything, e.g. after the widgets were destroyed"""
+        self.cells.clear()
+        self.day_texts.clear()
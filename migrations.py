@@ -0,0 +1,644 @@
+import hashlib
+import json
+import re
+import zlib
+from collections import namedtuple
+from fractions import Fraction
+
+from mysql.connector import Error
+
+# Each migration runs once, in version order, and is recorded in schema_migrations.
+# Migrations are written to be idempotent so installs created by older versions of
+# create_tables (or by the Trial2/Trial3/trialcanva prototypes) are adopted safely.
+Migration = namedtuple("Migration", ["version", "description", "apply"])
+
+MIGRATION_LOCK = "recipe_planner_migrations"
+BACKFILL_BATCH_SIZE = 1000
+
+# MySQL errors raised when an ALGORITHM/LOCK clause is not supported for an ALTER
+UNSUPPORTED_ALTER_ERRORS = (1064, 1845, 1846)
+
+
+def column_exists(cursor, table, column):
+    """Check whether a table has a column"""
+    cursor.execute("""SELECT 1 FROM information_schema.COLUMNS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s""",
+                   (table, column))
+    return bool(cursor.fetchall())
+
+
+def index_exists(cursor, table, index):
+    """Check whether a table has an index"""
+    cursor.execute("""SELECT 1 FROM information_schema.STATISTICS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s""",
+                   (table, index))
+    return bool(cursor.fetchall())
+
+
+def alter_online(cursor, table, operation, algorithms=("INSTANT", "INPLACE")):
+    """Run an ALTER TABLE without blocking reads and writes where the server allows it
+
+    Each algorithm is tried in turn with LOCK=NONE (INSTANT takes no lock
+    clause); if the server refuses all of them the plain ALTER is used.
+    """
+    for algorithm in algorithms:
+        lock = "" if algorithm == "INSTANT" else ", LOCK=NONE"
+        try:
+            cursor.execute(f"ALTER TABLE {table} {operation}, ALGORITHM={algorithm}{lock}")
+            return
+        except Error as e:
+            if e.errno not in UNSUPPORTED_ALTER_ERRORS:
+                raise
+    cursor.execute(f"ALTER TABLE {table} {operation}")
+
+
+def add_column(cursor, table, column, definition):
+    """Add a column if it is missing"""
+    if not column_exists(cursor, table, column):
+        alter_online(cursor, table, f"ADD COLUMN {column} {definition}")
+
+
+def add_index(cursor, table, index, definition):
+    """Add an index if it is missing, e.g. definition='INDEX (tenant_id, name)'"""
+    if not index_exists(cursor, table, index):
+        kind, columns = definition.split(" ", 1)
+        alter_online(cursor, table, f"ADD {kind} {index} {columns}", algorithms=("INPLACE",))
+
+
+def drop_index(cursor, table, index):
+    """Drop an index if it exists"""
+    if index_exists(cursor, table, index):
+        alter_online(cursor, table, f"DROP INDEX {index}", algorithms=("INPLACE",))
+
+
+# Frozen copies of the app logic the backfills below depend on. A migration must
+# write the same rows however the live parser, trigram or revision code changes
+# later, so these are not imported from nutrition, fuzzy, revisions or dedupe.
+_UNIT_ALIASES = {
+    "g": "g", "gram": "g", "grams": "g", "gm": "g", "gms": "g",
+    "kg": "kg", "kilogram": "kg", "kilograms": "kg",
+    "mg": "mg",
+    "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "ml": "ml", "millilitre": "ml", "milliliter": "ml", "millilitres": "ml", "milliliters": "ml",
+    "l": "l", "litre": "l", "liter": "l", "litres": "l", "liters": "l",
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "tbsp": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "cup": "cup", "cups": "cup",
+    "pinch": "pinch", "pinches": "pinch",
+    "piece": "pc", "pieces": "pc", "pc": "pc", "pcs": "pc",
+    "clove": "pc", "cloves": "pc", "slice": "pc", "slices": "pc",
+}
+_UNIT_TO_BASE = {
+    "g": ("g", 1.0), "kg": ("g", 1000.0), "mg": ("g", 0.001),
+    "oz": ("g", 28.3495), "lb": ("g", 453.592), "pinch": ("g", 0.36),
+    "ml": ("ml", 1.0), "l": ("ml", 1000.0),
+    "tsp": ("ml", 4.92892), "tbsp": ("ml", 14.7868), "cup": ("ml", 236.588),
+    "pc": ("pc", 1.0),
+}
+_UNICODE_FRACTIONS = {"½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅛": "1/8"}
+_INGREDIENT_PATTERN = re.compile(r"^\s*(?P<qty>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)?\s*(?P<rest>.*)$")
+_WORD_PATTERN = re.compile(r"\w+")
+_REVISION_FIELDS = ["name", "ingredients", "instructions", "category", "cuisine", "cook_time", "servings"]
+
+
+def _ingredient_rows(ingredients_text):
+    """(name, base quantity, base unit) rows of an ingredients column, as parsed when 004 was written"""
+    rows = []
+    for text in ingredients_text.split(","):
+        text = text.strip()
+        if not text:
+            continue
+        for symbol, fraction in _UNICODE_FRACTIONS.items():
+            text = text.replace(symbol, f" {fraction}")
+        match = _INGREDIENT_PATTERN.match(text)
+        qty_text, rest = match.group("qty"), match.group("rest").strip()
+        quantity = None
+        if qty_text:
+            try:
+                quantity = float(sum((Fraction(part) for part in qty_text.split()), Fraction(0)))
+            except (ValueError, ZeroDivisionError):
+                rest = text
+        if quantity is None:
+            if rest:
+                rows.append((rest.lower(), None, ""))
+            continue
+
+        unit = "pc"
+        words = rest.split(None, 1)
+        if words and words[0].lower().rstrip(".") in _UNIT_ALIASES:
+            unit = _UNIT_ALIASES[words[0].lower().rstrip(".")]
+            rest = words[1] if len(words) > 1 else ""
+        if rest.lower().startswith("of "):
+            rest = rest[3:]
+        name = rest.strip().lower()
+        if name:
+            base_unit, factor = _UNIT_TO_BASE.get(unit, ("pc", 1.0))
+            rows.append((name, quantity * factor, base_unit))
+    return rows
+
+
+def _recipe_trigrams(name, ingredients):
+    """Padded word trigrams of a recipe's name and ingredient names, as indexed by 007"""
+    text = " ".join([name] + [row[0] for row in _ingredient_rows(ingredients)])
+    grams = set()
+    for word in _WORD_PATTERN.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _recipe_keyframe(fields):
+    """Compressed canonical text of a recipe, the first revision written by 010"""
+    text = json.dumps({field: fields.get(field) for field in _REVISION_FIELDS}, ensure_ascii=False, sort_keys=True,
+                      separators=(",", ":"))
+    return zlib.compress(text.encode("utf-8"))
+
+
+def _content_hash(name, ingredients):
+    """Duplicate-detection fingerprint of a recipe, as backfilled by 012"""
+    ingredient_set = sorted({(item, "" if quantity is None else f"{quantity:.6g}", unit)
+                             for item, quantity, unit in _ingredient_rows(ingredients)})
+    canonical = json.dumps([" ".join(name.lower().split()), ingredient_set], ensure_ascii=False,
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def migration_001_baseline(connection, cursor):
+    """Create the original recipes and mealplan tables"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recipes (
+            recipe_id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            ingredients TEXT NOT NULL,
+            instructions TEXT NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            cuisine VARCHAR(100),
+            cook_time INT,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mealplan (
+            plan_id INT AUTO_INCREMENT PRIMARY KEY,
+            day VARCHAR(20) NOT NULL,
+            meal_type VARCHAR(20) NOT NULL,
+            recipe_id INT,
+            FOREIGN KEY (recipe_id) REFERENCES recipes(recipe_id) ON DELETE CASCADE
+        )
+    """)
+
+
+def migration_002_align_legacy_recipes(connection, cursor):
+    """Add columns missing from recipes tables created by the prototypes"""
+    add_column(cursor, "recipes", "cuisine", "VARCHAR(100)")
+    add_column(cursor, "recipes", "cook_time", "INT")
+    add_column(cursor, "recipes", "created_date", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+
+
+def migration_003_recipe_servings(connection, cursor):
+    """Add the recipe serving size"""
+    add_column(cursor, "recipes", "servings", "INT NOT NULL DEFAULT 1")
+
+
+def migration_004_pantry(connection, cursor):
+    """Create recipe_ingredients and pantry, then backfill parsed ingredients"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            recipe_id INT NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            quantity DOUBLE,
+            unit VARCHAR(10) NOT NULL DEFAULT '',
+            INDEX idx_recipe_ingredients_name (name, unit),
+            FOREIGN KEY (recipe_id) REFERENCES recipes(recipe_id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pantry (
+            item_id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            quantity DOUBLE NOT NULL DEFAULT 0,
+            unit VARCHAR(10) NOT NULL DEFAULT 'pc',
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_pantry_name_unit (name, unit)
+        )
+    """)
+
+    # Backfill in primary key batches, committing each one so large tables stay online
+    last_id = 0
+    while True:
+        cursor.execute("""SELECT r.recipe_id, r.ingredients FROM recipes r
+                          WHERE r.recipe_id > %s
+                            AND NOT EXISTS (SELECT 1 FROM recipe_ingredients ri WHERE ri.recipe_id = r.recipe_id)
+                          ORDER BY r.recipe_id LIMIT %s""", (last_id, BACKFILL_BATCH_SIZE))
+        batch = cursor.fetchall()
+        if not batch:
+            break
+
+        rows = [(recipe_id, *row) for recipe_id, ingredients in batch for row in _ingredient_rows(ingredients)]
+        if rows:
+            cursor.executemany("""INSERT INTO recipe_ingredients (recipe_id, name, quantity, unit)
+                                  VALUES (%s, %s, %s, %s)""", rows)
+        connection.commit()
+        last_id = batch[-1][0]
+
+
+def migration_005_tenants(connection, cursor):
+    """Add tenants and tenant-leading composite indexes"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tenants (
+            tenant_id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_tenants_name (name)
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO tenants (tenant_id, name) VALUES (1, 'Default')")
+
+    for table in ("recipes", "mealplan", "recipe_ingredients", "pantry"):
+        add_column(cursor, table, "tenant_id", "INT NOT NULL DEFAULT 1")
+
+    add_index(cursor, "recipes", "idx_recipes_tenant_created", "INDEX (tenant_id, created_date)")
+    add_index(cursor, "recipes", "idx_recipes_tenant_name", "INDEX (tenant_id, name)")
+    add_index(cursor, "recipes", "idx_recipes_tenant_category", "INDEX (tenant_id, category)")
+    add_index(cursor, "mealplan", "uq_mealplan_tenant_slot", "UNIQUE (tenant_id, day, meal_type)")
+    add_index(cursor, "recipe_ingredients", "idx_recipe_ingredients_tenant_name", "INDEX (tenant_id, name, unit)")
+    add_index(cursor, "pantry", "uq_pantry_tenant_name_unit", "UNIQUE (tenant_id, name, unit)")
+    drop_index(cursor, "recipe_ingredients", "idx_recipe_ingredients_name")
+    drop_index(cursor, "pantry", "uq_pantry_name_unit")
+
+
+def migration_006_updated_dates(connection, cursor):
+    """Track last modification time so replicas can pull changes incrementally"""
+    add_column(cursor, "recipes", "updated_date",
+               "TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    add_column(cursor, "mealplan", "updated_date",
+               "TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    add_index(cursor, "recipes", "idx_recipes_tenant_updated", "INDEX (tenant_id, updated_date)")
+
+
+def migration_007_trigram_index(connection, cursor):
+    """Create the fuzzy search trigram index and backfill it"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_trigrams (
+            tenant_id INT NOT NULL,
+            trigram CHAR(3) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+            recipe_id INT NOT NULL,
+            PRIMARY KEY (tenant_id, trigram, recipe_id),
+            INDEX idx_recipe_trigrams_recipe (recipe_id),
+            FOREIGN KEY (recipe_id) REFERENCES recipes(recipe_id) ON DELETE CASCADE
+        )
+    """)
+    # Document frequency per trigram, used to probe the rarest query trigrams first
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trigram_stats (
+            tenant_id INT NOT NULL,
+            trigram CHAR(3) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+            df INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (tenant_id, trigram)
+        )
+    """)
+
+    _backfill_trigrams(connection, cursor)
+
+
+def _backfill_trigrams(connection, cursor):
+    """Index every recipe missing from recipe_trigrams, then recount trigram_stats"""
+    last_id = 0
+    while True:
+        cursor.execute("""SELECT r.recipe_id, r.tenant_id, r.name, r.ingredients FROM recipes r
+                          WHERE r.recipe_id > %s
+                            AND NOT EXISTS (SELECT 1 FROM recipe_trigrams t WHERE t.recipe_id = r.recipe_id)
+                          ORDER BY r.recipe_id LIMIT %s""", (last_id, BACKFILL_BATCH_SIZE))
+        batch = cursor.fetchall()
+        if not batch:
+            break
+
+        rows = [(tenant_id, gram, recipe_id) for recipe_id, tenant_id, name, ingredients in batch
+                for gram in _recipe_trigrams(name, ingredients)]
+        if rows:
+            cursor.executemany("INSERT IGNORE INTO recipe_trigrams (tenant_id, trigram, recipe_id) "
+                               "VALUES (%s, %s, %s)", rows)
+        connection.commit()
+        last_id = batch[-1][0]
+
+    cursor.execute("DELETE FROM trigram_stats")
+    cursor.execute("""INSERT INTO trigram_stats (tenant_id, trigram, df)
+                      SELECT tenant_id, trigram, COUNT(*) FROM recipe_trigrams GROUP BY tenant_id, trigram""")
+
+
+def migration_008_recipe_photos(connection, cursor):
+    """Create the content-addressed photo blob store and recipe photo links"""
+    # Blobs are keyed by their SHA-256, so the same photo is stored once however often it is used
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS photo_blobs (
+            photo_hash CHAR(64) CHARACTER SET ascii PRIMARY KEY,
+            size INT NOT NULL,
+            data MEDIUMBLOB NOT NULL,
+            created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_photos (
+            recipe_id INT PRIMARY KEY,
+            tenant_id INT NOT NULL,
+            photo_hash CHAR(64) CHARACTER SET ascii NOT NULL,
+            updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_recipe_photos_tenant (tenant_id),
+            INDEX idx_recipe_photos_hash (photo_hash),
+            FOREIGN KEY (recipe_id) REFERENCES recipes(recipe_id) ON DELETE CASCADE,
+            FOREIGN KEY (photo_hash) REFERENCES photo_blobs(photo_hash)
+        )
+    """)
+
+
+def migration_009_change_log(connection, cursor):
+    """Create the change feed read by other app instances"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            change_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            tenant_id INT NOT NULL,
+            entity VARCHAR(16) NOT NULL,
+            entity_key VARCHAR(255) NOT NULL,
+            op VARCHAR(8) NOT NULL,
+            changed_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_change_log_tenant (tenant_id, change_id),
+            INDEX idx_change_log_date (changed_date)
+        )
+    """)
+
+
+def migration_010_recipe_revisions(connection, cursor):
+    """Create recipe revision history and start it with a keyframe of every recipe"""
+    # No foreign key to recipes: history outlives deleted recipes so they can be restored
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recipe_revisions (
+            recipe_id INT NOT NULL,
+            revision INT NOT NULL,
+            tenant_id INT NOT NULL,
+            kind VARCHAR(8) NOT NULL,
+            data MEDIUMBLOB NOT NULL,
+            created_date TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+            PRIMARY KEY (recipe_id, revision),
+            INDEX idx_recipe_revisions_tenant (tenant_id, kind, recipe_id)
+        )
+    """)
+
+    last_id = 0
+    while True:
+        cursor.execute(f"""SELECT r.recipe_id, r.tenant_id, {', '.join('r.' + field for field in _REVISION_FIELDS)}
+                           FROM recipes r
+                           WHERE r.recipe_id > %s
+                             AND NOT EXISTS (SELECT 1 FROM recipe_revisions v WHERE v.recipe_id = r.recipe_id)
+                           ORDER BY r.recipe_id LIMIT %s""", (last_id, BACKFILL_BATCH_SIZE))
+        batch = cursor.fetchall()
+        if not batch:
+            break
+
+        cursor.executemany("""INSERT IGNORE INTO recipe_revisions (recipe_id, revision, tenant_id, kind, data)
+                              VALUES (%s, 1, %s, 'key', %s)""",
+                           [(row[0], row[1], _recipe_keyframe(dict(zip(_REVISION_FIELDS, row[2:]))))
+                            for row in batch])
+        connection.commit()
+        last_id = batch[-1][0]
+
+
+def migration_011_meal_history(connection, cursor):
+    """Create meal history and its day/week/month rollups"""
+    # What was planned for each calendar date, copied from the recipe at the time so
+    # later edits and deletes do not rewrite history; no foreign key for the same reason
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meal_history (
+            tenant_id INT NOT NULL,
+            served_date DATE NOT NULL,
+            meal_type VARCHAR(20) NOT NULL,
+            recipe_id INT NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            cuisine VARCHAR(100) NOT NULL DEFAULT '',
+            cook_time INT,
+            servings INT NOT NULL DEFAULT 1,
+            PRIMARY KEY (tenant_id, served_date, meal_type)
+        )
+    """)
+    # Rollups are only ever incremented as meals are recorded, one row per period and key
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meal_rollup_recipes (
+            tenant_id INT NOT NULL,
+            period VARCHAR(5) NOT NULL,
+            period_start DATE NOT NULL,
+            recipe_id INT NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            meals INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (tenant_id, period, period_start, recipe_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meal_rollup_cuisines (
+            tenant_id INT NOT NULL,
+            period VARCHAR(5) NOT NULL,
+            period_start DATE NOT NULL,
+            cuisine VARCHAR(100) NOT NULL,
+            meals INT NOT NULL DEFAULT 0,
+            cook_time_total BIGINT NOT NULL DEFAULT 0,
+            cook_time_meals INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (tenant_id, period, period_start, cuisine)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meal_rollup_ingredients (
+            tenant_id INT NOT NULL,
+            period VARCHAR(5) NOT NULL,
+            period_start DATE NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            unit VARCHAR(10) NOT NULL DEFAULT '',
+            quantity DOUBLE NOT NULL DEFAULT 0,
+            meals INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (tenant_id, period, period_start, name, unit)
+        )
+    """)
+
+
+def migration_012_recipe_content_hash(connection, cursor):
+    """Add the duplicate-detection fingerprint of every recipe, unique per tenant"""
+    add_column(cursor, "recipes", "content_hash", "CHAR(64) CHARACTER SET ascii NULL")
+    add_index(cursor, "recipes", "uq_recipes_tenant_content_hash", "UNIQUE (tenant_id, content_hash)")
+
+    # Oldest copy first: it takes the hash, later duplicates are skipped by IGNORE and keep
+    # a NULL hash until DatabaseManager.dedupe_recipes merges them into it
+    last_id = 0
+    while True:
+        cursor.execute("""SELECT recipe_id, name, ingredients FROM recipes
+                          WHERE recipe_id > %s AND content_hash IS NULL
+                          ORDER BY recipe_id LIMIT %s""", (last_id, BACKFILL_BATCH_SIZE))
+        batch = cursor.fetchall()
+        if not batch:
+            break
+
+        cursor.executemany("""UPDATE IGNORE recipes SET content_hash = %s, updated_date = updated_date
+                              WHERE recipe_id = %s""",
+                           [(_content_hash(name, ingredients), recipe_id)
+                            for recipe_id, name, ingredients in batch])
+        connection.commit()
+        last_id = batch[-1][0]
+
+
+def migration_013_updated_date_indexes(connection, cursor):
+    """Index meal plan and pantry modification times so the data version is read from indexes only"""
+    add_index(cursor, "mealplan", "idx_mealplan_tenant_updated", "INDEX (tenant_id, updated_date)")
+    add_index(cursor, "pantry", "idx_pantry_tenant_updated", "INDEX (tenant_id, updated_date)")
+
+
+def migration_014_binary_trigrams(connection, cursor):
+    """Store trigrams as bytes and rebuild the fuzzy index
+
+    CHAR(3) with a PAD SPACE collation dropped the trailing space of
+    trigrams such as 'ab ', so those never matched a query. The index
+    cannot be repaired in place, so both tables are emptied, converted
+    and backfilled again; fuzzy search finds nothing until that is done.
+    """
+    cursor.execute("TRUNCATE TABLE recipe_trigrams")
+    cursor.execute("TRUNCATE TABLE trigram_stats")
+    # Three characters of up to four UTF-8 bytes each
+    cursor.execute("ALTER TABLE recipe_trigrams MODIFY trigram VARBINARY(12) NOT NULL")
+    cursor.execute("ALTER TABLE trigram_stats MODIFY trigram VARBINARY(12) NOT NULL")
+    _backfill_trigrams(connection, cursor)
+
+
+def migration_015_meal_history_ingredients(connection, cursor):
+    """Snapshot the ingredients of every recorded meal
+
+    Ingredient demand was rolled up from the current recipe_ingredients, so
+    editing a recipe changed what its past meals were made of. Meals already
+    recorded get the ingredients their recipes have now, the best record left.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meal_history_ingredients (
+            tenant_id INT NOT NULL,
+            served_date DATE NOT NULL,
+            meal_type VARCHAR(20) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            quantity DOUBLE,
+            unit VARCHAR(10) NOT NULL DEFAULT '',
+            INDEX idx_meal_history_ingredients_meal (tenant_id, served_date, meal_type)
+        )
+    """)
+    cursor.execute("""INSERT INTO meal_history_ingredients (tenant_id, served_date, meal_type, name, quantity, unit)
+                      SELECT h.tenant_id, h.served_date, h.meal_type, ri.name, ri.quantity, ri.unit
+                      FROM meal_history h
+                      JOIN recipe_ingredients ri ON ri.recipe_id = h.recipe_id
+                      WHERE NOT EXISTS (SELECT 1 FROM meal_history_ingredients hi
+                                        WHERE hi.tenant_id = h.tenant_id AND hi.served_date = h.served_date
+                                          AND hi.meal_type = h.meal_type)""")
+
+
+MIGRATIONS = [
+    Migration(1, "baseline recipes and mealplan tables", migration_001_baseline),
+    Migration(2, "align legacy recipes columns", migration_002_align_legacy_recipes),
+    Migration(3, "recipe servings", migration_003_recipe_servings),
+    Migration(4, "pantry and parsed recipe ingredients", migration_004_pantry),
+    Migration(5, "tenants and tenant-scoped indexes", migration_005_tenants),
+    Migration(6, "recipe and meal plan modification times", migration_006_updated_dates),
+    Migration(7, "fuzzy search trigram index", migration_007_trigram_index),
+    Migration(8, "recipe photo blob store", migration_008_recipe_photos),
+    Migration(9, "change feed", migration_009_change_log),
+    Migration(10, "recipe revision history", migration_010_recipe_revisions),
+    Migration(11, "meal history rollups", migration_011_meal_history),
+    Migration(12, "recipe content hash for duplicate detection", migration_012_recipe_content_hash),
+    Migration(13, "meal plan and pantry modification time indexes", migration_013_updated_date_indexes),
+    Migration(14, "binary trigram columns", migration_014_binary_trigrams),
+    Migration(15, "meal history ingredient snapshots", migration_015_meal_history_ingredients),
+]
+
+# Indexes the queries in DatabaseManager rely on: (table, index) -> definition
+REQUIRED_INDEXES = {
+    ("recipes", "idx_recipes_tenant_created"): "INDEX (tenant_id, created_date)",
+    ("recipes", "idx_recipes_tenant_name"): "INDEX (tenant_id, name)",
+    ("recipes", "idx_recipes_tenant_category"): "INDEX (tenant_id, category)",
+    ("recipes", "idx_recipes_tenant_updated"): "INDEX (tenant_id, updated_date)",
+    ("recipes", "uq_recipes_tenant_content_hash"): "UNIQUE (tenant_id, content_hash)",
+    ("mealplan", "uq_mealplan_tenant_slot"): "UNIQUE (tenant_id, day, meal_type)",
+    ("mealplan", "idx_mealplan_tenant_updated"): "INDEX (tenant_id, updated_date)",
+    ("recipe_ingredients", "idx_recipe_ingredients_tenant_name"): "INDEX (tenant_id, name, unit)",
+    ("pantry", "uq_pantry_tenant_name_unit"): "UNIQUE (tenant_id, name, unit)",
+    ("pantry", "idx_pantry_tenant_updated"): "INDEX (tenant_id, updated_date)",
+    ("recipe_trigrams", "idx_recipe_trigrams_recipe"): "INDEX (recipe_id)",
+    ("recipe_photos", "idx_recipe_photos_tenant"): "INDEX (tenant_id)",
+    ("change_log", "idx_change_log_tenant"): "INDEX (tenant_id, change_id)",
+    ("recipe_revisions", "idx_recipe_revisions_tenant"): "INDEX (tenant_id, kind, recipe_id)",
+    ("meal_history_ingredients", "idx_meal_history_ingredients_meal"): "INDEX (tenant_id, served_date, meal_type)",
+}
+
+
+def get_applied_versions(cursor):
+    """Return the set of applied migration versions"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations(connection, migrations=MIGRATIONS):
+    """Apply pending migrations in order and return the versions applied
+
+    A named lock keeps several app instances starting at once from running
+    the same migration twice.
+    """
+    cursor = connection.cursor()
+    applied_now = []
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (MIGRATION_LOCK,))
+        if cursor.fetchall()[0][0] != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+
+        try:
+            applied = get_applied_versions(cursor)
+            for migration in sorted(migrations, key=lambda m: m.version):
+                if migration.version in applied:
+                    continue
+                print(f"Applying migration {migration.version}: {migration.description}")
+                migration.apply(connection, cursor)
+                cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                               (migration.version, migration.description))
+                connection.commit()
+                applied_now.append(migration.version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+
+    return applied_now
+
+
+def find_missing_indexes(connection, required=REQUIRED_INDEXES):
+    """Return the (table, index) pairs from required that do not exist"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS
+                          WHERE TABLE_SCHEMA = DATABASE()""")
+        existing = set(cursor.fetchall())
+    finally:
+        cursor.close()
+    return [key for key in required if key not in existing]
+
+
+def ensure_required_indexes(connection, required=REQUIRED_INDEXES):
+    """Recreate any missing performance-critical index online and return what was missing"""
+    missing = find_missing_indexes(connection, required)
+    if not missing:
+        return []
+
+    cursor = connection.cursor()
+    try:
+        for table, index in missing:
+            print(f"Missing index {index} on {table}, rebuilding")
+            add_index(cursor, table, index, required[(table, index)])
+        connection.commit()
+    finally:
+        cursor.close()
+    return missing
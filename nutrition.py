@@ -0,0 +1,292 @@
+import csv
+import os
+import re
+from collections import namedtuple
+from fractions import Fraction
+
+import numpy as np
+
+# Nutrient table shipped with the project (values per 100 g)
+NUTRIENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nutrients.csv")
+NUTRIENT_COLUMNS = ["calories", "protein", "carbs", "fat", "fiber"]
+NUTRIENT_UNITS = {"calories": "kcal", "protein": "g", "carbs": "g", "fat": "g", "fiber": "g"}
+
+# Unit aliases -> canonical unit
+UNIT_ALIASES = {
+    "g": "g", "gram": "g", "grams": "g", "gm": "g", "gms": "g",
+    "kg": "kg", "kilogram": "kg", "kilograms": "kg",
+    "mg": "mg",
+    "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "ml": "ml", "millilitre": "ml", "milliliter": "ml", "millilitres": "ml", "milliliters": "ml",
+    "l": "l", "litre": "l", "liter": "l", "litres": "l", "liters": "l",
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "tbsp": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "cup": "cup", "cups": "cup",
+    "pinch": "pinch", "pinches": "pinch",
+    "piece": "pc", "pieces": "pc", "pc": "pc", "pcs": "pc",
+    "clove": "pc", "cloves": "pc", "slice": "pc", "slices": "pc",
+}
+
+# Canonical unit -> (base unit, factor). Base units are g, ml and pc.
+UNIT_TO_BASE = {
+    "g": ("g", 1.0), "kg": ("g", 1000.0), "mg": ("g", 0.001),
+    "oz": ("g", 28.3495), "lb": ("g", 453.592), "pinch": ("g", 0.36),
+    "ml": ("ml", 1.0), "l": ("ml", 1000.0),
+    "tsp": ("ml", 4.92892), "tbsp": ("ml", 14.7868), "cup": ("ml", 236.588),
+    "pc": ("pc", 1.0),
+}
+
+UNICODE_FRACTIONS = {"½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅛": "1/8"}
+
+INGREDIENT_PATTERN = re.compile(
+    r"^\s*(?P<qty>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)?\s*(?P<rest>.*)$"
+)
+
+Ingredient = namedtuple("Ingredient", ["quantity", "unit", "name"])
+
+
+def parse_quantity(text):
+    """Parse '2', '1/2', '1 1/2' or '0.5' into a float; None for a malformed one such as '1/0'"""
+    total = Fraction(0)
+    try:
+        for part in text.split():
+            total += Fraction(part)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return float(total)
+
+
+def parse_ingredient(text):
+    """Parse one ingredient such as '2 cups flour' into an Ingredient"""
+    text = text.strip()
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        text = text.replace(symbol, f" {fraction}")
+
+    match = INGREDIENT_PATTERN.match(text)
+    qty_text, rest = match.group("qty"), match.group("rest").strip()
+    if not qty_text:
+        return Ingredient(None, "", rest.lower())
+
+    quantity = parse_quantity(qty_text)
+    if quantity is None:
+        return Ingredient(None, "", text.lower())
+    unit = "pc"
+    words = rest.split(None, 1)
+    if words and words[0].lower().rstrip(".") in UNIT_ALIASES:
+        unit = UNIT_ALIASES[words[0].lower().rstrip(".")]
+        rest = words[1] if len(words) > 1 else ""
+    if rest.lower().startswith("of "):
+        rest = rest[3:]
+
+    return Ingredient(quantity, unit, rest.strip().lower())
+
+
+def parse_ingredients(ingredients_text):
+    """Parse a comma separated ingredients column"""
+    return [parse_ingredient(item) for item in ingredients_text.split(',') if item.strip()]
+
+
+def to_base_unit(quantity, unit):
+    """Convert a quantity to its base unit (g, ml or pc)"""
+    base_unit, factor = UNIT_TO_BASE.get(unit, ("pc", 1.0))
+    return quantity * factor, base_unit
+
+
+def recipe_ingredient_rows(ingredients_text):
+    """Return (name, base quantity, base unit) rows for a recipe's ingredients
+
+    Ingredients without a quantity get a None quantity and an empty unit.
+    """
+    rows = []
+    for ingredient in parse_ingredients(ingredients_text):
+        if not ingredient.name:
+            continue
+        if ingredient.quantity is None:
+            rows.append((ingredient.name, None, ""))
+        else:
+            quantity, base_unit = to_base_unit(ingredient.quantity, ingredient.unit)
+            rows.append((ingredient.name, quantity, base_unit))
+    return rows
+
+
+def format_quantity(quantity):
+    """Format a quantity without trailing zeros"""
+    if quantity is None:
+        return ""
+    return f"{round(quantity, 2):g}"
+
+
+def format_ingredient(ingredient):
+    """Format an Ingredient back into display text"""
+    if ingredient.quantity is None:
+        return ingredient.name
+    unit = "" if ingredient.unit == "pc" else f" {ingredient.unit}"
+    return f"{format_quantity(ingredient.quantity)}{unit} {ingredient.name}".strip()
+
+
+def scale_ingredients(ingredients_text, from_servings, to_servings):
+    """Scale a recipe's ingredients from one serving count to another"""
+    factor = to_servings / (from_servings or 1)
+    scaled = []
+    for ingredient in parse_ingredients(ingredients_text):
+        if ingredient.quantity is not None:
+            ingredient = ingredient._replace(quantity=ingredient.quantity * factor)
+        scaled.append(ingredient)
+    return scaled
+
+
+def aggregate_ingredients(recipe_rows, household_size):
+    """Combine (ingredients, servings) rows scaled to the household size
+
+    Quantities of the same ingredient are summed, converting to base units
+    only when the recipes use different units. Ingredients without a
+    quantity are listed once by name.
+    """
+    totals = {}
+    units = {}
+    unquantified = set()
+    for ingredients_text, servings in recipe_rows:
+        for ingredient in scale_ingredients(ingredients_text, servings, household_size):
+            if ingredient.quantity is None:
+                unquantified.add(ingredient.name)
+                continue
+            quantity, base_unit = to_base_unit(ingredient.quantity, ingredient.unit)
+            key = (ingredient.name, base_unit)
+            totals[key] = totals.get(key, 0.0) + quantity
+            units.setdefault(key, set()).add(ingredient.unit)
+
+    items = []
+    for (name, base_unit), quantity in totals.items():
+        unit = base_unit
+        if len(units[(name, base_unit)]) == 1:
+            unit = units[(name, base_unit)].pop()
+            quantity /= UNIT_TO_BASE[unit][1]
+        items.append((name, format_ingredient(Ingredient(quantity, unit, name))))
+
+    quantified_names = {name for name, _ in totals}
+    items.extend((name, name) for name in unquantified if name not in quantified_names)
+    return [text for _, text in sorted(items)]
+
+
+class NutritionEngine:
+    """Per-serving recipe nutrition and vectorized meal plan totals"""
+
+    def __init__(self, table_path=NUTRIENTS_FILE):
+        self.names = []
+        grams_per_piece = []
+        density = []
+        values = []
+
+        with open(table_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.names.append(row["name"].lower())
+                grams_per_piece.append(float(row["grams_per_piece"] or "nan"))
+                density.append(float(row["density"] or "nan"))
+                values.append([float(row[column]) for column in NUTRIENT_COLUMNS])
+
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # Longest names first so 'chicken breast' wins over 'chicken'
+        self.match_order = sorted(self.names, key=len, reverse=True)
+        self.grams_per_piece = np.array(grams_per_piece)
+        self.density = np.array(density)
+        # Nutrients per gram, shape (ingredients, nutrients)
+        self.per_gram = np.array(values).reshape(-1, len(NUTRIENT_COLUMNS)) / 100.0
+
+        self._recipe_cache = {}
+        self._plan_cache = {}
+
+    def match(self, name):
+        """Find the nutrient table row for an ingredient name"""
+        name = name.lower().strip()
+        if name in self.index:
+            return self.index[name]
+        for candidate in (name[:-2] if name.endswith("es") else None, name[:-1] if name.endswith("s") else None):
+            if candidate and candidate in self.index:
+                return self.index[candidate]
+        for known in self.match_order:
+            if re.search(rf"\b{re.escape(known)}", name):
+                return self.index[known]
+        return None
+
+    def ingredient_grams(self, ingredients):
+        """Return (row indices, grams) arrays for the recognised ingredients"""
+        rows = []
+        amounts = []
+        for ingredient in ingredients:
+            if ingredient.quantity is None:
+                continue
+            row = self.match(ingredient.name)
+            if row is None:
+                continue
+            quantity, base_unit = to_base_unit(ingredient.quantity, ingredient.unit)
+            if base_unit == "ml":
+                quantity *= self.density[row]
+            elif base_unit == "pc":
+                quantity *= self.grams_per_piece[row]
+            if np.isnan(quantity):
+                continue
+            rows.append(row)
+            amounts.append(quantity)
+        return np.array(rows, dtype=np.intp), np.array(amounts, dtype=float)
+
+    def recipe_per_serving(self, ingredients_text, servings=1):
+        """Nutrient vector for one serving of a recipe (cached)"""
+        key = (ingredients_text, servings)
+        vector = self._recipe_cache.get(key)
+        if vector is None:
+            rows, grams = self.ingredient_grams(parse_ingredients(ingredients_text))
+            vector = grams @ self.per_gram[rows] / (servings or 1)
+            if len(self._recipe_cache) >= 4096:
+                self._recipe_cache.clear()
+            self._recipe_cache[key] = vector
+        return vector
+
+    def recipe_totals(self, ingredients_text, servings=1, target_servings=None):
+        """Nutrition dict for a recipe, optionally scaled to target_servings"""
+        vector = self.recipe_per_serving(ingredients_text, servings) * (target_servings or servings or 1)
+        return dict(zip(NUTRIENT_COLUMNS, vector.tolist()))
+
+    def plan_totals(self, plan_rows, household_size=1):
+        """Vectorized per-day and overall totals for a meal plan
+
+        plan_rows is a sequence of (day, ingredients, servings) tuples covering
+        any number of days (a week or a month). Returns (days, daily, total)
+        where daily has shape (len(days), nutrients).
+        """
+        signature = (tuple(plan_rows), household_size)
+        cached = self._plan_cache.get(signature)
+        if cached is not None:
+            return cached
+
+        days = list(dict.fromkeys(row[0] for row in plan_rows))
+        day_index = {day: i for i, day in enumerate(days)}
+
+        # Unique recipes -> per-serving matrix, then one gather + scatter-add
+        recipe_keys = list(dict.fromkeys((row[1], row[2]) for row in plan_rows))
+        recipe_index = {key: i for i, key in enumerate(recipe_keys)}
+        per_serving = np.zeros((len(recipe_keys), len(NUTRIENT_COLUMNS)))
+        for i, (ingredients_text, servings) in enumerate(recipe_keys):
+            per_serving[i] = self.recipe_per_serving(ingredients_text, servings)
+
+        slot_days = np.array([day_index[row[0]] for row in plan_rows], dtype=np.intp)
+        slot_recipes = np.array([recipe_index[(row[1], row[2])] for row in plan_rows], dtype=np.intp)
+
+        daily = np.zeros((len(days), len(NUTRIENT_COLUMNS)))
+        np.add.at(daily, slot_days, per_serving[slot_recipes] * household_size)
+
+        result = (days, daily, daily.sum(axis=0))
+        if len(self._plan_cache) >= 32:
+            self._plan_cache.clear()
+        self._plan_cache[signature] = result
+        return result
+
+    def daily_totals(self, plan_rows, household_size=1):
+        """Return {day: {nutrient: value}} for a meal plan"""
+        days, daily, _ = self.plan_totals(plan_rows, household_size)
+        return {day: dict(zip(NUTRIENT_COLUMNS, daily[i].tolist())) for i, day in enumerate(days)}
+
+    def clear_cache(self):
+        """Drop cached recipe vectors and plan totals"""
+        self._recipe_cache.clear()
+        self._plan_cache.clear()
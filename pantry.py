@@ -0,0 +1,98 @@
+from nutrition import UNIT_ALIASES, Ingredient, format_ingredient, parse_ingredient, to_base_unit
+
+
+def normalize_stock(name, quantity, unit="pc"):
+    """Normalize a pantry entry to (name, quantity, base unit)"""
+    unit = UNIT_ALIASES.get(unit.strip().lower().rstrip("."), "pc") if unit else "pc"
+    quantity, base_unit = to_base_unit(float(quantity), unit)
+    return name.strip().lower(), quantity, base_unit
+
+
+def parse_stock_line(line):
+    """Parse a pantry line such as '500 g flour' into a normalized entry"""
+    ingredient = parse_ingredient(line)
+    if ingredient.quantity is None or not ingredient.name:
+        return None
+    quantity, base_unit = to_base_unit(ingredient.quantity, ingredient.unit)
+    return ingredient.name, quantity, base_unit
+
+
+def format_net_item(name, unit, quantity):
+    """Format a netted shopping list row"""
+    if not unit:
+        return name
+    return format_ingredient(Ingredient(quantity, unit, name))
+
+
+class ShoppingListNetter:
+    """Plan requirements minus pantry stock, re-netted one item at a time
+
+    Requirements and stock are keyed by (name, base unit). Items without a
+    quantity use an empty unit and are needed unless the pantry holds a
+    positive amount of them.
+    """
+
+    def __init__(self, requirements=(), stock=()):
+        self.requirements = {}
+        self.stock = {}
+        self.stocked_names = {}
+        self.net = {}
+        self.load(requirements, stock)
+
+    def load(self, requirements, stock):
+        """Load (name, unit, quantity) rows and net everything once"""
+        self.requirements = {(name, unit): quantity for name, unit, quantity in requirements}
+        self.stock = {}
+        self.stocked_names = {}
+        for name, unit, quantity in stock:
+            self._store(name, unit, quantity)
+        self.net = {}
+        for key in self.requirements:
+            self._renet(key)
+
+    def _store(self, name, unit, quantity):
+        """Record stock and keep the per-name count of items on hand"""
+        key = (name, unit)
+        was_stocked = self.stock.get(key, 0) > 0
+        if quantity is None:
+            self.stock.pop(key, None)
+        else:
+            self.stock[key] = quantity
+        is_stocked = self.stock.get(key, 0) > 0
+        self.stocked_names[name] = self.stocked_names.get(name, 0) + is_stocked - was_stocked
+
+    def _renet(self, key):
+        """Recompute the net amount for one requirement"""
+        if key not in self.requirements:
+            return
+        name, unit = key
+        if not unit:
+            needed = None if self.stocked_names.get(name) else 0
+        else:
+            needed = self.requirements[key] - self.stock.get(key, 0)
+            needed = needed if needed > 1e-9 else None
+
+        if needed is None:
+            self.net.pop(key, None)
+        else:
+            self.net[key] = needed
+
+    def set_stock(self, name, unit, quantity):
+        """Apply a stock change (None removes it); only affected items are re-netted
+
+        Returns the (name, unit) keys whose net amount changed.
+        """
+        keys = ((name, unit), (name, ""))
+        before = {key: self.net.get(key) for key in keys}
+        self._store(name, unit, quantity)
+        for key in keys:
+            self._renet(key)
+        return {key for key in keys if self.net.get(key) != before[key]}
+
+    def items(self):
+        """Return the netted (name, unit, quantity) rows sorted by name"""
+        return [(name, unit, quantity) for (name, unit), quantity in sorted(self.net.items())]
+
+    def formatted(self):
+        """Return the netted shopping list as display strings"""
+        return [format_net_item(name, unit, quantity) for name, unit, quantity in self.items()]
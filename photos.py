@@ -0,0 +1,178 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Photos are optional; without Pillow no thumbnails are shown
+    Image = None
+
+PHOTO_DIR = os.path.join(os.path.expanduser("~"), ".recipe_planner", "photos")
+THUMBNAIL_SIZE = (96, 96)
+# Decoded thumbnails kept in memory; at 96x96 RGBA this is roughly 900 images
+MEMORY_LIMIT = 32 * 1024 * 1024
+MAX_PHOTO_BYTES = 16 * 1024 * 1024
+
+
+def photo_hash(data):
+    """Content address of a photo"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def write_atomic(path, data):
+    """Write a file so readers never see it half-written"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def is_photo(data):
+    """Check that bytes decode as an image Pillow can read"""
+    if Image is None:
+        return False
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+        return True
+    except Exception:
+        return False
+
+
+def make_thumbnail(source_path, thumbnail_path, size):
+    """Scale a photo down to a PNG thumbnail; runs in a worker process"""
+    with Image.open(source_path) as image:
+        image.thumbnail(size)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(thumbnail_path), suffix=".png")
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, format="PNG")
+    os.replace(tmp_path, thumbnail_path)
+    return thumbnail_path
+
+
+class PhotoCache:
+    """Content-addressed photo blobs and thumbnails on disk, with a bounded LRU in memory
+
+    Blobs are fetched from the database once and kept under root/blobs;
+    thumbnails are built in a process pool and kept under root/thumbs.
+    Only thumbnails that are requested (visible rows) are decoded, off the
+    Tk thread, and decoded images beyond memory_limit are evicted least
+    recently used. The Tk thread calls poll() to pick up finished ones.
+    """
+
+    def __init__(self, db, root=PHOTO_DIR, size=THUMBNAIL_SIZE, memory_limit=MEMORY_LIMIT, workers=2):
+        self.db = db
+        self.root = root
+        self.size = size
+        self.memory_limit = memory_limit
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.pending = {}
+        self.enabled = Image is not None
+        self.fetcher = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photos") if self.enabled else None
+        # Spawned rather than forked: the app already runs sync and fetcher threads, and a
+        # forked child could inherit a lock one of them held
+        self.builder = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) \
+            if self.enabled else None
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def thumbnail_path(self, digest):
+        return os.path.join(self.root, "thumbs", f"{self.size[0]}x{self.size[1]}", digest[:2], f"{digest}.png")
+
+    def store_blob(self, data):
+        """Keep a photo in the local blob store and return its hash"""
+        digest = photo_hash(data)
+        if not os.path.exists(self.blob_path(digest)):
+            write_atomic(self.blob_path(digest), data)
+        return digest
+
+    def _ensure_blob(self, digest):
+        """Path of a local blob, fetching it from the database if needed"""
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            data = self.db.get_photo_blob(digest)
+            if not data or photo_hash(data) != digest:
+                return None
+            write_atomic(path, data)
+        return path
+
+    def _prepare_thumbnail(self, digest):
+        """Build the thumbnail on disk if needed and decode it; runs on a fetcher thread"""
+        path = self.thumbnail_path(digest)
+        if not os.path.exists(path):
+            blob = self._ensure_blob(digest)
+            if blob is None:
+                return None
+            self.builder.submit(make_thumbnail, blob, path, self.size).result()
+        with Image.open(path) as image:
+            image.load()
+            return image.copy()
+
+    def thumbnail(self, digest):
+        """Decoded thumbnail if it is in memory, refreshing its LRU position"""
+        image = self.memory.get(digest)
+        if image is not None:
+            self.memory.move_to_end(digest)
+        return image
+
+    def request(self, digest):
+        """Start preparing a thumbnail in the background unless it is cached or pending"""
+        if not self.enabled or digest in self.memory or digest in self.pending:
+            return
+        self.pending[digest] = self.fetcher.submit(self._prepare_thumbnail, digest)
+
+    def poll(self):
+        """Move finished thumbnails into the LRU and return their hashes"""
+        ready = []
+        for digest, future in list(self.pending.items()):
+            if not future.done():
+                continue
+            del self.pending[digest]
+            try:
+                image = future.result()
+            except Exception as e:
+                print(f"Error building thumbnail {digest[:12]}: {e}")
+                continue
+            if image is not None:
+                self._remember(digest, image)
+                ready.append(digest)
+        return ready
+
+    def _remember(self, digest, image):
+        """Add a decoded image and evict the least recently used beyond the memory limit"""
+        self.memory[digest] = image
+        self.memory_bytes += image.width * image.height * len(image.getbands())
+        while self.memory_bytes > self.memory_limit and len(self.memory) > 1:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_bytes -= evicted.width * evicted.height * len(evicted.getbands())
+
+    def placeholder(self):
+        """Blank image the size of a thumbnail, shown until the real one is decoded"""
+        return Image.new("RGBA", self.size, (0, 0, 0, 0))
+
+    def load_photo(self, digest, max_size):
+        """Decode a full photo scaled to fit max_size, for the recipe view"""
+        if not self.enabled:
+            return None
+        path = self._ensure_blob(digest)
+        if path is None:
+            return None
+        with Image.open(path) as image:
+            image.thumbnail(max_size)
+            return image.copy()
+
+    def shutdown(self):
+        """Stop the background workers"""
+        if self.enabled:
+            self.fetcher.shutdown(wait=False, cancel_futures=True)
+            self.builder.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,329 @@
+"""Headless command line interface for the recipe planner
+
+Runs planner operations without the GUI so they can be scripted or
+scheduled, e.g.:
+
+    python planner_cli.py shopping-list --tenant 2 --household 4 -o list.csv
+    python planner_cli.py export --tenant 2 -o exports/
+    python planner_cli.py analytics --tenant 2
+    python planner_cli.py history --tenant 2 --period month
+    python planner_cli.py nightly --output-dir /var/lib/recipe_planner --workers 4
+    python planner_cli.py dedupe
+    python planner_cli.py backup -o planner-backup.tar
+    python planner_cli.py restore -i planner-backup.tar
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+
+from database import DatabaseManager, DEFAULT_TENANT_ID, RECIPE_COLUMNS
+from backup import backup_database, restore_database, BackupError
+from nutrition import NutritionEngine, NUTRIENT_COLUMNS
+from history import ROLLUP_PERIODS, trend_window, period_range, build_trend
+
+MEAL_PLAN_COLUMNS = ["day", "meal_type", "recipe_name", "recipe_id", "ingredients", "servings"]
+
+# Per-process connection for nightly workers
+_worker_db = None
+
+
+def count_by(rows, index):
+    """Count rows by the value at a tuple position"""
+    counts = {}
+    for row in rows:
+        key = row[index] or "Unspecified"
+        counts[key] = counts.get(key, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def round_nutrients(vector):
+    """Nutrient vector as a {nutrient: value} dict rounded for reports"""
+    return {column: round(value, 1) for column, value in zip(NUTRIENT_COLUMNS, vector.tolist())}
+
+
+def build_analytics(db, household_size=1, nutrition=None):
+    """Collect the numbers shown on the analytics page as a dict"""
+    recipes = db.get_all_recipes()
+    meal_plan = db.get_meal_plan()
+    nutrition = nutrition or NutritionEngine()
+
+    plan_rows = [(day, ingredients, servings) for day, _, _, _, ingredients, servings in meal_plan]
+    days, daily, total = nutrition.plan_totals(plan_rows, household_size)
+
+    return {
+        "tenant_id": db.tenant_id,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "household_size": household_size,
+        "recipe_count": len(recipes),
+        "planned_meals": len(meal_plan),
+        "categories": count_by(recipes, 4),
+        "cuisines": count_by(recipes, 5),
+        "meal_types": count_by(meal_plan, 1),
+        "daily_nutrition": {day: round_nutrients(daily[i]) for i, day in enumerate(days)},
+        "plan_nutrition": round_nutrients(total),
+    }
+
+
+def build_history(db, period="month", household_size=1, today=None):
+    """Collect meal history trends from the rollups as a dict"""
+    today = today or date.today()
+    since = trend_window(today, period)
+    starts = period_range(since, today, period)
+    cuisines, average_cook_time = build_trend(db.get_meal_trend(period, since), starts, top=None)
+    return {
+        "tenant_id": db.tenant_id,
+        "period": period,
+        "periods": [start.isoformat() for start in starts],
+        "cuisines": cuisines,
+        "average_cook_time": [None if value is None else round(value, 1) for value in average_cook_time],
+        "top_recipes": [{"recipe_id": recipe_id, "name": name, "meals": int(meals)}
+                        for recipe_id, name, meals in db.get_top_planned_recipes(period, since)],
+        "ingredient_demand": [{"name": name, "unit": unit, "quantity": round(quantity * household_size, 2),
+                               "meals": int(meals)}
+                              for name, unit, quantity, meals in db.get_ingredient_demand(period, since)],
+    }
+
+
+def write_csv(path, header, rows):
+    """Write rows to a CSV file (or stdout when path is '-')"""
+    if path == "-":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(header)
+        writer.writerows(rows)
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_json(path, data):
+    """Write JSON to a file (or stdout when path is '-')"""
+    if path == "-":
+        json.dump(data, sys.stdout, indent=2, default=str)
+        sys.stdout.write("\n")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+
+
+def export_tenant(db, output_dir, household_size=1, nutrition=None):
+    """Write the recipes, meal plan, shopping list and analytics files for one tenant"""
+    os.makedirs(output_dir, exist_ok=True)
+    recipe_header = [column.strip() for column in RECIPE_COLUMNS.split(",")]
+    write_csv(os.path.join(output_dir, "recipes.csv"), recipe_header, db.get_all_recipes())
+    write_csv(os.path.join(output_dir, "meal_plan.csv"), MEAL_PLAN_COLUMNS, db.get_meal_plan())
+    write_csv(os.path.join(output_dir, "shopping_list.csv"), ["ingredient"],
+              [[item] for item in db.get_shopping_list(household_size)])
+    write_json(os.path.join(output_dir, "analytics.json"), build_analytics(db, household_size, nutrition))
+    write_json(os.path.join(output_dir, "history.json"), build_history(db, "month", household_size))
+
+
+def connect(args):
+    """Open a manager for the requested tenant or exit with an error"""
+    db = DatabaseManager(args.tenant)
+    if not db.is_connected():
+        sys.exit("Could not connect to MySQL; check DB_CONFIG or the RECIPE_PLANNER_DB_* variables")
+    return db
+
+
+def cmd_tenants(args):
+    """List households"""
+    db = connect(args)
+    write_csv(args.output, ["tenant_id", "name"], db.get_tenants())
+
+
+def cmd_recipes(args):
+    """List or search recipes"""
+    db = connect(args)
+    recipes = db.search_recipes(args.search, args.by) if args.search else db.get_all_recipes()
+    write_csv(args.output, [column.strip() for column in RECIPE_COLUMNS.split(",")], recipes)
+
+
+def cmd_shopping_list(args):
+    """Print the netted shopping list"""
+    db = connect(args)
+    write_csv(args.output, ["ingredient"], [[item] for item in db.get_shopping_list(args.household)])
+
+
+def cmd_export(args):
+    """Export every data set for one tenant into a directory"""
+    db = connect(args)
+    export_tenant(db, args.output, args.household)
+    print(f"Exported tenant {args.tenant} to {args.output}")
+
+
+def cmd_analytics(args):
+    """Print an analytics snapshot as JSON"""
+    db = connect(args)
+    write_json(args.output, build_analytics(db, args.household))
+
+
+def cmd_history(args):
+    """Record a day's planned meals and/or print meal history trends as JSON"""
+    db = connect(args)
+    if args.record:
+        recorded = db.record_meal_history(date.fromisoformat(args.record))
+        print(f"Recorded {recorded} meals for {args.record}", file=sys.stderr)
+    write_json(args.output, build_history(db, args.period, args.household))
+
+
+def init_worker():
+    """Give each worker process its own connection; schema is migrated by the parent"""
+    global _worker_db
+    _worker_db = DatabaseManager(migrate=False)
+
+
+def run_tenant_job(job):
+    """Nightly job for one tenant, executed in a worker process"""
+    tenant_id, output_dir, household_size = job
+    if not _worker_db.is_connected():
+        return tenant_id, False, "no database connection"
+    try:
+        db = _worker_db.for_tenant(tenant_id)
+        # Yesterday's plan is final by the time the nightly run starts
+        recorded = db.record_meal_history(date.today() - timedelta(days=1))
+        export_tenant(db, os.path.join(output_dir, f"tenant_{tenant_id}"), household_size)
+        return tenant_id, True, f"ok, {recorded} meals added to history"
+    except Exception as e:
+        return tenant_id, False, str(e)
+
+
+def cmd_nightly(args):
+    """Export every tenant in parallel worker processes"""
+    # Connect once in the parent so migrations run before the workers start
+    db = connect(args)
+    if args.tenants:
+        tenant_ids = [int(value) for value in args.tenants.split(",") if value.strip()]
+    else:
+        tenant_ids = [tenant_id for tenant_id, _ in db.get_tenants()]
+    print(f"Pruned {db.prune_change_log()} old change feed rows")
+    db.connection.close()
+
+    run_dir = os.path.join(args.output_dir, datetime.now().strftime("%Y%m%d"))
+    jobs = [(tenant_id, run_dir, args.household) for tenant_id in tenant_ids]
+    failures = 0
+    with Pool(processes=min(args.workers, len(jobs)) or 1, initializer=init_worker) as pool:
+        for tenant_id, ok, message in pool.imap_unordered(run_tenant_job, jobs):
+            print(f"tenant {tenant_id}: {message}")
+            failures += not ok
+
+    print(f"Nightly run finished: {len(jobs) - failures}/{len(jobs)} tenants exported to {run_dir}")
+    return 1 if failures else 0
+
+
+def cmd_dedupe(args):
+    """Merge duplicate recipes of every (or the listed) household"""
+    db = connect(args)
+    if args.tenants:
+        tenant_ids = [int(value) for value in args.tenants.split(",") if value.strip()]
+    else:
+        tenant_ids = [tenant_id for tenant_id, _ in db.get_tenants()]
+    for tenant_id in tenant_ids:
+        hashed, merged = db.for_tenant(tenant_id).dedupe_recipes()
+        print(f"tenant {tenant_id}: {merged} duplicates merged, {hashed} recipes fingerprinted")
+
+
+def cmd_backup(args):
+    """Stream a consistent snapshot of the whole database to an archive"""
+    db = connect(args)
+    started = time.monotonic()
+    if args.output == "-":
+        manifest = backup_database(db.connection, sys.stdout.buffer, progress=lambda line: print(line, file=sys.stderr))
+    else:
+        with open(args.output, "wb") as f:
+            manifest = backup_database(db.connection, f)
+    rows = sum(table["rows"] for table in manifest["tables"].values())
+    print(f"Backed up {rows} rows in {time.monotonic() - started:.1f} s", file=sys.stderr)
+
+
+def cmd_restore(args):
+    """Load a backup archive into the database"""
+    db = connect(args)
+    started = time.monotonic()
+    try:
+        if args.input == "-":
+            loaded = restore_database(db.connection, sys.stdin.buffer, args.replace)
+        else:
+            with open(args.input, "rb") as f:
+                loaded = restore_database(db.connection, f, args.replace)
+    except BackupError as e:
+        print(f"Restore failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Restored {sum(loaded.values())} rows in {time.monotonic() - started:.1f} s")
+
+
+def build_parser():
+    """Build the argument parser"""
+    parser = argparse.ArgumentParser(description="Recipe planner batch and scripting interface")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--tenant", type=int, default=DEFAULT_TENANT_ID, help="household id (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    tenants = subparsers.add_parser("tenants", parents=[common], help="list households")
+    tenants.add_argument("-o", "--output", default="-", help="CSV file (default: stdout)")
+    tenants.set_defaults(func=cmd_tenants)
+
+    recipes = subparsers.add_parser("recipes", parents=[common], help="list or search recipes")
+    recipes.add_argument("--search", help="search term")
+    recipes.add_argument("--by", choices=["name", "category", "ingredient", "fuzzy"], default="name")
+    recipes.add_argument("-o", "--output", default="-", help="CSV file (default: stdout)")
+    recipes.set_defaults(func=cmd_recipes)
+
+    shopping = subparsers.add_parser("shopping-list", parents=[common], help="netted shopping list for the meal plan")
+    shopping.add_argument("--household", type=int, default=1, help="servings per meal")
+    shopping.add_argument("-o", "--output", default="-", help="CSV file (default: stdout)")
+    shopping.set_defaults(func=cmd_shopping_list)
+
+    export = subparsers.add_parser("export", parents=[common], help="export recipes, plan, shopping list and analytics")
+    export.add_argument("--household", type=int, default=1, help="servings per meal")
+    export.add_argument("-o", "--output", required=True, help="output directory")
+    export.set_defaults(func=cmd_export)
+
+    analytics = subparsers.add_parser("analytics", parents=[common], help="analytics snapshot as JSON")
+    analytics.add_argument("--household", type=int, default=1, help="servings per meal")
+    analytics.add_argument("-o", "--output", default="-", help="JSON file (default: stdout)")
+    analytics.set_defaults(func=cmd_analytics)
+
+    history = subparsers.add_parser("history", parents=[common], help="meal history trends as JSON")
+    history.add_argument("--period", choices=ROLLUP_PERIODS, default="month")
+    history.add_argument("--record", metavar="YYYY-MM-DD", help="first record the meals planned for this date")
+    history.add_argument("--household", type=int, default=1, help="servings per meal")
+    history.add_argument("-o", "--output", default="-", help="JSON file (default: stdout)")
+    history.set_defaults(func=cmd_history)
+
+    nightly = subparsers.add_parser("nightly", parents=[common], help="export every household in parallel")
+    nightly.add_argument("--output-dir", required=True, help="root directory; a dated folder is created per run")
+    nightly.add_argument("--tenants", help="comma separated household ids (default: all)")
+    nightly.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    nightly.add_argument("--household", type=int, default=1, help="servings per meal")
+    nightly.set_defaults(func=cmd_nightly)
+
+    dedupe = subparsers.add_parser("dedupe", parents=[common], help="merge duplicate recipes")
+    dedupe.add_argument("--tenants", help="comma separated household ids (default: all)")
+    dedupe.set_defaults(func=cmd_dedupe)
+
+    backup = subparsers.add_parser("backup", parents=[common], help="back up every household to an archive")
+    backup.add_argument("-o", "--output", required=True, help="archive file, or - for stdout")
+    backup.set_defaults(func=cmd_backup)
+
+    restore = subparsers.add_parser("restore", parents=[common], help="restore a backup archive")
+    restore.add_argument("-i", "--input", required=True, help="archive file, or - for stdin")
+    restore.add_argument("--replace", action="store_true", help="delete the existing data first")
+    restore.set_defaults(func=cmd_restore)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import re
+from bisect import bisect_left, insort
+
+WORD_START = re.compile(r"(?<![\w'])\w")
+
+
+def normalize_name(name):
+    """Lowercase and collapse whitespace for prefix matching"""
+    return " ".join(name.lower().split())
+
+
+def name_keys(name):
+    """Keys a recipe is found under: the whole name, then each later word onwards"""
+    key = normalize_name(name)
+    return key, [key[match.start():] for match in WORD_START.finditer(key) if match.start() > 0]
+
+
+class RecipePrefixIndex:
+    """Sorted-array prefix index over recipe names for type-ahead lookups
+
+    Entries are (key, recipe_id) tuples kept sorted, so a prefix is found
+    with one bisect and the matches are the run of keys that follow it.
+    Names are indexed whole and from every word, so 'chick' finds
+    'Grilled Chicken'; whole-name matches are returned first.
+    """
+
+    def __init__(self, recipes=()):
+        self.build(recipes)
+
+    def build(self, recipes):
+        """Index (recipe_id, name) pairs, replacing the current contents"""
+        self.names = {}
+        self.name_entries = []
+        self.word_entries = []
+        for recipe_id, name in recipes:
+            self.names[recipe_id] = name
+            key, word_keys = name_keys(name)
+            self.name_entries.append((key, recipe_id))
+            self.word_entries.extend((word_key, recipe_id) for word_key in word_keys)
+        self.name_entries.sort()
+        self.word_entries.sort()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, recipe_id):
+        return recipe_id in self.names
+
+    def name(self, recipe_id):
+        """Return the display name of an indexed recipe"""
+        return self.names.get(recipe_id)
+
+    def add(self, recipe_id, name):
+        """Index one recipe, replacing any previous name it had"""
+        if recipe_id in self.names:
+            self.remove(recipe_id)
+        self.names[recipe_id] = name
+        key, word_keys = name_keys(name)
+        insort(self.name_entries, (key, recipe_id))
+        for word_key in word_keys:
+            insort(self.word_entries, (word_key, recipe_id))
+
+    def remove(self, recipe_id):
+        """Drop a recipe from the index"""
+        name = self.names.pop(recipe_id, None)
+        if name is None:
+            return
+        key, word_keys = name_keys(name)
+        self._delete(self.name_entries, (key, recipe_id))
+        for word_key in word_keys:
+            self._delete(self.word_entries, (word_key, recipe_id))
+
+    @staticmethod
+    def _delete(entries, entry):
+        i = bisect_left(entries, entry)
+        if i < len(entries) and entries[i] == entry:
+            del entries[i]
+
+    def search(self, prefix, limit=10):
+        """Return up to limit (recipe_id, name) matches for a typed prefix"""
+        prefix = normalize_name(prefix)
+        matches = []
+        seen = set()
+        for entries in (self.name_entries, self.word_entries):
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and len(matches) < limit:
+                key, recipe_id = entries[i]
+                if not key.startswith(prefix):
+                    break
+                if recipe_id not in seen:
+                    seen.add(recipe_id)
+                    matches.append((recipe_id, self.names[recipe_id]))
+                i += 1
+            if len(matches) >= limit:
+                break
+        return matches
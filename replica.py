@@ -0,0 +1,811 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from mysql.connector import Error
+
+from nutrition import recipe_ingredient_rows
+from pantry import ShoppingListNetter, format_net_item, normalize_stock
+from meal_plan_grid import MEAL_TYPES_ORDER, day_sort_key
+from fuzzy import TrigramIndex, rank_recipes
+from dedupe import normalize_recipe_name, recipe_content_hash
+from changes import ChangeFeed, plan_key, stock_key, split_key, CHANGE_BATCH_SIZE, CHANGE_RETENTION_DAYS
+
+
+REPLICA_DIR = os.path.join(os.path.expanduser("~"), ".recipe_planner")
+# A poll with nothing to do is one indexed change_log lookup, so it can run often
+SYNC_INTERVAL = 3
+# Reload everything when the change feed may have been pruned past our mark
+FULL_RELOAD_AFTER = (CHANGE_RETENTION_DAYS - 1) * 24 * 3600
+# SQLSTATE classes of errors about the pushed data itself (data exception, integrity
+# constraint), which retrying cannot fix; any other push error is retried
+REJECTED_SQLSTATES = ("22", "23")
+
+LOCAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    recipe_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    ingredients TEXT NOT NULL,
+    instructions TEXT NOT NULL,
+    category TEXT NOT NULL,
+    cuisine TEXT,
+    cook_time INTEGER,
+    created_date TEXT,
+    servings INTEGER NOT NULL DEFAULT 1,
+    server_updated REAL
+);
+CREATE INDEX IF NOT EXISTS idx_recipes_created ON recipes (created_date);
+CREATE INDEX IF NOT EXISTS idx_recipes_name ON recipes (name);
+
+CREATE TABLE IF NOT EXISTS mealplan (
+    day TEXT NOT NULL,
+    meal_type TEXT NOT NULL,
+    recipe_id INTEGER NOT NULL,
+    PRIMARY KEY (day, meal_type)
+);
+
+CREATE TABLE IF NOT EXISTS pantry (
+    item_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    quantity REAL NOT NULL DEFAULT 0,
+    unit TEXT NOT NULL DEFAULT 'pc',
+    UNIQUE (name, unit)
+);
+
+-- Durable queue of local writes waiting to be pushed to MySQL
+CREATE TABLE IF NOT EXISTS outbox (
+    op_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    edited_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+RECIPE_FIELDS = ["name", "ingredients", "instructions", "category", "cuisine", "cook_time", "servings"]
+# Same tuple layout as DatabaseManager's RECIPE_COLUMNS
+LOCAL_RECIPE_COLUMNS = "recipe_id, name, ingredients, instructions, category, cuisine, cook_time, created_date, servings"
+
+
+class ReplicaDatabaseManager:
+    """Offline-first front for DatabaseManager backed by a local SQLite replica
+
+    Recipes, the meal plan and the pantry are always read from the replica.
+    Writes are applied locally and queued in a durable outbox that a
+    background thread pushes to MySQL; the same thread pulls remote changes
+    from the change feed and re-reads only the rows it names. The kinds of
+    data and the recipe ids that changed are collected for the UI, which
+    takes them with take_changes(). Conflicts are resolved last-writer-wins: a queued edit is only applied
+    if the server row was not modified after the edit was made. Recipes
+    created offline get negative ids that are remapped once pushed.
+
+    Anything else (tenants, later features) is delegated to the remote
+    DatabaseManager.
+    """
+
+    def __init__(self, remote, path=None, sync_interval=SYNC_INTERVAL, remote_lock=None):
+        self.remote = remote
+        # The outbox keeps writes that failed and drops only those the server refused
+        remote.raise_errors = True
+        # Shared with replicas for other tenants since they share the MySQL connection
+        self.remote_lock = remote_lock or threading.RLock()
+        self.local_lock = threading.RLock()
+
+        if path is None:
+            os.makedirs(REPLICA_DIR, exist_ok=True)
+            path = os.path.join(REPLICA_DIR, f"replica_{remote.tenant_id}.sqlite3")
+        self.path = path
+        self.local = sqlite3.connect(path, check_same_thread=False)
+        self.local.executescript(LOCAL_SCHEMA)
+        self.local.commit()
+
+        self.sync_interval = sync_interval
+        self.online = False
+        self.sync_generation = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        # Built on the first fuzzy search, then patched by pulled changes and dropped by local edits
+        self._fuzzy_index = None
+        since = self._get_state("change_since")
+        self.feed = ChangeFeed(int(self._get_state("change_hwm") or 0), None if since is None else int(since))
+        # Pulled changes not yet taken by the UI; None recipe ids means any recipe may have changed
+        self._changed_kinds = set()
+        self._changed_recipes = set()
+        # Offline saves the server matched to a recipe it already had, as (saved name, recipe_id)
+        self._duplicates = []
+
+        # First run: fill the replica before the UI reads from it
+        if self._get_state("recipes_hwm") is None:
+            self.sync_once()
+
+        self._worker = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+        self._worker.start()
+
+    @property
+    def tenant_id(self):
+        return self.remote.tenant_id
+
+    def __getattr__(self, name):
+        """Delegate everything the replica does not serve to the remote manager"""
+        attribute = getattr(self.remote, name)
+        if not callable(attribute):
+            return attribute
+
+        def locked(*args, **kwargs):
+            with self.remote_lock:
+                try:
+                    return attribute(*args, **kwargs)
+                except Error as e:
+                    # The connection dropped; the sync worker reconnects on its next pass
+                    print(f"Error calling {name} on the server: {e}")
+                    self.online = False
+                    return None
+        return locked
+
+    def for_tenant(self, tenant_id):
+        """Close this replica and return one for another tenant"""
+        self.close()
+        return ReplicaDatabaseManager(self.remote.for_tenant(tenant_id), sync_interval=self.sync_interval,
+                                      remote_lock=self.remote_lock)
+
+    def close(self):
+        """Stop the sync worker"""
+        self._stop.set()
+        self._wake.set()
+
+    def is_connected(self):
+        return self.online
+
+    # ----- local helpers -----
+
+    def _get_state(self, key):
+        with self.local_lock:
+            row = self.local.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key, value):
+        self.local.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def _enqueue(self, op, **payload):
+        self.local.execute("INSERT INTO outbox (op, payload, edited_at) VALUES (?, ?, ?)",
+                           (op, json.dumps(payload), time.time()))
+
+    def _write(self, op, statements, **payload):
+        """Apply statements locally and queue the op in one transaction"""
+        with self.local_lock:
+            try:
+                for query, params in statements:
+                    self.local.execute(query, params)
+                if op:
+                    self._enqueue(op, **payload)
+                self.local.commit()
+            except sqlite3.Error as e:
+                self.local.rollback()
+                print(f"Error writing to local replica: {e}")
+                return False
+        self._wake.set()
+        return True
+
+    def pending_count(self):
+        """Number of local writes not yet pushed"""
+        with self.local_lock:
+            return self.local.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def sync_now(self):
+        """Ask the worker to sync immediately"""
+        self._wake.set()
+
+    def take_changes(self):
+        """Return and forget (kinds, recipe_ids) pulled since the last call
+
+        kinds is a subset of {"recipes", "meal_plan", "pantry", "photos", "history"};
+        recipe_ids is None after a full reload.
+        """
+        with self.local_lock:
+            changes = self._changed_kinds, self._changed_recipes
+            self._changed_kinds, self._changed_recipes = set(), set()
+        return changes
+
+    def take_duplicates(self):
+        """Return and forget (saved name, recipe_id) of pushed recipes that turned out to exist already"""
+        with self.local_lock:
+            duplicates, self._duplicates = self._duplicates, []
+        return duplicates
+
+    def _note_changes(self, kinds, recipe_ids=()):
+        """Collect pulled changes for take_changes; call with local_lock held"""
+        self._changed_kinds.update(kinds)
+        if recipe_ids is None or self._changed_recipes is None:
+            self._changed_recipes = None
+        else:
+            self._changed_recipes.update(recipe_ids)
+
+    # ----- reads (always local) -----
+
+    def get_all_recipes(self):
+        """Get all recipes from the replica"""
+        with self.local_lock:
+            return self.local.execute(f"SELECT {LOCAL_RECIPE_COLUMNS} FROM recipes "
+                                      "ORDER BY created_date DESC").fetchall()
+
+    def get_recipes_by_ids(self, recipe_ids):
+        """Get recipes by id from the replica, with their server modification time appended"""
+        if not recipe_ids:
+            return []
+        with self.local_lock:
+            return self.local.execute(f"SELECT {LOCAL_RECIPE_COLUMNS}, server_updated FROM recipes "
+                                      f"WHERE recipe_id IN ({', '.join('?' * len(recipe_ids))})",
+                                      list(recipe_ids)).fetchall()
+
+    def search_recipes(self, search_term, search_type="name"):
+        """Search recipes by name, category, or ingredient, or fuzzily by name and ingredients"""
+        if search_type == "fuzzy":
+            return self.fuzzy_search_recipes(search_term)
+        column = {"name": "name", "category": "category", "ingredient": "ingredients"}.get(search_type, "name")
+        with self.local_lock:
+            return self.local.execute(f"SELECT {LOCAL_RECIPE_COLUMNS} FROM recipes WHERE {column} LIKE ?",
+                                      (f"%{search_term}%",)).fetchall()
+
+    def fuzzy_search_recipes(self, search_term, limit=50):
+        """Typo-tolerant search ranked by trigram similarity"""
+        with self.local_lock:
+            if self._fuzzy_index is None:
+                self._fuzzy_index = TrigramIndex()
+                for recipe_id, name, ingredients in self.local.execute("SELECT recipe_id, name, ingredients "
+                                                                       "FROM recipes"):
+                    self._fuzzy_index.add(recipe_id, name, ingredients)
+
+            candidate_ids = self._fuzzy_index.candidates(search_term)
+            if not candidate_ids:
+                return []
+            rows = self.local.execute(f"SELECT {LOCAL_RECIPE_COLUMNS} FROM recipes "
+                                      f"WHERE recipe_id IN ({', '.join('?' * len(candidate_ids))})",
+                                      candidate_ids).fetchall()
+        return rank_recipes(search_term, rows, limit)
+
+    def find_duplicate_recipe(self, name, ingredients):
+        """Id of the recipe with the same name and ingredient set, or None
+
+        The replica is checked first, so this works offline; when online the
+        server is asked too, for recipes not pulled yet.
+        """
+        content_hash = recipe_content_hash(name, ingredients)
+        with self.local_lock:
+            rows = self.local.execute("SELECT recipe_id, name, ingredients FROM recipes").fetchall()
+        for recipe_id, other_name, other_ingredients in rows:
+            # Comparing names first keeps the ingredient parsing to a few candidates
+            if (normalize_recipe_name(other_name) == normalize_recipe_name(name)
+                    and recipe_content_hash(other_name, other_ingredients) == content_hash):
+                return recipe_id
+        if not self.online:
+            return None
+        with self.remote_lock:
+            return self.remote.find_duplicate_recipe(name, ingredients)
+
+    def get_meal_plan(self):
+        """Get complete meal plan"""
+        with self.local_lock:
+            rows = self.local.execute("""SELECT mp.day, mp.meal_type, r.name, r.recipe_id, r.ingredients, r.servings
+                                         FROM mealplan mp JOIN recipes r ON mp.recipe_id = r.recipe_id""").fetchall()
+        meal_index = {meal: i for i, meal in enumerate(MEAL_TYPES_ORDER)}
+        return sorted(rows, key=lambda row: (day_sort_key(row[0]), meal_index.get(row[1], 3)))
+
+    def get_plan_requirements(self, household_size=1):
+        """Get (name, unit, quantity) needed by the meal plan, scaled to the household size"""
+        totals = {}
+        for meal in self.get_meal_plan():
+            for name, quantity, unit in recipe_ingredient_rows(meal[4]):
+                key = (name, unit)
+                if quantity is None:
+                    totals.setdefault(key, None)
+                else:
+                    totals[key] = (totals.get(key) or 0) + quantity * household_size / (meal[5] or 1)
+        return [(name, unit, quantity) for (name, unit), quantity in totals.items()]
+
+    def get_net_shopping_list(self, household_size=1):
+        """Get (name, unit, quantity) still to buy after subtracting pantry stock"""
+        stock = [(item[1], item[3], item[2]) for item in self.get_pantry_items()]
+        return ShoppingListNetter(self.get_plan_requirements(household_size), stock).items()
+
+    def get_shopping_list(self, household_size=None):
+        """Generate shopping list based on meal plan"""
+        if household_size:
+            return [format_net_item(*row) for row in self.get_net_shopping_list(household_size)]
+
+        all_ingredients = set()
+        for meal in self.get_meal_plan():
+            all_ingredients.update(item.strip() for item in meal[4].split(',') if item.strip())
+        return sorted(all_ingredients)
+
+    def get_pantry_items(self):
+        """Get all pantry items as (item_id, name, quantity, unit)"""
+        with self.local_lock:
+            return self.local.execute("SELECT item_id, name, quantity, unit FROM pantry ORDER BY name").fetchall()
+
+    # ----- writes (local first, queued for MySQL) -----
+
+    def _next_temp_id(self, table, column):
+        row = self.local.execute(f"SELECT MIN({column}) FROM {table}").fetchone()
+        return min(row[0] or 0, 0) - 1
+
+    def insert_recipe(self, name, ingredients, instructions, category, cuisine="", cook_time=0, servings=1):
+        """Insert a recipe locally under a temporary negative id"""
+        with self.local_lock:
+            temp_id = self._next_temp_id("recipes", "recipe_id")
+            created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            values = dict(zip(RECIPE_FIELDS, (name, ingredients, instructions, category, cuisine, cook_time, servings)))
+            ok = self._write("recipe_insert", [(
+                """INSERT INTO recipes (recipe_id, name, ingredients, instructions, category, cuisine, cook_time,
+                                        created_date, servings) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (temp_id, name, ingredients, instructions, category, cuisine, cook_time, created, servings))],
+                recipe_id=temp_id, **values)
+            self._fuzzy_index = None
+        return temp_id if ok else False
+
+    def update_recipe(self, recipe_id, name, ingredients, instructions, category, cuisine="", cook_time=0, servings=1):
+        """Update a recipe locally"""
+        values = dict(zip(RECIPE_FIELDS, (name, ingredients, instructions, category, cuisine, cook_time, servings)))
+        with self.local_lock:
+            self._fuzzy_index = None
+            return self._write("recipe_update", [(
+                """UPDATE recipes SET name=?, ingredients=?, instructions=?, category=?, cuisine=?, cook_time=?,
+                                      servings=? WHERE recipe_id=?""",
+                (name, ingredients, instructions, category, cuisine, cook_time, servings, recipe_id))],
+                recipe_id=recipe_id, **values)
+
+    def delete_recipe(self, recipe_id):
+        """Delete a recipe (and its plan slots) locally"""
+        statements = [("DELETE FROM mealplan WHERE recipe_id = ?", (recipe_id,)),
+                      ("DELETE FROM recipes WHERE recipe_id = ?", (recipe_id,))]
+        with self.local_lock:
+            self._fuzzy_index = None
+            if recipe_id < 0:
+                # Never reached the server: drop its queued ops instead of queueing a delete
+                statements += [("DELETE FROM outbox WHERE op_id = ?", (op_id,))
+                               for op_id in self._queued_ops(recipe_id)]
+                return self._write(None, statements)
+            return self._write("recipe_delete", statements, recipe_id=recipe_id)
+
+    def _queued_ops(self, recipe_id):
+        """Outbox op ids that target a recipe"""
+        return [op_id for op_id, payload in self.local.execute("SELECT op_id, payload FROM outbox").fetchall()
+                if json.loads(payload).get("recipe_id") == recipe_id]
+
+    def add_meal_plan(self, day, meal_type, recipe_id):
+        """Plan a recipe in a slot locally"""
+        return self._write("plan_set", [(
+            "INSERT OR REPLACE INTO mealplan (day, meal_type, recipe_id) VALUES (?, ?, ?)",
+            (day, meal_type, recipe_id))], day=day, meal_type=meal_type, recipe_id=recipe_id)
+
+    def remove_meal_plan(self, day, meal_type):
+        """Clear a plan slot locally"""
+        return self._write("plan_remove", [(
+            "DELETE FROM mealplan WHERE day = ? AND meal_type = ?", (day, meal_type))],
+            day=day, meal_type=meal_type)
+
+    def _set_stock(self, name, quantity, unit):
+        with self.local_lock:
+            row = self.local.execute("SELECT item_id FROM pantry WHERE name = ? AND unit = ?", (name, unit)).fetchone()
+            if row:
+                statement = ("UPDATE pantry SET quantity = ? WHERE item_id = ?", (quantity, row[0]))
+            else:
+                statement = ("INSERT INTO pantry (item_id, name, quantity, unit) VALUES (?, ?, ?, ?)",
+                             (self._next_temp_id("pantry", "item_id"), name, quantity, unit))
+            return self._write("stock_set", [statement], name=name, quantity=quantity, unit=unit)
+
+    def add_pantry_item(self, name, quantity, unit="pc"):
+        """Add stock to the pantry, merging with an existing item"""
+        name, quantity, unit = normalize_stock(name, quantity, unit)
+        with self.local_lock:
+            row = self.local.execute("SELECT quantity FROM pantry WHERE name = ? AND unit = ?", (name, unit)).fetchone()
+            return self._set_stock(name, quantity + (row[0] if row else 0), unit)
+
+    def update_pantry_item(self, item_id, quantity):
+        """Set the on-hand quantity of a pantry item"""
+        with self.local_lock:
+            row = self.local.execute("SELECT name, unit FROM pantry WHERE item_id = ?", (item_id,)).fetchone()
+            return bool(row) and self._set_stock(row[0], quantity, row[1])
+
+    def bulk_update_stock(self, items):
+        """Set stock for many (name, quantity, unit) items"""
+        with self.local_lock:
+            return all(self._set_stock(*normalize_stock(*item)) for item in items)
+
+    def delete_pantry_stock(self, name, unit):
+        """Delete a pantry item by name and base unit"""
+        return self._write("stock_delete", [("DELETE FROM pantry WHERE name = ? AND unit = ?", (name, unit))],
+                           name=name, unit=unit)
+
+    def delete_pantry_item(self, item_id):
+        """Delete a pantry item"""
+        with self.local_lock:
+            row = self.local.execute("SELECT name, unit FROM pantry WHERE item_id = ?", (item_id,)).fetchone()
+            return bool(row) and self.delete_pantry_stock(row[0], row[1])
+
+    # ----- background sync -----
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self.sync_once()
+
+    def sync_once(self):
+        """Push the outbox, then pull remote changes; returns True when online"""
+        with self.remote_lock:
+            if not self.remote.is_connected():
+                self.remote.connect_database()
+                if not self.remote.is_connected():
+                    self.online = False
+                    return False
+                self.remote.create_tables()
+
+            try:
+                pushed = self._push()
+                changed = self._pull() if pushed else False
+                if pushed and self._record_history():
+                    changed = True
+            except Exception as e:
+                print(f"Error syncing replica: {e}")
+                pushed, changed = False, False
+
+        self.online = pushed and self.remote.is_connected()
+        if changed:
+            self.sync_generation += 1
+        return self.online
+
+    def _record_history(self):
+        """Record yesterday's planned meals once a day, in case no nightly run did; True if any were added
+
+        Runs here rather than in the UI since recording locks the date's history rows.
+        """
+        served_date = (date.today() - timedelta(days=1)).isoformat()
+        if self._get_state("history_recorded") == served_date:
+            return False
+        recorded = self.remote.record_meal_history(date.fromisoformat(served_date))
+        if not self.remote.is_connected():
+            return False
+        with self.local_lock:
+            if recorded:
+                self._note_changes({"history"})
+            self._set_state("history_recorded", served_date)
+            self.local.commit()
+        return bool(recorded)
+
+    def _push(self):
+        """Push queued ops in order; stop at the first one that fails without the server refusing it"""
+        # Rows this push already wrote carry a server time later than the queued edits
+        # that follow them, so those edits skip the conflict check
+        pushed_keys = set()
+        while True:
+            with self.local_lock:
+                row = self.local.execute("SELECT op_id, op, payload, edited_at FROM outbox ORDER BY op_id LIMIT 1").fetchone()
+            if row is None:
+                return True
+
+            op_id, op, payload, edited_at = row
+            payload = json.loads(payload)
+            key = self._op_key(op, payload)
+            try:
+                result = self._push_op(op, payload, None if key in pushed_keys else edited_at)
+            except Error as e:
+                if not str(e.sqlstate or "").startswith(REJECTED_SQLSTATES):
+                    # A lock wait timeout, deadlock or dropped connection: keep the op and retry it next sync
+                    print(f"Error pushing {op}, will retry: {e}")
+                    return False
+                print(f"Server refused {op}: {e}")
+                result = False
+            if not result and not self.remote.is_connected():
+                return False
+            if result:
+                pushed_keys.add(("recipe", result) if op == "recipe_insert" else key)
+
+            with self.local_lock:
+                if op == "recipe_insert" and result:
+                    self._remap_recipe_id(payload["recipe_id"], result)
+                elif op == "recipe_insert":
+                    self._drop_temp_recipe(payload["recipe_id"])
+                self.local.execute("DELETE FROM outbox WHERE op_id = ?", (op_id,))
+                self.local.commit()
+            if not result and op != "recipe_insert":
+                # Lost to a newer server edit (whose change we skipped while ours was queued): re-read the row
+                self._refetch(key)
+
+    def _refetch(self, key):
+        """Re-read one row an outbox op targeted from the server"""
+        if key[0] == "recipe":
+            change = ("recipe", str(key[1]))
+        elif key[0] == "slot":
+            change = ("plan", plan_key(*key[1:]))
+        else:
+            change = ("pantry", stock_key(*key[1:]))
+        self._apply_changes([(0, *change, "upsert")])
+
+    def _op_key(self, op, payload):
+        """The row an outbox op targets"""
+        if op.startswith("recipe_"):
+            return "recipe", payload["recipe_id"]
+        if op.startswith("plan_"):
+            return "slot", payload["day"], payload["meal_type"]
+        return "stock", payload["name"], payload["unit"]
+
+    def _push_op(self, op, payload, edited_at):
+        remote = self.remote
+        values = [payload.get(field) for field in RECIPE_FIELDS]
+        if op == "recipe_insert":
+            return remote.insert_recipe(*values)
+        if op == "recipe_update":
+            return remote.update_recipe(payload["recipe_id"], *values, if_unmodified_since=edited_at)
+        if op == "recipe_delete":
+            return remote.delete_recipe(payload["recipe_id"], if_unmodified_since=edited_at)
+        if op == "plan_set":
+            return remote.add_meal_plan(payload["day"], payload["meal_type"], payload["recipe_id"],
+                                        if_unmodified_since=edited_at)
+        if op == "plan_remove":
+            return remote.remove_meal_plan(payload["day"], payload["meal_type"], if_unmodified_since=edited_at)
+        if op == "stock_set":
+            return remote.bulk_update_stock([(payload["name"], payload["quantity"], payload["unit"])])
+        if op == "stock_delete":
+            return remote.delete_pantry_stock(payload["name"], payload["unit"])
+        print(f"Dropping unknown outbox op: {op}")
+        return True
+
+    def _remap_recipe_id(self, temp_id, recipe_id):
+        """Replace a temporary recipe id everywhere once the server assigned a real one
+
+        For a duplicate of an existing recipe the server returns that recipe's
+        id; when it is already here the temporary copy is dropped instead.
+        """
+        if self.local.execute("SELECT 1 FROM recipes WHERE recipe_id = ?", (recipe_id,)).fetchone():
+            name = self.local.execute("SELECT name FROM recipes WHERE recipe_id = ?", (temp_id,)).fetchone()
+            self.local.execute("DELETE FROM recipes WHERE recipe_id = ?", (temp_id,))
+            self._note_changes({"recipes"}, {temp_id, recipe_id})
+            if name:
+                self._duplicates.append((name[0], recipe_id))
+        else:
+            self.local.execute("UPDATE recipes SET recipe_id = ? WHERE recipe_id = ?", (recipe_id, temp_id))
+        self._fuzzy_index = None
+        self.local.execute("UPDATE mealplan SET recipe_id = ? WHERE recipe_id = ?", (recipe_id, temp_id))
+        for op_id, payload in self.local.execute("SELECT op_id, payload FROM outbox").fetchall():
+            payload = json.loads(payload)
+            if payload.get("recipe_id") == temp_id:
+                payload["recipe_id"] = recipe_id
+                self.local.execute("UPDATE outbox SET payload = ? WHERE op_id = ?", (json.dumps(payload), op_id))
+
+    def _drop_temp_recipe(self, temp_id):
+        """Remove a recipe the server rejected, with its plan slots and queued edits"""
+        self.local.execute("DELETE FROM mealplan WHERE recipe_id = ?", (temp_id,))
+        self.local.execute("DELETE FROM recipes WHERE recipe_id = ?", (temp_id,))
+        for op_id in self._queued_ops(temp_id):
+            self.local.execute("DELETE FROM outbox WHERE op_id = ?", (op_id,))
+        self._fuzzy_index = None
+        self._note_changes({"recipes", "meal_plan"}, {temp_id})
+
+    def _pending_keys(self):
+        """Keys with queued local edits; the pull must not overwrite them"""
+        recipes, slots, stock = set(), set(), set()
+        for op, payload in self.local.execute("SELECT op, payload FROM outbox"):
+            key = self._op_key(op, json.loads(payload))
+            if key[0] == "recipe":
+                recipes.add(key[1])
+            elif key[0] == "slot":
+                slots.add(key[1:])
+            else:
+                stock.add(key[1:])
+        return recipes, slots, stock
+
+    def _pull(self):
+        """Apply the change feed; reload everything on the first sync or after a long time offline"""
+        remote = self.remote
+        last_pull = self._get_state("change_pulled_at")
+        if last_pull is None or time.time() - last_pull > FULL_RELOAD_AFTER:
+            # Changes made during the reload are read again from the feed next time
+            newest = remote.get_change_bounds()[1] or 0
+            changed = self._pull_full()
+            if remote.is_connected():
+                with self.local_lock:
+                    self.feed.reset(newest)
+                    self._set_state("change_hwm", newest)
+                    self._set_state("change_since", newest)
+                    self._set_state("change_pulled_at", time.time())
+                    self.local.commit()
+            return changed
+
+        # End the read transaction left open by the last poll; under REPEATABLE READ
+        # it would otherwise keep returning the snapshot taken by its first query
+        remote.end_read_snapshot()
+        polled_at = time.monotonic()
+        page = remote.get_changes_since(self.feed.since())
+        changes = list(page)
+        # Page through the look-back window, which can hold more than a batch, up to one batch past the mark
+        while len(page) >= CHANGE_BATCH_SIZE and page[-1][0] <= self.feed.hwm and remote.is_connected():
+            page = remote.get_changes_since(page[-1][0])
+            changes += page
+        if not remote.is_connected():
+            return False
+        new = self.feed.unseen(changes)
+        if any(change[1] == "reset" for change in new):
+            # The database was restored from a backup: reload everything
+            with self.local_lock:
+                self._set_state("change_pulled_at", None)
+                self._set_state("recipes_hwm", 0)
+                self.local.commit()
+            return self._pull()
+        changed = self._apply_changes(new) if new else False
+        if changed is None:
+            return False
+
+        with self.local_lock:
+            self.feed.advance(changes, polled_at)
+            self._set_state("change_hwm", self.feed.hwm)
+            self._set_state("change_since", self.feed.since())
+            self._set_state("change_pulled_at", time.time())
+            self.local.commit()
+        if len(page) >= CHANGE_BATCH_SIZE:
+            # More waiting in the feed: continue right away
+            self._wake.set()
+        return changed
+
+    def _apply_changes(self, changes):
+        """Re-read the rows named by (change_id, entity, entity_key, op) changes and apply them locally
+
+        Returns whether anything changed locally, or None when the server
+        could not be read.
+        """
+        remote = self.remote
+        recipe_ids = sorted({int(key) for _, entity, key, _ in changes if entity == "recipe"})
+        slot_keys = sorted({key for _, entity, key, _ in changes if entity == "plan"})
+        stock_keys = sorted({key for _, entity, key, _ in changes if entity == "pantry"})
+        photo_ids = {int(key) for _, entity, key, _ in changes if entity == "photo"}
+
+        recipes = remote.get_recipes_by_ids(recipe_ids)
+        slots = remote.get_meal_plan_slots(slot_keys)
+        stock = remote.get_pantry_stock(stock_keys)
+        if recipes is None or slots is None or stock is None:
+            return None
+
+        with self.local_lock:
+            pending_recipes, pending_slots, pending_stock = self._pending_keys()
+            changed_recipes = set()
+            changed_plan = False
+            changed_pantry = False
+
+            server_updated = dict(self.local.execute(
+                f"SELECT recipe_id, server_updated FROM recipes WHERE recipe_id IN ({', '.join('?' * len(recipe_ids))})",
+                recipe_ids)) if recipe_ids else {}
+            for row in recipes:
+                if row[0] in pending_recipes or server_updated.get(row[0]) == float(row[9]):
+                    continue
+                created = str(row[7]) if row[7] is not None else None
+                self.local.execute("""INSERT OR REPLACE INTO recipes (recipe_id, name, ingredients, instructions,
+                                      category, cuisine, cook_time, created_date, servings, server_updated)
+                                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                   (*row[:7], created, row[8], float(row[9])))
+                if self._fuzzy_index is not None:
+                    self._fuzzy_index.add(row[0], row[1], row[2])
+                changed_recipes.add(row[0])
+
+            # Requested but not returned: deleted on the server
+            for recipe_id in set(recipe_ids) - {row[0] for row in recipes} - pending_recipes:
+                if recipe_id in server_updated:
+                    changed_plan |= self.local.execute("DELETE FROM mealplan WHERE recipe_id = ?",
+                                                       (recipe_id,)).rowcount > 0
+                    self.local.execute("DELETE FROM recipes WHERE recipe_id = ?", (recipe_id,))
+                    if self._fuzzy_index is not None:
+                        self._fuzzy_index.remove(recipe_id)
+                    changed_recipes.add(recipe_id)
+
+            remote_slots = {(day, meal_type): recipe_id for day, meal_type, recipe_id in slots}
+            for key in slot_keys:
+                slot = split_key(key)
+                if slot in pending_slots:
+                    continue
+                local = self.local.execute("SELECT recipe_id FROM mealplan WHERE day = ? AND meal_type = ?",
+                                           slot).fetchone()
+                recipe_id = remote_slots.get(slot)
+                if (local[0] if local else None) == recipe_id:
+                    continue
+                if recipe_id is None:
+                    self.local.execute("DELETE FROM mealplan WHERE day = ? AND meal_type = ?", slot)
+                else:
+                    self.local.execute("INSERT OR REPLACE INTO mealplan (day, meal_type, recipe_id) VALUES (?, ?, ?)",
+                                       (*slot, recipe_id))
+                changed_plan = True
+
+            remote_stock = {(item[1], item[3]): item for item in stock}
+            for key in stock_keys:
+                name, unit = split_key(key)
+                if (name, unit) in pending_stock:
+                    continue
+                local = self.local.execute("SELECT item_id, name, quantity, unit FROM pantry "
+                                           "WHERE name = ? AND unit = ?", (name, unit)).fetchone()
+                item = remote_stock.get((name, unit))
+                if local == (tuple(item) if item else None):
+                    continue
+                self.local.execute("DELETE FROM pantry WHERE name = ? AND unit = ?", (name, unit))
+                if item:
+                    self.local.execute("INSERT OR REPLACE INTO pantry (item_id, name, quantity, unit) "
+                                       "VALUES (?, ?, ?, ?)", item)
+                changed_pantry = True
+
+            self.local.commit()
+            kinds = {kind for kind, flag in (("recipes", changed_recipes), ("meal_plan", changed_plan),
+                                             ("pantry", changed_pantry), ("photos", photo_ids)) if flag}
+            self._note_changes(kinds, changed_recipes | photo_ids)
+        return bool(kinds)
+
+    def _pull_full(self):
+        """Reload changed recipes, recipe deletions, the meal plan and the pantry"""
+        remote = self.remote
+        hwm = self._get_state("recipes_hwm") or 0
+        changed_recipes = remote.get_recipes_changed_since(hwm)
+        remote_ids = set(remote.get_recipe_ids())
+        meal_plan = remote.get_meal_plan()
+        pantry = remote.get_pantry_items()
+        if not remote.is_connected():
+            return False
+
+        changed = False
+        with self.local_lock:
+            pending_recipes, pending_slots, pending_stock = self._pending_keys()
+
+            server_updated = dict(self.local.execute("SELECT recipe_id, server_updated FROM recipes"))
+            for row in changed_recipes:
+                hwm = max(hwm, float(row[9]))
+                # Rows at the high-water mark come back every pull; skip the ones we already have
+                if row[0] in pending_recipes or server_updated.get(row[0]) == float(row[9]):
+                    continue
+                created = str(row[7]) if row[7] is not None else None
+                self.local.execute("""INSERT OR REPLACE INTO recipes (recipe_id, name, ingredients, instructions,
+                                      category, cuisine, cook_time, created_date, servings, server_updated)
+                                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                   (*row[:7], created, row[8], float(row[9])))
+                changed = True
+
+            # Temporary (negative) ids without a queued insert were never going to reach the server
+            local_ids = {row[0] for row in self.local.execute("SELECT recipe_id FROM recipes")}
+            for recipe_id in local_ids - remote_ids - pending_recipes:
+                self.local.execute("DELETE FROM mealplan WHERE recipe_id = ?", (recipe_id,))
+                self.local.execute("DELETE FROM recipes WHERE recipe_id = ?", (recipe_id,))
+                changed = True
+
+            local_plan = set(self.local.execute("SELECT day, meal_type, recipe_id FROM mealplan"))
+            remote_plan = {(meal[0], meal[1], meal[3]) for meal in meal_plan}
+            if {row for row in local_plan if row[:2] not in pending_slots} != \
+                    {row for row in remote_plan if row[:2] not in pending_slots}:
+                for day, meal_type, _ in local_plan:
+                    if (day, meal_type) not in pending_slots:
+                        self.local.execute("DELETE FROM mealplan WHERE day = ? AND meal_type = ?", (day, meal_type))
+                for day, meal_type, recipe_id in remote_plan:
+                    if (day, meal_type) not in pending_slots:
+                        self.local.execute("INSERT OR REPLACE INTO mealplan (day, meal_type, recipe_id) VALUES (?, ?, ?)",
+                                           (day, meal_type, recipe_id))
+                changed = True
+
+            local_pantry = set(self.local.execute("SELECT item_id, name, quantity, unit FROM pantry"))
+            remote_pantry = set(tuple(item) for item in pantry)
+            if {item for item in local_pantry if (item[1], item[3]) not in pending_stock} != \
+                    {item for item in remote_pantry if (item[1], item[3]) not in pending_stock}:
+                for item in local_pantry:
+                    if (item[1], item[3]) not in pending_stock:
+                        self.local.execute("DELETE FROM pantry WHERE item_id = ?", (item[0],))
+                for item in remote_pantry:
+                    if (item[1], item[3]) not in pending_stock:
+                        self.local.execute("INSERT OR REPLACE INTO pantry (item_id, name, quantity, unit) "
+                                           "VALUES (?, ?, ?, ?)", item)
+                changed = True
+
+            if changed:
+                self._fuzzy_index = None
+                self._note_changes({"recipes", "meal_plan", "pantry", "photos"}, None)
+            self._set_state("recipes_hwm", hwm)
+            self.local.commit()
+        return changed
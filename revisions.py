@@ -0,0 +1,93 @@
+import json
+import zlib
+from difflib import SequenceMatcher
+
+REVISION_FIELDS = ["name", "ingredients", "instructions", "category", "cuisine", "cook_time", "servings"]
+# A new keyframe is written once the deltas since the last one would outweigh
+# this many compressed full copies, so storage follows the size of the edits
+# while rebuilding a revision never reads more than a few copies' worth
+KEYFRAME_RATIO = 2
+MAX_CHAIN_LENGTH = 50
+
+
+def serialize_recipe(fields):
+    """Canonical text of a recipe's editable fields, the unit deltas are taken on"""
+    return json.dumps({field: fields.get(field) for field in REVISION_FIELDS}, ensure_ascii=False, sort_keys=True,
+                      separators=(",", ":"))
+
+
+def deserialize_recipe(text):
+    """Recipe fields from serialize_recipe text"""
+    return json.loads(text)
+
+
+def make_keyframe(text):
+    """Compressed full copy"""
+    return zlib.compress(text.encode("utf-8"))
+
+
+def common_affixes(old, new):
+    """Lengths of the common prefix and suffix of old and new, not overlapping"""
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def make_delta(old, new):
+    """Compressed edit script turning old into new
+
+    The script is a list of [start, end] ranges copied from old and strings
+    inserted, so its size follows what changed rather than the recipe size.
+    Only the span between the common prefix and suffix is diffed, which
+    keeps typical single-place edits cheap.
+    """
+    prefix, suffix = common_affixes(old, new)
+    ops = [[0, prefix]] if prefix else []
+    old_middle, new_middle = old[prefix:len(old) - suffix], new[prefix:len(new) - suffix]
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_middle, new_middle, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([prefix + i1, prefix + i2])
+        elif j2 > j1:
+            ops.append(new_middle[j1:j2])
+    if suffix:
+        ops.append([len(old) - suffix, len(old)])
+    return zlib.compress(json.dumps(ops, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def apply_delta(old, delta):
+    """Apply a make_delta script to old"""
+    ops = json.loads(zlib.decompress(delta).decode("utf-8"))
+    return "".join(old[op[0]:op[1]] if isinstance(op, list) else op for op in ops)
+
+
+def reconstruct(chain):
+    """Rebuild the text at the end of a chain of (kind, data), starting at a keyframe"""
+    text = None
+    for kind, data in chain:
+        if kind == "key":
+            text = zlib.decompress(data).decode("utf-8")
+        elif kind == "delta":
+            text = apply_delta(text, data)
+        # 'delete' and 'merge' markers leave the text as it was
+    return text
+
+
+def encode_revision(old_text, new_text, chain_bytes, chain_length):
+    """Pick ('key' or 'delta', data) for a new revision given the current delta chain"""
+    keyframe = make_keyframe(new_text)
+    if old_text is None or chain_length >= MAX_CHAIN_LENGTH:
+        return "key", keyframe
+    delta = make_delta(old_text, new_text)
+    if chain_bytes + len(delta) > KEYFRAME_RATIO * len(keyframe):
+        return "key", keyframe
+    return "delta", delta
+
+
+def recipe_tuple(recipe_id, fields, created_date=None):
+    """Revision fields in the RECIPE_COLUMNS tuple layout used by the views"""
+    return (recipe_id, *(fields.get(field) for field in REVISION_FIELDS[:6]), created_date, fields.get("servings"))
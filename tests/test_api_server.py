@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from mysql.connector import Error
+
+from api_server import HTTPError, PlannerAPI, handle_client, read_request
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+        self.aborted = False
+        self.transport = self
+
+    def abort(self):
+        self.aborted = True
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def make_reader(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def test_read_request_rejects_a_bad_content_length():
+    async def scenario():
+        with pytest.raises(HTTPError) as error:
+            await read_request(make_reader(b"GET /health HTTP/1.1\r\nContent-Length: abc\r\n\r\n"))
+        return error.value.status
+    assert asyncio.run(scenario()) == 400
+
+
+class FakePool:
+    """Runs functions against a stand-in manager instead of a MySQL connection"""
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    async def run(self, tenant_id, func, *args):
+        return func(self.manager, *args)
+
+
+class FakeManager:
+    def get_tenants(self):
+        return [(1, "Default")]
+
+    def get_data_version(self):
+        raise RuntimeError("boom")
+
+
+def serve(api, request):
+    writer = FakeWriter()
+
+    async def scenario():
+        await handle_client(api, make_reader(request), writer)
+    asyncio.run(scenario())
+    return writer
+
+
+def test_unknown_tenant_is_not_found():
+    writer = serve(PlannerAPI(FakePool(FakeManager())), b"GET /api/tenants/42/meal-plan HTTP/1.1\r\n\r\n")
+    assert writer.data.startswith(b"HTTP/1.1 404")
+    assert writer.closed
+
+
+def test_unexpected_error_is_a_server_error():
+    writer = serve(PlannerAPI(FakePool(FakeManager())), b"GET /api/tenants/1/meal-plan HTTP/1.1\r\n\r\n")
+    assert writer.data.startswith(b"HTTP/1.1 500")
+    assert writer.closed
+
+
+class StreamingPool(FakePool):
+    executor = None
+
+    async def acquire(self):
+        return self.manager
+
+    def release(self, db):
+        pass
+
+
+class StreamingManager(FakeManager):
+    """Streams failing_after batches of recipes, then loses the connection"""
+
+    def __init__(self, failing_after):
+        self.failing_after = failing_after
+
+    def get_data_version(self):
+        return "7.3"
+
+    def for_tenant(self, tenant_id):
+        return self
+
+    def iter_recipes(self, search_term, search_type, batch_size):
+        for _ in range(self.failing_after):
+            yield [(1, "Pancakes", "2 eggs", "Fry.", "Breakfast", "", 10, None, 2)]
+        raise Error(msg="Lost connection to MySQL server during query", errno=2013)
+
+
+def test_recipe_stream_cut_short_is_not_terminated():
+    writer = serve(PlannerAPI(StreamingPool(StreamingManager(1))), b"GET /api/tenants/1/recipes HTTP/1.1\r\n\r\n")
+    assert writer.data.startswith(b"HTTP/1.1 200")
+    assert b"Pancakes" in writer.data
+    assert not writer.data.endswith(b"0\r\n\r\n")
+    assert writer.aborted and writer.closed
+
+
+def test_recipe_stream_failing_at_once_is_a_server_error():
+    writer = serve(PlannerAPI(StreamingPool(StreamingManager(0))), b"GET /api/tenants/1/recipes HTTP/1.1\r\n\r\n")
+    assert writer.data.startswith(b"HTTP/1.1 500")
+    assert writer.closed
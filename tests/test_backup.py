@@ -0,0 +1,157 @@
+import copy
+import io
+import json
+import re
+import tarfile
+
+import pytest
+
+from backup import BackupError, backup_database, restore_database
+
+
+class FakeServer:
+    """An in-memory database with just the SQL backup.py sends"""
+
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+        self.indexes = {"recipes": {"idx_name": (1, "name")}}
+        self.statements = []
+        self.snapshot = None
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, **kwargs):
+        return FakeServerCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.snapshot = None
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.snapshot is not None:
+            self.tables = self.snapshot
+        self.snapshot = None
+
+    def start_transaction(self, **kwargs):
+        self.snapshot = copy.deepcopy(self.tables)
+
+
+class FakeServerCursor:
+    def __init__(self, server):
+        self.server = server
+        self.rows = []
+        self.column_names = ()
+
+    def execute(self, query, params=None):
+        query = " ".join(query.split())
+        self.server.statements.append(query)
+        tables = self.server.tables
+        self.rows = []
+        if "information_schema.TABLES" in query:
+            self.rows = [(name,) for name in sorted(tables)] + [("schema_migrations",), ("change_log",)]
+        elif "information_schema.STATISTICS" in query:
+            self.rows = [(index, non_unique, column, None)
+                         for index, (non_unique, column) in self.server.indexes.get(params[0], {}).items()]
+        elif query.startswith("SELECT MAX(version)"):
+            self.rows = [(15,)]
+        elif query.startswith("SELECT COALESCE(MAX(change_id), 0)"):
+            self.rows = [(0,)]
+        elif match := re.match(r"SELECT \* FROM `(\w+)` LIMIT 0", query):
+            self.column_names = tables[match[1]]["columns"]
+        elif match := re.match(r"SELECT 1 FROM `(\w+)` LIMIT 1", query):
+            self.rows = [(1,)] if tables[match[1]]["rows"] else []
+        elif match := re.match(r"SELECT .* FROM `(\w+)`$", query):
+            self.rows = [tuple(row) for row in tables[match[1]]["rows"]]
+        elif match := re.match(r"DELETE FROM `(\w+)`", query):
+            tables[match[1]]["rows"] = []
+        elif match := re.match(r"ALTER TABLE `(\w+)` DROP INDEX `(\w+)`", query):
+            self.server.indexes[match[1]].pop(match[2])
+        elif match := re.match(r"ALTER TABLE `(\w+)` ADD (\w+) `(\w+)` \(`(\w+)`\)", query):
+            self.server.indexes[match[1]][match[3]] = (int(match[2] == "INDEX"), match[4])
+
+    def executemany(self, query, rows):
+        self.server.statements.append(query)
+        table = re.match(r"INSERT INTO `(\w+)`", query)[1]
+        self.server.tables[table]["rows"].extend(list(row) for row in rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+def catalog():
+    return {"recipes": {"columns": ["recipe_id", "name", "photo"],
+                        "rows": [[1, "Pancakes", b"\x89PNG"], [2, "Soup", None]]},
+            "pantry": {"columns": ["item", "quantity"], "rows": [["eggs", "6"]]}}
+
+
+def backup_of(tables):
+    archive = io.BytesIO()
+    backup_database(FakeServer(tables), archive, progress=lambda line: None)
+    archive.seek(0)
+    return archive
+
+
+def rewrite(archive, edit):
+    """Copy an archive, passing each member's (info, data) through edit"""
+    out = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="r|") as source, \
+            tarfile.open(fileobj=out, mode="w|", format=tarfile.PAX_FORMAT) as target:
+        for info in source:
+            data = source.extractfile(info).read()
+            info, data = edit(info, data)
+            info.size = len(data)
+            target.addfile(info, io.BytesIO(data))
+    out.seek(0)
+    return out
+
+
+def test_restore_round_trips_a_backup():
+    target = FakeServer({name: {"columns": table["columns"], "rows": []} for name, table in catalog().items()})
+    loaded = restore_database(target, backup_of(catalog()), progress=lambda line: None)
+    assert loaded == {"pantry": 1, "recipes": 2}
+    assert target.tables == catalog()
+    assert target.indexes["recipes"] == {"idx_name": (1, "name")}
+    assert target.statements[-1].startswith("INSERT INTO change_log")
+
+
+def test_restore_rejects_tables_the_database_does_not_have():
+    def rename(info, data):
+        if info.name == "header.json":
+            header = json.loads(data)
+            header["columns"]["recipes`; DROP TABLE tenants; --"] = header["columns"].pop("pantry")
+            data = json.dumps(header).encode("utf-8")
+        return info, data
+
+    target = FakeServer(catalog())
+    with pytest.raises(BackupError, match="Tables missing"):
+        restore_database(target, rewrite(backup_of(catalog()), rename), progress=lambda line: None)
+    assert not any("DROP TABLE" in query for query in target.statements)
+
+
+def test_failed_replace_keeps_the_old_rows_and_raises():
+    def corrupt(info, data):
+        if info.name.startswith("data/recipes/"):
+            info.pax_headers = dict(info.pax_headers, sha256="0" * 64)
+        return info, data
+
+    old = catalog()
+    old["recipes"]["rows"] = [[9, "Old stew", None]]
+    target = FakeServer(copy.deepcopy(old))
+    with pytest.raises(BackupError, match="Checksum mismatch"):
+        restore_database(target, rewrite(backup_of(catalog()), corrupt), replace=True, progress=lambda line: None)
+    assert target.tables == old
+    assert target.rollbacks == 1
+    assert target.indexes["recipes"] == {"idx_name": (1, "name")}
+    assert target.statements[-2:] == ["SET SESSION foreign_key_checks = 1", "SET SESSION unique_checks = 1"]
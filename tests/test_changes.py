@@ -0,0 +1,53 @@
+from changes import ChangeFeed, plan_key, split_key, stock_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def change(change_id, key="1"):
+    return change_id, "recipe", key, "upsert"
+
+
+def test_keys_round_trip():
+    assert split_key(plan_key("Week 2 Monday", "Lunch")) == ("Week 2 Monday", "Lunch")
+    assert split_key(stock_key("salt|pepper", "g")) == ("salt|pepper", "g")
+
+
+def test_late_commit_below_the_mark_is_read_whatever_the_id_gap():
+    clock = Clock()
+    feed = ChangeFeed(0, lookback=30, clock=clock)
+    feed.advance([change(1)])
+    clock.now += 3
+    # Other tenants used thousands of ids in between; id 2 commits late
+    feed.advance([change(5000)])
+    clock.now += 3
+    assert feed.since() < 2
+    assert feed.unseen([change(2), change(5000)]) == [change(2)]
+    feed.advance([change(2), change(5000)])
+    assert feed.hwm == 5000
+
+
+def test_window_closes_after_the_lookback():
+    clock = Clock()
+    feed = ChangeFeed(0, lookback=30, clock=clock)
+    feed.advance([change(10)])
+    clock.now += 31
+    feed.advance([change(20)])
+    assert feed.since() == 10
+    clock.now += 31
+    feed.advance([])
+    assert feed.since() == 20
+    # Ids at or below the start of the window are no longer remembered
+    assert feed.seen == set()
+
+
+def test_restored_feed_starts_from_the_saved_window():
+    feed = ChangeFeed(500, since=450)
+    assert feed.since() == 450
+    feed.reset(600)
+    assert (feed.since(), feed.hwm) == (600, 600)
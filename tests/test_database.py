@@ -0,0 +1,188 @@
+from datetime import date
+
+import pytest
+from mysql.connector import Error
+
+from database import DatabaseManager
+
+
+class FakeCursor:
+    """Records statements and answers them from a script of (rowcount, rows) results"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.connection.statements.append((" ".join(query.split()), params))
+        self.rowcount, self.rows = self.connection.results.pop(0) if self.connection.results else (0, [])
+
+    def executemany(self, query, rows):
+        self.execute(query, rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_add_meal_plan_logs_a_changed_slot():
+    connection = FakeConnection([(1, [])])
+    assert DatabaseManager(connection=connection).add_meal_plan("Monday", "Lunch", 7)
+    assert connection.statements[1][0].startswith("INSERT INTO change_log")
+
+
+def test_add_meal_plan_same_recipe_again_is_planned():
+    connection = FakeConnection([(0, []), (1, [(7,)])])
+    assert DatabaseManager(connection=connection).add_meal_plan("Monday", "Lunch", 7, if_unmodified_since=10)
+    assert not any(query.startswith("INSERT INTO change_log") for query, _ in connection.statements)
+
+
+def test_add_meal_plan_rejected_by_newer_server_edit():
+    connection = FakeConnection([(0, []), (1, [(9,)])])
+    assert not DatabaseManager(connection=connection).add_meal_plan("Monday", "Lunch", 7, if_unmodified_since=10)
+
+
+def test_add_meal_plan_for_unknown_recipe():
+    connection = FakeConnection([(0, []), (0, [])])
+    assert not DatabaseManager(connection=connection).add_meal_plan("Monday", "Lunch", 7)
+
+
+def test_fuzzy_search_reads_binary_trigrams_with_trailing_spaces():
+    recipe = (1, "Ab", "", "", "", "", 0, None, 1)
+    stats = [(bytearray(gram.encode()), 1) for gram in ("  a", " ab", "ab ")]
+    connection = FakeConnection([(3, stats), (1, [(1,)]), (1, [recipe])])
+    assert DatabaseManager(connection=connection).fuzzy_search_recipes("ab") == [recipe]
+    probe = connection.statements[1][1]
+    assert "ab " in probe
+
+
+class FailingCursor(FakeCursor):
+    """Fails the statement that starts with `fail_on`"""
+
+    fail_on = "DELETE FROM recipes"
+
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        if " ".join(query.split()).startswith(self.fail_on):
+            raise Error(msg="Lock wait timeout exceeded", errno=1205)
+
+
+def test_update_recipe_releases_the_row_lock_when_skipped():
+    connection = FakeConnection([(1, [(200,)])])
+    manager = DatabaseManager(connection=connection)
+    assert not manager.update_recipe(7, "Pancakes", "2 eggs", "", "Breakfast", if_unmodified_since=100)
+    assert connection.rollbacks == 1 and connection.commits == 0
+
+
+def test_failed_delete_rolls_back_its_earlier_statements():
+    connection = FakeConnection()
+    connection.cursor = lambda **kwargs: FailingCursor(connection)
+    assert not DatabaseManager(connection=connection).delete_recipe(7)
+    assert connection.rollbacks == 1 and connection.commits == 0
+
+
+def test_recorded_meals_keep_a_copy_of_their_ingredients():
+    meal = ("Lunch", 7, "Soup", "", 30, 2)
+    connection = FakeConnection([(1, [("Monday",)]), (0, []), (1, [meal])])
+    assert DatabaseManager(connection=connection).record_meal_history(date(2026, 10, 19)) == 1
+    queries = [query for query, _ in connection.statements]
+    snapshot = next(i for i, query in enumerate(queries) if query.startswith("INSERT INTO meal_history_ingredients"))
+    assert "JOIN recipe_ingredients" in queries[snapshot]
+    demand = next(query for query in queries if query.startswith("INSERT INTO meal_rollup_ingredients"))
+    assert "JOIN meal_history_ingredients" in demand and "recipe_ingredients" not in demand
+    assert connection.commits == 1
+
+
+def test_merged_duplicate_is_not_marked_deleted():
+    batch = [(5, "Bread", "1 kg flour")]
+    key = (1, "key", b"")
+    connection = FakeConnection([(1, batch), (1, [(3,)])] + [(0, [])] * 6 + [(1, [key])])
+    assert DatabaseManager(connection=connection).dedupe_recipes() == (0, 1)
+    revision = next(params for query, params in connection.statements
+                    if query.startswith("INSERT INTO recipe_revisions"))
+    assert revision[3] == "merge"
+
+
+def test_failed_write_is_raised_for_retrying_writers():
+    connection = FakeConnection()
+    connection.cursor = lambda **kwargs: FailingCursor(connection)
+    manager = DatabaseManager(connection=connection, raise_errors=True)
+    with pytest.raises(Error, match="Lock wait timeout"):
+        manager.delete_recipe(7)
+    assert connection.rollbacks == 1
+    assert manager.for_tenant(2).raise_errors
+
+
+class ChangeLogConnection(FakeConnection):
+    """Keeps the change_log rows written through it and answers the data version query from them"""
+
+    def __init__(self):
+        super().__init__()
+        self.change_log = []
+        self.next_change_id = 1
+
+    def cursor(self, **kwargs):
+        connection = self
+
+        class Cursor(FakeCursor):
+            def execute(self, query, params=None):
+                super().execute(query, params)
+                self.rowcount = 1
+                if "FROM change_log" in query:
+                    ids = [change_id for change_id, tenant_id in connection.change_log if tenant_id == params[0]]
+                    self.rows = [(f"{max(ids, default=0)}.{len(ids)}",)]
+
+            def executemany(self, query, rows):
+                super().executemany(query, rows)
+                if query.startswith("INSERT INTO change_log"):
+                    for row in rows:
+                        connection.change_log.append((connection.next_change_id, row[0]))
+                        connection.next_change_id += 1
+
+        return Cursor(self)
+
+
+def test_data_version_changes_on_every_write_in_the_same_second():
+    connection = ChangeLogConnection()
+    manager = DatabaseManager(connection=connection)
+    versions = [manager.get_data_version()]
+    manager.bulk_update_stock([("eggs", 6, "pc")])
+    versions.append(manager.get_data_version())
+    manager.bulk_update_stock([("eggs", 5, "pc")])
+    versions.append(manager.get_data_version())
+    assert len(set(versions)) == 3
+    # Another tenant's writes leave it alone
+    manager.for_tenant(2).bulk_update_stock([("milk", 1, "l")])
+    assert manager.get_data_version() == versions[-1]
+
+
+def test_shopping_queries_count_zero_servings_as_one():
+    connection = FakeConnection()
+    manager = DatabaseManager(connection=connection)
+    manager.get_plan_requirements(4)
+    manager.get_net_shopping_list(4)
+    for query, _ in connection.statements:
+        assert "/ GREATEST(r.servings, 1)" in query
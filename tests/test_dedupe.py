@@ -0,0 +1,25 @@
+from dedupe import normalize_recipe_name, recipe_content_hash
+
+
+def test_normalize_recipe_name_ignores_case_and_spacing():
+    assert normalize_recipe_name("  Tomato   SOUP ") == "tomato soup"
+
+
+def test_hash_ignores_ingredient_order_case_and_spacing():
+    assert recipe_content_hash("Tomato Soup", "2 tomatoes, 1 onion, 500 ml water") == \
+        recipe_content_hash("tomato  soup", "500 ml Water,1 onion,  2 tomatoes")
+
+
+def test_hash_compares_quantities_in_base_units():
+    assert recipe_content_hash("Bread", "1 kg flour") == recipe_content_hash("Bread", "1000 g flour")
+
+
+def test_hash_ignores_repeated_ingredients():
+    assert recipe_content_hash("Bread", "1 kg flour, 1 kg flour") == recipe_content_hash("Bread", "1 kg flour")
+
+
+def test_hash_tells_different_recipes_apart():
+    base = recipe_content_hash("Bread", "1 kg flour, 10 g salt")
+    assert base != recipe_content_hash("Bread", "1 kg flour, 20 g salt")
+    assert base != recipe_content_hash("Rolls", "1 kg flour, 10 g salt")
+    assert base != recipe_content_hash("Bread", "1 kg flour")
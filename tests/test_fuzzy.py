@@ -0,0 +1,50 @@
+from fuzzy import MAX_PROBE_POSTINGS, TrigramIndex, probe_trigrams, rank_recipes, trigrams
+
+RECIPES = [
+    (1, "Spaghetti Bolognese", "200 g spaghetti, 300 g minced beef, 1 onion"),
+    (2, "Chicken Curry", "500 g chicken, 1 cup coconut milk, 2 tbsp curry paste"),
+    (3, "Pancakes", "2 cups flour, 2 eggs, 1 cup milk"),
+]
+
+
+def test_trigrams_keep_padding_on_both_sides():
+    assert trigrams("Ab") == {"  a", " ab", "ab "}
+    assert trigrams("a, b") == {"  a", " a ", "  b", " b "}
+
+
+def test_probe_prefers_rare_trigrams_within_the_budget():
+    query = {"rar", "mid", "com"}
+    frequency = {"com": MAX_PROBE_POSTINGS, "mid": 50, "rar": 2, "unrelated": 1}
+    probe, min_shared = probe_trigrams(query, frequency)
+    assert probe == ["rar", "mid"]
+    assert min_shared == 1
+
+
+def test_probe_always_takes_the_rarest_trigram():
+    probe, _ = probe_trigrams({"big"}, {"big": MAX_PROBE_POSTINGS * 2})
+    assert probe == ["big"]
+
+
+def test_probe_skips_trigrams_not_in_the_index():
+    assert probe_trigrams({"abc"}, {"abc": 0}) == ([], 1)
+
+
+def test_rank_tolerates_typos_and_prefers_name_matches():
+    ranked = rank_recipes("spagetti bolognase", RECIPES)
+    assert [recipe[0] for recipe in ranked] == [1]
+    assert [recipe[0] for recipe in rank_recipes("coconut", RECIPES)] == [2]
+    assert rank_recipes("zzzz", RECIPES) == []
+
+
+def test_index_candidates_follow_edits():
+    index = TrigramIndex()
+    for recipe in RECIPES:
+        index.add(*recipe)
+    assert index.candidates("pancakse")[0] == 3
+
+    index.add(3, "Waffles", "2 cups flour, 2 eggs")
+    assert 3 not in index.postings["pan"]
+    assert index.candidates("wafles")[0] == 3
+    index.remove(1)
+    assert 1 not in index.candidates("spaghetti")
+    assert 1 not in index.grams
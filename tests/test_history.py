@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+
+from history import build_trend, next_period, period_range, period_start, trend_window
+
+
+def test_period_start_weeks_begin_on_monday():
+    sunday = date(2026, 10, 18)
+    assert period_start(sunday, "day") == sunday
+    assert period_start(sunday, "week") == date(2026, 10, 12)
+    assert period_start(sunday, "month") == date(2026, 10, 1)
+    with pytest.raises(ValueError):
+        period_start(sunday, "year")
+
+
+def test_next_period_rolls_over_month_and_year_ends():
+    assert next_period(date(2026, 1, 31), "day") == date(2026, 2, 1)
+    assert next_period(date(2026, 12, 28), "week") == date(2027, 1, 4)
+    assert next_period(date(2026, 12, 1), "month") == date(2027, 1, 1)
+
+
+def test_period_range_includes_both_ends():
+    assert period_range(date(2026, 1, 15), date(2026, 3, 2), "month") == [
+        date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)]
+    assert period_range(date(2026, 10, 18), date(2026, 10, 19), "week") == [date(2026, 10, 12), date(2026, 10, 19)]
+
+
+def test_trend_window_counts_back_whole_periods():
+    today = date(2026, 2, 10)
+    assert trend_window(today, "day", 3) == date(2026, 2, 8)
+    assert trend_window(today, "week", 2) == date(2026, 2, 2)
+    assert trend_window(today, "month", 3) == date(2025, 12, 1)
+
+
+def test_build_trend_folds_small_cuisines_into_other():
+    starts = [date(2026, 10, 5), date(2026, 10, 12)]
+    rows = [(starts[0], "Italian", 3, 90, 3), (starts[0], "", 1, 0, 0),
+            (starts[1], "Thai", 1, 40, 1), (starts[1], "Italian", 1, 0, 0), (date(2026, 9, 28), "Italian", 2, 0, 0)]
+    series, average_cook_time = build_trend(rows, starts, top=1)
+    assert series == {"Italian": [3, 1], "Other": [1, 1]}
+    assert average_cook_time == [30, 40]
@@ -0,0 +1,39 @@
+import ast
+
+import pytest
+
+import migrations
+from dedupe import recipe_content_hash
+from fuzzy import recipe_terms, trigrams
+from nutrition import recipe_ingredient_rows
+from revisions import REVISION_FIELDS, make_keyframe, serialize_recipe
+
+RECIPES = [
+    ("Pancakes", "1 1/2 cups of Flour, 2 eggs, ½ tsp salt, milk"),
+    ("Chili  con Carne", "500 g minced beef, 1 kg beans, 1/0 cup chili, 2 cloves garlic"),
+    ("Toast", ""),
+]
+
+
+def test_migrations_do_not_import_app_modules():
+    tree = ast.parse(open(migrations.__file__, encoding="utf-8").read())
+    imported = {alias.name.split(".")[0] for node in ast.walk(tree) if isinstance(node, ast.Import)
+                for alias in node.names}
+    imported |= {node.module.split(".")[0] for node in ast.walk(tree) if isinstance(node, ast.ImportFrom)}
+    assert not imported & {"nutrition", "fuzzy", "revisions", "dedupe", "database"}
+
+
+@pytest.mark.parametrize("name, ingredients", RECIPES)
+def test_frozen_helpers_match_the_app_when_written(name, ingredients):
+    assert migrations._ingredient_rows(ingredients) == recipe_ingredient_rows(ingredients)
+    assert migrations._recipe_trigrams(name, ingredients) == trigrams(recipe_terms(name, ingredients))
+    assert migrations._content_hash(name, ingredients) == recipe_content_hash(name, ingredients)
+
+    fields = {"name": name, "ingredients": ingredients, "instructions": "Cook.", "servings": 2}
+    assert migrations._REVISION_FIELDS == REVISION_FIELDS
+    assert migrations._recipe_keyframe(fields) == make_keyframe(serialize_recipe(fields))
+
+
+def test_migration_versions_are_sequential():
+    assert [migration.version for migration in migrations.MIGRATIONS] == list(
+        range(1, len(migrations.MIGRATIONS) + 1))
@@ -0,0 +1,74 @@
+import pytest
+
+from nutrition import (Ingredient, NutritionEngine, aggregate_ingredients, parse_ingredient, parse_ingredients,
+                       parse_quantity, recipe_ingredient_rows, scale_ingredients)
+
+
+@pytest.mark.parametrize("text, expected", [("2", 2.0), ("1/2", 0.5), ("1 1/2", 1.5), ("0.25", 0.25)])
+def test_parse_quantity(text, expected):
+    assert parse_quantity(text) == expected
+
+
+@pytest.mark.parametrize("text", ["1/0", "3/0"])
+def test_parse_quantity_rejects_zero_denominator(text):
+    assert parse_quantity(text) is None
+
+
+def test_parse_ingredient_with_unit():
+    assert parse_ingredient("2 cups of Flour") == Ingredient(2.0, "cup", "flour")
+    assert parse_ingredient("½ tsp salt") == Ingredient(0.5, "tsp", "salt")
+    assert parse_ingredient("3 eggs") == Ingredient(3.0, "pc", "eggs")
+
+
+def test_parse_ingredient_without_quantity():
+    assert parse_ingredient("Salt to taste") == Ingredient(None, "", "salt to taste")
+
+
+def test_malformed_quantity_is_treated_as_unquantified():
+    assert parse_ingredients("1/0 cup flour, 2 eggs") == [Ingredient(None, "", "1/0 cup flour"),
+                                                          Ingredient(2.0, "pc", "eggs")]
+
+
+def test_recipe_ingredient_rows_use_base_units():
+    assert recipe_ingredient_rows("1 kg rice, 2 l milk, pepper") == [("rice", 1000.0, "g"), ("milk", 2000.0, "ml"),
+                                                                     ("pepper", None, "")]
+
+
+def test_scale_ingredients():
+    scaled = scale_ingredients("200 g pasta, salt", 2, 5)
+    assert scaled == [Ingredient(500.0, "g", "pasta"), Ingredient(None, "", "salt")]
+
+
+def test_aggregate_ingredients_sums_across_units():
+    items = aggregate_ingredients([("500 g flour, salt", 1), ("1 kg flour, salt", 1)], 1)
+    assert items == ["1500 g flour", "salt"]
+
+
+def test_aggregate_ingredients_keeps_single_unit():
+    assert aggregate_ingredients([("1 cup milk", 2), ("1 cup milk", 2)], 4) == ["4 cup milk"]
+
+
+def test_recipe_per_serving_divides_by_servings():
+    engine = NutritionEngine()
+    whole = engine.recipe_per_serving("100 g all-purpose flour", 1)
+    halved = engine.recipe_per_serving("100 g all-purpose flour", 2)
+    assert whole[0] == pytest.approx(364)
+    assert halved[0] == pytest.approx(182)
+
+
+def test_recipe_cache_is_bounded():
+    engine = NutritionEngine()
+    for grams in range(5000):
+        engine.recipe_per_serving(f"{grams} g all-purpose flour")
+    assert len(engine._recipe_cache) <= 4096
+
+
+def test_plan_totals_per_day():
+    engine = NutritionEngine()
+    days, daily, total = engine.plan_totals([("Monday", "100 g all-purpose flour", 1),
+                                             ("Monday", "100 g all-purpose flour", 1),
+                                             ("Tuesday", "100 g all-purpose flour", 2)], household_size=2)
+    assert days == ["Monday", "Tuesday"]
+    assert daily[0][0] == pytest.approx(4 * 364)
+    assert daily[1][0] == pytest.approx(364)
+    assert total[0] == pytest.approx(5 * 364)
@@ -0,0 +1,50 @@
+from pantry import ShoppingListNetter, format_net_item, normalize_stock, parse_stock_line
+
+
+def test_normalize_stock_converts_to_base_unit():
+    assert normalize_stock(" Flour ", 1, "kg") == ("flour", 1000.0, "g")
+    assert normalize_stock("eggs", 6, None) == ("eggs", 6.0, "pc")
+
+
+def test_parse_stock_line():
+    assert parse_stock_line("500 g flour") == ("flour", 500.0, "g")
+    assert parse_stock_line("eggs") is None
+
+
+def test_format_net_item_without_unit_is_just_the_name():
+    assert format_net_item("salt", "", 0) == "salt"
+
+
+def make_netter():
+    requirements = [("flour", "g", 700.0), ("eggs", "pc", 4.0), ("salt", "", 0)]
+    stock = [("flour", "g", 200.0)]
+    return ShoppingListNetter(requirements, stock)
+
+
+def test_netting_subtracts_stock():
+    assert make_netter().items() == [("eggs", "pc", 4.0), ("flour", "g", 500.0), ("salt", "", 0)]
+
+
+def test_set_stock_returns_only_changed_keys():
+    netter = make_netter()
+    assert netter.set_stock("flour", "g", 300.0) == {("flour", "g")}
+    assert netter.net[("flour", "g")] == 400.0
+
+    # Enough stock removes the item; the same stock again changes nothing
+    assert netter.set_stock("eggs", "pc", 4.0) == {("eggs", "pc")}
+    assert ("eggs", "pc") not in netter.net
+    assert netter.set_stock("eggs", "pc", 4.0) == set()
+
+
+def test_unquantified_item_is_dropped_while_any_unit_is_stocked():
+    netter = make_netter()
+    assert netter.set_stock("salt", "g", 50.0) == {("salt", "")}
+    assert ("salt", "") not in netter.net
+    assert netter.set_stock("salt", "g", None) == {("salt", "")}
+    assert netter.net[("salt", "")] == 0
+
+
+def test_unrelated_stock_changes_nothing():
+    netter = make_netter()
+    assert netter.set_stock("sugar", "g", 100.0) == set()
+    assert netter.formatted() == make_netter().formatted()
@@ -0,0 +1,225 @@
+from datetime import date, timedelta
+
+import pytest
+from mysql.connector import DatabaseError, OperationalError
+
+from replica import ReplicaDatabaseManager
+
+
+class FakeRemote:
+    """Just enough of DatabaseManager for the replica to sync against"""
+
+    tenant_id = 1
+
+    def __init__(self, connected=True):
+        self.connected = connected
+        self.recipes = {}
+        self.rejected_names = set()
+        self.plan = {}
+        self.changes = []
+        self.history = []
+        self.next_id = 100
+
+    def is_connected(self):
+        return self.connected
+
+    def connect_database(self):
+        pass
+
+    def create_tables(self):
+        pass
+
+    def insert_recipe(self, name, ingredients, instructions, category, cuisine="", cook_time=0, servings=1):
+        if name in self.rejected_names:
+            return False
+        self.next_id += 1
+        self.recipes[self.next_id] = (self.next_id, name, ingredients, instructions, category, cuisine, cook_time,
+                                      None, servings, 1.0)
+        return self.next_id
+
+    def add_meal_plan(self, day, meal_type, recipe_id, if_unmodified_since=None):
+        self.plan[(day, meal_type)] = recipe_id
+        return True
+
+    def record_meal_history(self, served_date):
+        self.history.append(served_date)
+        return len(self.plan)
+
+    def get_change_bounds(self):
+        return None, 0
+
+    def end_read_snapshot(self):
+        pass
+
+    def get_changes_since(self, change_id, limit=1000):
+        return [change for change in self.changes if change[0] > change_id][:limit]
+
+    def get_recipes_changed_since(self, since=0):
+        return list(self.recipes.values())
+
+    def get_recipe_ids(self):
+        return list(self.recipes)
+
+    def get_meal_plan(self):
+        return [(day, meal_type, self.recipes[recipe_id][1], recipe_id) for (day, meal_type), recipe_id in
+                self.plan.items()]
+
+    def get_pantry_items(self):
+        return []
+
+    def get_tenants(self):
+        raise OperationalError("Lost connection to MySQL server")
+
+
+@pytest.fixture
+def replica(tmp_path):
+    remote = FakeRemote(connected=False)
+    replica = ReplicaDatabaseManager(remote, path=str(tmp_path / "replica.sqlite3"), sync_interval=3600)
+    yield replica
+    replica.close()
+
+
+def local_ids(replica):
+    return sorted(row[0] for row in replica.local.execute("SELECT recipe_id FROM recipes"))
+
+
+def test_offline_insert_is_remapped_once_pushed(replica):
+    temp_id = replica.insert_recipe("Pancakes", "2 eggs", "Fry.", "Breakfast")
+    assert temp_id < 0
+    replica.add_meal_plan("Monday", "Breakfast", temp_id)
+
+    replica.remote.connected = True
+    assert replica.sync_once()
+    assert local_ids(replica) == [101]
+    assert replica.local.execute("SELECT recipe_id FROM mealplan").fetchall() == [(101,)]
+    assert replica.pending_count() == 0
+
+
+def test_rejected_insert_drops_its_temporary_row(replica):
+    temp_id = replica.insert_recipe("Pancakes", "2 eggs", "Fry.", "Breakfast")
+    replica.update_recipe(temp_id, "Pancakes", "3 eggs", "Fry.", "Breakfast")
+    replica.remote.rejected_names.add("Pancakes")
+
+    replica.remote.connected = True
+    assert replica.sync_once()
+    assert local_ids(replica) == []
+    assert replica.pending_count() == 0
+    kinds, recipe_ids = replica.take_changes()
+    assert "recipes" in kinds
+
+
+def test_insert_failing_on_a_lock_timeout_is_kept_and_retried(replica):
+    replica.close()
+    temp_id = replica.insert_recipe("Pancakes", "2 eggs", "Fry.", "Breakfast")
+    replica.add_meal_plan("Monday", "Breakfast", temp_id)
+    remote = replica.remote
+    insert_recipe = remote.insert_recipe
+
+    def lock_wait_timeout(*args, **kwargs):
+        raise DatabaseError(msg="Lock wait timeout exceeded", errno=1205, sqlstate="HY000")
+
+    remote.insert_recipe = lock_wait_timeout
+    remote.connected = True
+    replica.sync_once()
+    assert local_ids(replica) == [temp_id]
+    assert replica.pending_count() == 2
+
+    remote.insert_recipe = insert_recipe
+    assert replica.sync_once()
+    assert local_ids(replica) == [101]
+    assert remote.plan == {("Monday", "Breakfast"): 101}
+    assert replica.pending_count() == 0
+
+
+def test_insert_refused_by_a_constraint_is_dropped(replica):
+    replica.close()
+    replica.insert_recipe("Pancakes", "2 eggs", "Fry.", "Breakfast")
+
+    def data_too_long(*args, **kwargs):
+        raise DatabaseError(msg="Data too long for column 'name'", errno=1406, sqlstate="22001")
+
+    replica.remote.insert_recipe = data_too_long
+    replica.remote.connected = True
+    assert replica.sync_once()
+    assert local_ids(replica) == []
+    assert replica.pending_count() == 0
+
+
+def test_full_reload_removes_orphaned_temporary_rows(replica):
+    replica.local.execute("INSERT INTO recipes (recipe_id, name, ingredients, instructions, category) "
+                          "VALUES (-5, 'Orphan', '', '', '')")
+    replica.local.commit()
+
+    replica.remote.connected = True
+    replica.sync_once()
+    assert local_ids(replica) == []
+
+
+def test_delegated_call_survives_a_dropped_connection(replica):
+    assert replica.get_tenants() is None
+    assert not replica.is_connected()
+
+
+def test_feed_pull_pages_through_a_full_window(replica, monkeypatch):
+    monkeypatch.setattr("replica.CHANGE_BATCH_SIZE", 2)
+    # Sync by hand only
+    replica.close()
+    replica.remote.connected = True
+    replica.sync_once()
+
+    remote = replica.remote
+    remote.get_recipes_by_ids = lambda ids: [remote.recipes[i] for i in ids if i in remote.recipes]
+    remote.get_meal_plan_slots = lambda keys: []
+    remote.get_pantry_stock = lambda keys: []
+
+    def add_remote_recipe(name):
+        recipe_id = remote.insert_recipe(name, "", "", "")
+        remote.changes.append((len(remote.changes) + 1, "recipe", str(recipe_id), "upsert"))
+
+    for name in ("A", "B", "C"):
+        add_remote_recipe(name)
+    replica.sync_once()
+    replica.sync_once()
+    assert replica.feed.hwm == 3
+
+    # The look-back window now holds a full batch of applied changes; the new one is past it
+    assert replica.feed.since() == 0
+    add_remote_recipe("D")
+    replica.sync_once()
+    assert local_ids(replica) == sorted(remote.recipes)
+    assert replica.feed.hwm == 4
+
+
+def test_sync_records_yesterdays_meals_once_a_day(replica):
+    replica.close()
+    replica.remote.plan[("Monday", "Lunch")] = replica.remote.insert_recipe("Soup", "", "", "")
+    replica.remote.connected = True
+    replica.sync_once()
+    replica.sync_once()
+    assert replica.remote.history == [date.today() - timedelta(days=1)]
+    kinds, _ = replica.take_changes()
+    assert "history" in kinds
+
+
+def test_duplicate_check_works_offline(replica):
+    temp_id = replica.insert_recipe("Tomato Soup", "2 tomatoes, 1 onion", "Simmer.", "Lunch")
+    assert replica.find_duplicate_recipe("tomato  soup", "1 onion, 2 tomatoes") == temp_id
+    assert replica.find_duplicate_recipe("Tomato Soup", "3 tomatoes, 1 onion") is None
+
+
+def test_offline_save_of_an_existing_recipe_is_reported(replica):
+    replica.close()
+    remote = replica.remote
+    existing_id = remote.insert_recipe("Soup", "", "", "")
+    remote.connected = True
+    replica.sync_once()
+
+    remote.connected = False
+    replica.online = False
+    replica.insert_recipe("Soup again", "", "", "")
+    remote.insert_recipe = lambda *args, **kwargs: existing_id
+    remote.connected = True
+    replica.sync_once()
+    assert local_ids(replica) == [existing_id]
+    assert replica.take_duplicates() == [("Soup again", existing_id)]
+    assert replica.take_duplicates() == []
@@ -0,0 +1,57 @@
+import random
+
+from revisions import (MAX_CHAIN_LENGTH, apply_delta, deserialize_recipe, encode_revision, make_delta, make_keyframe,
+                       reconstruct, serialize_recipe)
+
+
+def recipe(**fields):
+    base = {"name": "Pancakes", "ingredients": "2 cups flour, 2 eggs, 1 cup milk", "instructions": "Mix and fry.",
+            "category": "Breakfast", "cuisine": "", "cook_time": 20, "servings": 4}
+    base.update(fields)
+    return base
+
+
+def test_serialize_round_trip_ignores_unknown_fields():
+    text = serialize_recipe(dict(recipe(), photo="x"))
+    assert deserialize_recipe(text) == recipe()
+
+
+def test_delta_round_trip():
+    old = serialize_recipe(recipe())
+    for new in (serialize_recipe(recipe(name="Fluffy Pancakes")), serialize_recipe(recipe(instructions="")), "", old):
+        assert apply_delta(old, make_delta(old, new)) == new
+
+
+def test_delta_round_trip_random_edits():
+    rng = random.Random(7)
+    text = serialize_recipe(recipe())
+    for _ in range(200):
+        i, j = sorted(rng.randrange(len(text) + 1) for _ in range(2))
+        new = text[:i] + "".join(rng.choice("abc ,ü") for _ in range(rng.randrange(5))) + text[j:]
+        assert apply_delta(text, make_delta(text, new)) == new
+        text = new
+
+
+def test_small_edit_makes_a_small_delta():
+    steps = " ".join(f"Step {i}: stir {i * 7 % 13} times." for i in range(300))
+    old = serialize_recipe(recipe(instructions=steps))
+    new = old.replace("Step 150", "Step 150 (optional)")
+    assert len(make_delta(old, new)) < len(make_keyframe(new)) / 10
+
+
+def test_chain_reconstructs_every_revision():
+    texts = [serialize_recipe(recipe(cook_time=minutes)) for minutes in range(10, 130, 10)]
+    chain = [("key", make_keyframe(texts[0]))]
+    for old, new in zip(texts, texts[1:]):
+        deltas = [row for row in chain if row[0] != "key"]
+        chain.append(encode_revision(old, new, sum(len(row[1]) for row in deltas), len(deltas)))
+        assert reconstruct(chain) == new
+    # A delete marker leaves the last text in place
+    assert reconstruct(chain + [("delete", b"")]) == texts[-1]
+
+
+def test_long_chains_get_a_keyframe():
+    old, new = serialize_recipe(recipe()), serialize_recipe(recipe(servings=5))
+    assert encode_revision(old, new, 0, 0)[0] == "delta"
+    assert encode_revision(old, new, 0, MAX_CHAIN_LENGTH)[0] == "key"
+    assert encode_revision(None, new, 0, 0)[0] == "key"